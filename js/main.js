@@ -350,6 +350,13 @@ backToTopButton.addEventListener('click', () => {
     });
 });
 
+// ================================
+// 页脚年份（页面跨年不重新生成）
+// ================================
+document.querySelectorAll('.copyright-year').forEach(el => {
+    el.textContent = new Date().getFullYear();
+});
+
 // ================================
 // 页面加载动画
 // ================================
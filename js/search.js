@@ -0,0 +1,116 @@
+/**
+ * TechBlog - 站内搜索
+ * 读取 scripts/search_index.py 生成的静态分片索引，只下载查询用到的分片
+ */
+
+(function () {
+    const script = document.currentScript;
+    const BASE = (script && script.dataset.index) || './search/';
+    const PAGE_BASE = (script && script.dataset.pages) || './';
+
+    // 与 search_index.py 的 tokenize / shard_key 保持一致
+    const TOKEN_RE = /[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+|[a-z0-9]+/g;
+
+    function tokenize(text) {
+        const tokens = [];
+        for (const run of text.toLowerCase().match(TOKEN_RE) || []) {
+            if (run.charCodeAt(0) < 0x80) {
+                if (run.length >= 2) tokens.push(run);
+            } else if (run.length === 1) {
+                tokens.push(run);
+            } else {
+                for (let i = 0; i < run.length - 1; i++) tokens.push(run.slice(i, i + 2));
+            }
+        }
+        return tokens;
+    }
+
+    function shardKey(term) {
+        const code = term.charCodeAt(0);
+        return code < 0x80 ? term[0] : (code >> 4).toString(16).padStart(3, '0');
+    }
+
+    const cache = new Map();
+
+    function fetchJson(name) {
+        if (!cache.has(name)) {
+            cache.set(name, fetch(BASE + name).then(res => (res.ok ? res.json() : {})).catch(() => ({})));
+        }
+        return cache.get(name);
+    }
+
+    async function search(query, limit = 20) {
+        const terms = [...new Set(tokenize(query))];
+        if (!terms.length) return [];
+
+        const meta = await fetchJson('meta.json');
+        const total = meta.docs || 1;
+        const shards = await Promise.all(terms.map(t => fetchJson(`s-${shardKey(t)}.json`)));
+
+        // 所有词都命中的文档才算结果，按 词频 × idf 排序
+        let scores = null;
+        terms.forEach((term, i) => {
+            const flat = shards[i][term] || [];
+            const idf = Math.log(1 + total / Math.max(1, flat.length / 2));
+            const next = new Map();
+            for (let j = 0; j < flat.length; j += 2) {
+                const id = flat[j];
+                if (scores === null || scores.has(id)) {
+                    next.set(id, (scores ? scores.get(id) : 0) + flat[j + 1] * idf);
+                }
+            }
+            scores = next;
+        });
+
+        const top = [...scores.entries()].sort((a, b) => b[1] - a[1]).slice(0, limit);
+        const chunkSize = meta.docChunk || 500;
+        const chunks = await Promise.all(
+            [...new Set(top.map(([id]) => Math.floor(id / chunkSize)))].map(c => fetchJson(`d-${c}.json`))
+        );
+        const docs = Object.assign({}, ...chunks);
+        return top
+            .filter(([id]) => docs[id])
+            .map(([id, score]) => {
+                const [slug, title, date] = docs[id];
+                return { slug, title, date, score, url: `${PAGE_BASE}posts/${encodeURIComponent(slug)}.html` };
+            });
+    }
+
+    // 页面上有搜索框时自动绑定
+    const input = document.getElementById('searchInput');
+    const output = document.getElementById('searchResults');
+    if (input && output) {
+        let timer;
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(async () => {
+                const query = input.value.trim();
+                if (!query) {
+                    output.replaceChildren();
+                    return;
+                }
+                const results = await search(query);
+                // 标题等来自索引数据，用 textContent 写入，避免被当成 HTML 解析
+                const items = results.map(r => {
+                    const li = document.createElement('li');
+                    const link = document.createElement('a');
+                    link.href = r.url;
+                    link.textContent = r.title;
+                    const date = document.createElement('span');
+                    date.className = 'post-date';
+                    date.textContent = r.date;
+                    li.append(link, ' ', date);
+                    return li;
+                });
+                if (!items.length) {
+                    const empty = document.createElement('li');
+                    empty.textContent = '没有找到相关文章';
+                    items.push(empty);
+                }
+                output.replaceChildren(...items);
+            }, 200);
+        });
+    }
+
+    window.TechBlogSearch = { search, tokenize };
+})();
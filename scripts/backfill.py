@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按日期区间批量补生成教程文章
+
+日期分块分发到进程池，每篇文章原子写入；已有文章的日期直接跳过。
+
+用法:
+    python3 scripts/backfill.py 2025-01-01 2025-12-31 --workers 8
+    python3 scripts/backfill.py 2000-01-01 2099-12-31 --output-dir /tmp/load-test --variant full
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from blog_utils import posts_dir
+from section_cache import get_cache
+import tutorial_api
+
+# 每个工作进程只加载一次生成器
+_generator = None
+
+
+def _init_worker(variant):
+    global _generator
+    _generator = tutorial_api.load_generator(variant)
+
+
+def _generate_one(args):
+    """
+    工作进程：生成并原子写入一篇文章，返回 (文件名, 字节数, 章节缓存命中, 未命中)
+
+    工作进程退出时不会执行 atexit，章节缓存计数交回主进程统一写入 stats.json
+    """
+    date, output_dir = args
+    post = _generator.generate_blog_post(date)
+    filepath = _generator.save_post(post, output_dir)
+    hits, misses = get_cache().take_counts()
+    return post["filename"], os.path.getsize(filepath), hits, misses
+
+
+def iter_dates(start, end):
+    """[start, end] 区间内的每一天"""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def existing_dates(output_dir):
+    """已有文章的日期前缀（YYYY-MM-DD），只列一次目录"""
+    if not os.path.isdir(output_dir):
+        return set()
+    return {name[:10] for name in os.listdir(output_dir) if name.endswith(".md")}
+
+
+def backfill(start, end, workers=None, variant=tutorial_api.DEFAULT_VARIANT,
+             output_dir=None, publish_time="08:00", verbose=True):
+    """补生成 [start, end] 区间内缺失的文章，返回统计结果"""
+    output_dir = output_dir or posts_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    hour, minute = (int(x) for x in publish_time.split(":"))
+
+    started = time.perf_counter()
+    existing = existing_dates(output_dir)
+    todo = []
+    skipped = 0
+    for day in iter_dates(start, end):
+        if day.strftime("%Y-%m-%d") in existing:
+            skipped += 1
+            continue
+        todo.append((day.replace(hour=hour, minute=minute, second=0, microsecond=0), output_dir))
+
+    written = 0
+    total_bytes = 0
+    cache = get_cache()
+    if todo:
+        # 分块提交，降低几万个日期时的进程间通信开销
+        chunksize = max(1, min(500, len(todo) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(variant,)) as pool:
+            for _, size, hits, misses in pool.map(_generate_one, todo, chunksize=chunksize):
+                written += 1
+                total_bytes += size
+                cache.add_counts(hits, misses)
+                if verbose and written % 1000 == 0:
+                    print(f"  已生成 {written}/{len(todo)} 篇")
+        cache.flush()
+
+    elapsed = time.perf_counter() - started
+    result = {
+        "written": written,
+        "skipped": skipped,
+        "bytes": total_bytes,
+        "elapsed": elapsed,
+        "posts_per_sec": written / elapsed if elapsed > 0 else 0.0,
+        "mb_per_sec": total_bytes / elapsed / 1e6 if elapsed > 0 else 0.0,
+        "workers": workers,
+    }
+    if verbose:
+        print(f"补生成完成: 新增 {written} 篇，跳过 {skipped} 篇，"
+              f"{workers} 个进程，耗时 {elapsed:.2f}s，"
+              f"{result['posts_per_sec']:.1f} 篇/秒，{result['mb_per_sec']:.2f} MB/s")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按日期区间批量补生成教程文章")
+    parser.add_argument("start", help="开始日期 YYYY-MM-DD")
+    parser.add_argument("end", help="结束日期 YYYY-MM-DD（包含）")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    parser.add_argument("--variant", default=tutorial_api.DEFAULT_VARIANT,
+                        choices=sorted(tutorial_api.GENERATORS))
+    parser.add_argument("--output-dir", help="输出目录，默认 content/posts")
+    parser.add_argument("--time", default="08:00", help="文章发布时间 HH:MM")
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    if end < start:
+        parser.error("结束日期不能早于开始日期")
+    backfill(start, end, workers=args.workers, variant=args.variant,
+             output_dir=args.output_dir, publish_time=args.time)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
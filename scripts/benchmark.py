@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准
+
+用现有文章做素材生成合成语料（中文段落、代码块、Front Matter 与真实文章同构），
+在 100 / 1k / 10k / 100k 篇规模上分别计时流水线各阶段：
+    index_cold / build_full / search_full        冷启动（清空 .cache 和输出）
+    index_incr / build_incr / search_incr        修改一篇文章后的增量更新
+    git_add / git_commit                         发布阶段在整个语料上的 git 开销
+另外计时生成器本身（generate_blog_post / save_post 各 MICRO_POSTS 次）。
+
+结果追加到 .cache/benchmark-history.jsonl；与同一台机器上一次的结果相比，
+任何阶段变慢超过阈值（默认 20%，且绝对差超过噪声下限）时报告回归并以退出码 1 结束。
+合成语料缓存在 .cache/bench/，只在语料版本或规模变化时重新生成。
+
+用法:
+    python3 scripts/benchmark.py                          # 默认 100,1000,10000
+    python3 scripts/benchmark.py --sizes 100,1000,10000,100000
+    python3 scripts/benchmark.py --sizes 1000 --threshold 0.3 --no-git
+    python3 scripts/benchmark.py --sizes 1000 --repeat 3   # 每个阶段取 3 次中的最小值
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+from blog_utils import BLOG_DIR, CACHE_DIRNAME, posts_dir, cache_path, parse_front_matter
+from post_index import PostIndex
+import search_index
+import site_build
+import tracing
+import tutorial_api
+
+CORPUS_VERSION = 1
+ALL_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_THRESHOLD = 0.2
+# 小于这个差值（秒）的变化视为噪声
+NOISE_FLOOR = 0.05
+MICRO_POSTS = 1000
+HISTORY_NAME = "benchmark-history.jsonl"
+CORPUS_START = datetime(2020, 1, 1, 8, 0, 0)
+
+_SENTENCE_END = re.compile(r"(?<=[。！？])")
+_CODE_BLOCK = re.compile(r"```[^\n]*\n.*?```", re.S)
+_HEADING_NUMBER = re.compile(r"^(\d+\.\s*|场景\d+：)")
+_MARKUP = re.compile(r"^\s*(#|-|\*|\||>|\d+\.|!\[)")
+
+
+class Material:
+    """从现有文章提取的语料素材"""
+
+    def __init__(self, root=None):
+        self.sentences = []
+        self.headings = []
+        self.code_blocks = []
+        self.categories = set()
+        self.tags = set()
+        self.authors = set()
+        src_dir = posts_dir(root)
+        for name in sorted(os.listdir(src_dir)):
+            if name.endswith(".md"):
+                with open(os.path.join(src_dir, name), "r", encoding="utf-8") as f:
+                    self._add(f.read())
+        self.categories = sorted(self.categories) or ["AI"]
+        self.tags = sorted(self.tags) or ["AI"]
+        self.authors = sorted(self.authors) or ["小欧Jacory"]
+        if not self.sentences:
+            self.sentences = ["这是一段用于性能测试的示例文本。"]
+        if not self.headings:
+            self.headings = ["概述", "实践", "总结"]
+
+    def _add(self, text):
+        meta, body = parse_front_matter(text)
+        if meta.get("category"):
+            self.categories.add(str(meta["category"]))
+        for tag in meta.get("tags") or []:
+            self.tags.add(str(tag))
+        if meta.get("author"):
+            self.authors.add(str(meta["author"]))
+        self.code_blocks.extend(_CODE_BLOCK.findall(body))
+        for line in _CODE_BLOCK.sub("", body).splitlines():
+            line = line.strip()
+            if line.startswith("## ") or line.startswith("### "):
+                heading = _HEADING_NUMBER.sub("", line.lstrip("#").strip())
+                if heading and heading != "目录":
+                    self.headings.append(heading)
+            elif line and not _MARKUP.match(line):
+                self.sentences.extend(s for s in _SENTENCE_END.split(line) if len(s) > 4)
+
+
+def synthetic_post(material, rng, index):
+    """生成第 index 篇合成文章，返回 (文件名, 文本)"""
+    date = CORPUS_START + timedelta(hours=6 * index, seconds=rng.randrange(3600))
+    title = f"{rng.choice(material.headings)}：{rng.choice(material.headings)}"
+    slug = title.lower().replace(" ", "-").replace(":", "-").replace("|", "-")[:40]
+    tags = rng.sample(material.tags, min(len(material.tags), rng.randint(2, 4)))
+    sections = rng.sample(material.headings, min(len(material.headings), rng.randint(3, 8)))
+    excerpt = "".join(rng.choice(material.sentences) for _ in range(2))[:120]
+
+    lines = [
+        "---",
+        f'title: "{title}"',
+        f"date: {date:%Y-%m-%d %H:%M:%S}",
+        f'author: "{rng.choice(material.authors)}"',
+        f'category: "{rng.choice(material.categories)}"',
+        f"tags: {json.dumps(tags, ensure_ascii=False)}",
+        f"readTime: {rng.randint(5, 30)}",
+        'cover: ""',
+        f'excerpt: "{excerpt.replace(chr(34), "")}"',
+        "featured: false",
+        "---",
+        "",
+        "## 目录",
+        "",
+    ]
+    lines.extend(f"- [{s}](#{s.lower().replace(' ', '-')})" for s in sections)
+    for section in sections:
+        lines.extend(["", f"## {section}", ""])
+        for _ in range(rng.randint(2, 5)):
+            lines.append("".join(rng.choice(material.sentences) for _ in range(rng.randint(2, 5))))
+            lines.append("")
+        if material.code_blocks and rng.random() < 0.3:
+            lines.extend([rng.choice(material.code_blocks), ""])
+        if rng.random() < 0.2:
+            lines.extend(f"- {rng.choice(material.sentences)}" for _ in range(rng.randint(2, 4)))
+    return f"{date:%Y-%m-%d}-{slug}-{index}.md", "\n".join(lines) + "\n"
+
+
+def ensure_corpus(size, seed=0, material=None):
+    """返回 size 篇合成语料所在的站点根目录（已存在且版本一致时直接复用）"""
+    root = cache_path(os.path.join("bench", f"corpus-{size}-{seed}"))
+    marker = os.path.join(root, "corpus.json")
+    expected = {"version": CORPUS_VERSION, "size": size, "seed": seed}
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == expected:
+                return root
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(root, ignore_errors=True)
+    src_dir = posts_dir(root)
+    os.makedirs(src_dir)
+    material = material or Material()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for i in range(size):
+        name, text = synthetic_post(material, rng, i)
+        with open(os.path.join(src_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+    # marked 从站点根目录的 node_modules 加载
+    node_modules = os.path.join(BLOG_DIR, "node_modules")
+    if os.path.isdir(node_modules):
+        os.symlink(node_modules, os.path.join(root, "node_modules"))
+    with open(os.path.join(root, ".gitignore"), "w", encoding="utf-8") as f:
+        f.write(f"node_modules\n{CACHE_DIRNAME}/\ncorpus.json\n")
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(expected, f)
+    print(f"📦 生成 {size} 篇合成语料: {root} ({time.perf_counter() - started:.1f}s)")
+    return root
+
+
+def reset_outputs(root):
+    """清空构建缓存和输出，让下一轮从冷启动开始"""
+    for name in (CACHE_DIRNAME, "posts", "search", ".git"):
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    for name in ("posts.html",):
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _timed(results, name, func, *args, **kwargs):
+    with tracing.span(name) as current:
+        started = time.perf_counter()
+        value = func(*args, **kwargs)
+        results[name] = round(time.perf_counter() - started, 4)
+        current.set(seconds=results[name])
+    return value
+
+
+def _git(root, *args):
+    subprocess.run(
+        ["git", "-c", "user.email=bench@localhost", "-c", "user.name=bench", *args],
+        cwd=root, check=True, capture_output=True,
+    )
+
+
+def _touch_one_post(root):
+    """修改最新的一篇文章，模拟每天的增量更新，返回 (路径, 原文) 供恢复"""
+    src_dir = posts_dir(root)
+    path = os.path.join(src_dir, sorted(os.listdir(src_dir))[-1])
+    with open(path, "r", encoding="utf-8") as f:
+        original = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(original + "\n基准测试追加的段落。\n")
+    return path, original
+
+
+def bench_corpus(size, seed=0, git=True, material=None):
+    """在 size 篇语料上计时各阶段，返回 {阶段: 秒}"""
+    root = ensure_corpus(size, seed, material)
+    reset_outputs(root)
+    results = {}
+
+    def refresh_index():
+        with PostIndex(root) as index:
+            index.refresh()
+
+    with tracing.span(f"corpus-{size}", lane=f"corpus-{size}"):
+        _timed(results, "index_cold", refresh_index)
+        _timed(results, "build_full", site_build.build, root=root, verbose=False)
+        _timed(results, "search_full", search_index.build_search_index, root=root, verbose=False)
+        if git:
+            _git(root, "init", "-q")
+            _timed(results, "git_add", _git, root, "add", "-A")
+            _timed(results, "git_commit", _git, root, "commit", "-q", "-m", "bench")
+
+        path, original = _touch_one_post(root)
+        try:
+            _timed(results, "index_incr", refresh_index)
+            _timed(results, "build_incr", site_build.build, root=root, verbose=False)
+            _timed(results, "search_incr", search_index.build_search_index, root=root,
+                   verbose=False)
+        finally:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(original)
+    return results
+
+
+def bench_generators(count=MICRO_POSTS):
+    """计时两个生成器的 generate_blog_post / save_post，返回 {阶段: 秒}"""
+    results = {}
+    dates = [CORPUS_START + timedelta(days=i) for i in range(count)]
+    with tempfile.TemporaryDirectory() as output_dir:
+        for variant in tutorial_api.GENERATORS:
+            generator = tutorial_api.load_generator(variant)
+            posts = _timed(results, f"{variant}.generate_blog_post",
+                           lambda: [generator.generate_blog_post(d) for d in dates])
+            _timed(results, f"{variant}.save_post",
+                   lambda: [generator.save_post(p, output_dir) for p in posts])
+    return results
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BLOG_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    history = []
+    if not os.path.exists(path):
+        return history
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    continue
+    return history
+
+
+def find_baseline(history, host):
+    """同一台机器上最近的一次记录"""
+    for record in reversed(history):
+        if record.get("host") == host:
+            return record
+    return None
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, noise_floor=NOISE_FLOOR):
+    """返回回归列表 [(规模, 阶段, 旧, 新, 变化比例), ...]"""
+    regressions = []
+    if not baseline:
+        return regressions
+    for size, stages in results.items():
+        old_stages = baseline.get("results", {}).get(size, {})
+        for stage, new in stages.items():
+            old = old_stages.get(stage)
+            if not old:
+                continue
+            if new > old * (1 + threshold) and new - old > noise_floor:
+                regressions.append((size, stage, old, new, new / old - 1))
+    return regressions
+
+
+def print_table(results, baseline):
+    old_results = (baseline or {}).get("results", {})
+    for size, stages in results.items():
+        print(f"\n[{size}]")
+        for stage, seconds in stages.items():
+            old = old_results.get(size, {}).get(stage)
+            delta = f"  ({seconds / old - 1:+.0%} vs {old:.3f}s)" if old else ""
+            print(f"  {stage:<32} {seconds:>9.3f}s{delta}")
+
+
+def parse_sizes(value):
+    return [int(s) for s in value.split(",") if s.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="流水线性能基准")
+    parser.add_argument("--sizes", type=parse_sizes, default=list(DEFAULT_SIZES),
+                        help=f"语料规模，逗号分隔（可选 {','.join(map(str, ALL_SIZES))}）")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="回归阈值（相对上次，默认 0.2 即 20%%）")
+    parser.add_argument("--history", default=cache_path(HISTORY_NAME), help="历史记录文件")
+    parser.add_argument("--repeat", type=int, default=1, help="重复次数，每个阶段取最小值")
+    parser.add_argument("--no-git", action="store_true", help="跳过 git 阶段")
+    parser.add_argument("--no-record", action="store_true", help="不写入历史记录")
+    args = parser.parse_args(argv)
+
+    tracing.reset_tracer("benchmark")
+    material = Material()
+    results = {}
+    # 每个阶段取多次运行中的最小值，减少噪声
+    for _ in range(args.repeat):
+        runs = {"generators": bench_generators()}
+        for size in args.sizes:
+            runs[str(size)] = bench_corpus(size, args.seed, git=not args.no_git, material=material)
+        for key, stages in runs.items():
+            best = results.setdefault(key, {})
+            for stage, seconds in stages.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+
+    host = socket.gethostname()
+    history = load_history(args.history)
+    baseline = find_baseline(history, host)
+    print_table(results, baseline)
+
+    record = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "host": host,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if not args.no_record:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    trace_path, _ = tracing.write_trace()
+    print(f"\ntrace: {trace_path}")
+
+    regressions = compare(results, baseline, args.threshold)
+    if baseline:
+        print(f"基线: {baseline['time']} ({baseline.get('revision') or '?'})")
+    else:
+        print("没有同一台机器上的历史记录，本次结果作为基线")
+    if regressions:
+        print(f"⚠️  {len(regressions)} 个阶段变慢超过 {args.threshold:.0%}:")
+        for size, stage, old, new, change in regressions:
+            print(f"  [{size}] {stage}: {old:.3f}s → {new:.3f}s ({change:+.0%})")
+        return 1
+    print("✅ 没有性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+构建脚本公共工具：路径、哈希、原子写入、Front Matter 解析
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+
+# 项目根目录（scripts/ 的上一级）
+BLOG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 缓存目录（清单、索引等中间产物，不入库）
+CACHE_DIRNAME = ".cache"
+
+
+def posts_dir(root=None):
+    """文章源文件目录"""
+    return os.path.join(root or BLOG_DIR, "content", "posts")
+
+
+def cache_path(name, root=None):
+    """缓存文件路径"""
+    return os.path.join(root or BLOG_DIR, CACHE_DIRNAME, name)
+
+
+def text_sha256(text):
+    """计算字符串的 SHA-256"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def bytes_sha256(data):
+    """计算字节串的 SHA-256"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path):
+    """计算文件的 SHA-256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def ensure_dir(path):
+    """确保目录存在"""
+    os.makedirs(path, exist_ok=True)
+
+
+def atomic_write_chunks(path, chunks, fsync=True):
+    """
+    把 chunks（str 或 bytes 的可迭代对象）流式写入临时文件，
+    fsync 后改名到目标路径，避免留下写了一半的文件
+    """
+    directory = os.path.dirname(path) or "."
+    ensure_dir(directory)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.tmp{os.getpid()}")
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if fsync:
+        _fsync_dir(directory)
+    return path
+
+
+def _fsync_dir(directory):
+    """确保改名操作落盘（不支持目录 fsync 的平台直接跳过）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data, fsync=False):
+    """原子写入一段完整内容"""
+    return atomic_write_chunks(path, (data,), fsync=fsync)
+
+
+def join_lines(lines):
+    """流式版本的 "\n".join(lines)"""
+    first = True
+    for line in lines:
+        if not first:
+            yield "\n"
+        first = False
+        yield line
+
+
+def load_json(path, default=None):
+    """读取 JSON 文件，不存在或损坏时返回默认值"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data, compact=False):
+    """原子写入 JSON 文件（compact=True 时不缩进，大文件写入快得多）"""
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True)
+    atomic_write(path, text)
+
+
+def _parse_scalar(value):
+    """解析 Front Matter 中的单个值"""
+    value = value.strip()
+    if value == "":
+        return ""
+    if value[0] in "[{\"":
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    if value[0] == "'" and value[-1] == "'" and len(value) >= 2:
+        return value[1:-1].replace("''", "'")
+    if value in ("true", "false"):
+        return value == "true"
+    if value in ("null", "~"):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_front_matter(text):
+    """
+    解析 Markdown 的 YAML Front Matter，返回 (data, body)
+
+    只支持文章里实际用到的写法：单行键值、JSON 风格的行内列表，
+    以及 Decap CMS 写出的 `- item` 块列表。
+    """
+    if not text.startswith("---"):
+        return {}, text
+    end = text.find("\n---", 3)
+    if end == -1:
+        return {}, text
+    header = text[3:end].strip("\n")
+    body_start = text.find("\n", end + 4)
+    body = "" if body_start == -1 else text[body_start + 1:]
+
+    data = {}
+    current_list = None
+    for line in header.split("\n"):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and current_list is not None:
+            data[current_list].append(_parse_scalar(stripped[2:]))
+            continue
+        if ":" not in line:
+            continue
+        key, _, value = line.partition(":")
+        key = key.strip()
+        if value.strip() == "":
+            data[key] = []
+            current_list = key
+        else:
+            data[key] = _parse_scalar(value)
+            current_list = None
+    # 空块列表的键视为未填写
+    for key, value in list(data.items()):
+        if value == []:
+            data[key] = ""
+    return data, body
+
+
+def parse_post_date(value):
+    """
+    把 Front Matter 里的日期解析为本地时间（naive datetime）
+
+    与 gray-matter 保持一致：不带时区的时间按 UTC 处理。
+    """
+    if isinstance(value, datetime):
+        return value
+    text = str(value or "").strip()
+    if not text:
+        return datetime.fromtimestamp(0)
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return datetime.fromtimestamp(0)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone().replace(tzinfo=None)
+
+
+def format_zh_date(dt):
+    """与 toLocaleDateString('zh-CN') 一致的日期格式，如 2026/2/8"""
+    return f"{dt.year}/{dt.month}/{dt.day}"
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章内容分析
+
+逐行扫描一遍正文，同时得到:
+    - 字数：中日韩文字按字计，英文按词计，代码块按行计，另计图片数；
+    - 阅读时间：中文 300 字/分钟、英文 200 词/分钟、代码 40 行/分钟、每张图片 12 秒，向上取整；
+    - 标题列表和标题树，id 由 markdown_render 的规则生成（与页面上的 id 一致）；
+    - 站内链接（#锚点、posts/*.html、图片等），构建后检查它们是否指向存在的标题或文件。
+
+结果按正文哈希缓存在 .cache/post-analysis.sqlite3，未变化的文章不重新读取。
+
+用法:
+    python3 scripts/content_analyzer.py                 # 每篇文章的字数、阅读时间、标题数、坏链接
+    python3 scripts/content_analyzer.py --outline SLUG  # 打印标题树
+    python3 scripts/content_analyzer.py --check         # 有坏链接时退出码为 1
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import sqlite3
+import argparse
+import posixpath
+from urllib.parse import unquote
+
+from blog_utils import BLOG_DIR, cache_path, ensure_dir, parse_front_matter
+from markdown_render import Slugger, heading_id
+
+INDEX_NAME = "post-analysis.sqlite3"
+# 分析规则变化时递增，旧结果全部失效
+ANALYZER_VERSION = 1
+
+CJK_CHARS_PER_MINUTE = 300
+WORDS_PER_MINUTE = 200
+CODE_LINES_PER_MINUTE = 40
+SECONDS_PER_IMAGE = 12
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    hash TEXT PRIMARY KEY,
+    read_time INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+_CJK = re.compile("[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]")
+_WORD = re.compile(r"[A-Za-z0-9]+(?:['’.-][A-Za-z0-9]+)*")
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_ATX = re.compile(r"^ {0,3}(#{1,6})(?=\s|$)(.*)$")
+_SETEXT = re.compile(r"^ {0,3}(=+|-+) *$")
+_QUOTE = re.compile(r"^ {0,3}> ?")
+_BULLET = re.compile(r"^ {0,3}(?:[*+-]|\d{1,9}[.)])(?:[ \t]|$)")
+_INDENTED = re.compile(r"^(?: {4}|\t)")
+_CODESPAN = re.compile(r"(`+)(?!`).*?(?<!`)\1(?!`)")
+_IMAGE = re.compile(r"!\[((?:\\.|[^\]\\])*)\]\(\s*<?([^)\s>]*)>?(?:\s+[\"'(][^)]*)?\)")
+_LINK = re.compile(r"\[((?:\\.|[^\]\\])*)\]\(\s*<?([^)\s>]*)>?(?:\s+[\"'(][^)]*)?\)")
+_DEFINITION = re.compile(r"^ {0,3}\[[^\]]+\]:\s*<?([^\s>]+)>?")
+_HTML_URL = re.compile(r"""<(?:a|img)\b[^>]*?\b(?:href|src)\s*=\s*["']([^"']*)["']""", re.I)
+_TAG = re.compile(r"<[^>]*>")
+_SCHEME = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//)")
+
+
+def _heading_text(text):
+    """ATX 标题去掉结尾的 #（与 marked 相同）"""
+    text = text.strip()
+    if text.endswith("#"):
+        trimmed = text.rstrip("#")
+        if not trimmed or trimmed.endswith(" "):
+            text = trimmed.strip()
+    return text
+
+
+def analyze_lines(lines, first_line=1, preceding_headings=()):
+    """
+    逐行分析正文，返回
+    {"cjk_chars", "latin_words", "words", "code_lines", "images", "read_time",
+     "headings": [{"level", "text", "id", "line"}], "links": [{"url", "line"}]}
+
+    preceding_headings 是正文之前（不在 lines 中）的标题文字，用于得到正确的重复 id 后缀。
+    """
+    slugger = Slugger()
+    for text in preceding_headings:
+        heading_id(text, slugger)
+    stats = {"cjk_chars": 0, "latin_words": 0, "code_lines": 0, "images": 0}
+    headings = []
+    links = []
+    fence = None
+    paragraph = []
+
+    def add_heading(level, text, line):
+        headings.append({"level": level, "text": text, "id": heading_id(text, slugger), "line": line})
+
+    for number, line in enumerate(lines, first_line):
+        line = line.rstrip("\n")
+        if fence:
+            if re.match(rf"^ {{0,3}}{fence[0]}{{{len(fence)},}}[ \t]*$", line):
+                fence = None
+            else:
+                stats["code_lines"] += 1
+            continue
+        match = _FENCE.match(line)
+        if match:
+            fence = match.group(1)
+            paragraph = []
+            continue
+        if not line.strip():
+            paragraph = []
+            continue
+        if _INDENTED.match(line) and not paragraph:
+            stats["code_lines"] += 1
+            continue
+        content = line
+        while _QUOTE.match(content):
+            content = _QUOTE.sub("", content, count=1)
+
+        match = _ATX.match(content)
+        if match:
+            add_heading(len(match.group(1)), _heading_text(match.group(2)), number)
+            paragraph = []
+        elif paragraph and _SETEXT.match(content) and not _BULLET.match(paragraph[0][1]):
+            level = 1 if content.strip()[0] == "=" else 2
+            add_heading(level, "\n".join(text for _, text in paragraph).strip(), paragraph[0][0])
+            paragraph = []
+            continue
+        else:
+            paragraph.append((number, content))
+
+        definition = _DEFINITION.match(content)
+        if definition:
+            links.append({"url": definition.group(1), "line": number})
+            continue
+        prose = _CODESPAN.sub(lambda m: m.group(0).strip("`"), content)
+        for image in _IMAGE.finditer(prose):
+            stats["images"] += 1
+            links.append({"url": image.group(2), "line": number})
+        prose = _IMAGE.sub(lambda m: m.group(1), prose)
+        for link in _LINK.finditer(prose):
+            links.append({"url": link.group(2), "line": number})
+        prose = _LINK.sub(lambda m: m.group(1), prose)
+        for url in _HTML_URL.findall(prose):
+            if prose.lstrip().lower().startswith("<img"):
+                stats["images"] += 1
+            links.append({"url": url, "line": number})
+        prose = _TAG.sub(" ", prose)
+        stats["cjk_chars"] += len(_CJK.findall(prose))
+        stats["latin_words"] += len(_WORD.findall(prose))
+
+    minutes = (
+        stats["cjk_chars"] / CJK_CHARS_PER_MINUTE
+        + stats["latin_words"] / WORDS_PER_MINUTE
+        + stats["code_lines"] / CODE_LINES_PER_MINUTE
+        + stats["images"] * SECONDS_PER_IMAGE / 60
+    )
+    return dict(
+        stats,
+        words=stats["cjk_chars"] + stats["latin_words"],
+        read_time=max(1, math.ceil(minutes)),
+        headings=headings,
+        links=links,
+    )
+
+
+def split_lines(chunks):
+    """把可能含换行的文本块逐行产出（不复制整块文本）"""
+    for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find("\n", start)
+            if end < 0:
+                yield chunk[start:]
+                break
+            yield chunk[start:end]
+            start = end + 1
+
+
+def analyze_text(text):
+    """分析一篇文章的全文（含 Front Matter，行号按源文件计）"""
+    body = parse_front_matter(text)[1]
+    first_line = text[:len(text) - len(body)].count("\n") + 1
+    return analyze_lines(body.split("\n"), first_line)
+
+
+def outline(headings):
+    """标题列表 → 标题树 [{"level", "text", "id", "children": [...]}]"""
+    root = {"level": 0, "children": []}
+    stack = [root]
+    for heading in headings:
+        node = {"level": heading["level"], "text": heading["text"], "id": heading["id"], "children": []}
+        while stack[-1]["level"] >= node["level"]:
+            stack.pop()
+        stack[-1]["children"].append(node)
+        stack.append(node)
+    return root["children"]
+
+
+def toc_anchor(analysis, text):
+    """正文中标题文字为 text 的第一个标题的 id，没有时返回 None"""
+    return next((h["id"] for h in analysis["headings"] if h["text"] == text), None)
+
+
+# ---------- 缓存 ----------
+
+class AnalysisCache:
+    """{正文哈希: 分析结果}"""
+
+    def __init__(self, root=None, path=None):
+        self.root = root or BLOG_DIR
+        self.path = path or cache_path(INDEX_NAME, self.root)
+        ensure_dir(os.path.dirname(self.path))
+        self.conn = sqlite3.connect(self.path)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != ANALYZER_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS analysis")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {ANALYZER_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, hashes):
+        result = {}
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            result.update(
+                (key, json.loads(data)) for key, data in self.conn.execute(
+                    f"SELECT hash, data FROM analysis WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                )
+            )
+        return result
+
+    def put_many(self, items):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO analysis VALUES (?, ?, ?)", (
+                (key, data["read_time"], json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+                for key, data in items
+            ))
+
+    def prune(self, keep):
+        """删除不再对应任何文章的结果"""
+        keep = set(keep)
+        stale = [key for key, in self.conn.execute("SELECT hash FROM analysis") if key not in keep]
+        if stale:
+            with self.conn:
+                self.conn.executemany("DELETE FROM analysis WHERE hash = ?", ((key,) for key in stale))
+
+
+def analyze_posts(root, posts):
+    """
+    分析多篇文章（slug、source、hash），返回 {slug: 分析结果}
+
+    hash 是源文件的哈希（post_index 计算），没有变化的文章直接取缓存，不打开文件。
+    """
+    root = root or BLOG_DIR
+    with AnalysisCache(root) as cache:
+        cached = cache.get_many({p["hash"] for p in posts})
+        fresh = {}
+        for post in posts:
+            if post["hash"] in cached or post["hash"] in fresh:
+                continue
+            with open(os.path.join(root, post["source"]), "r", encoding="utf-8") as f:
+                fresh[post["hash"]] = analyze_text(f.read())
+        if fresh:
+            cache.put_many(fresh.items())
+        if fresh or len(cached) != len({p["hash"] for p in posts}):
+            cache.prune(p["hash"] for p in posts)
+    cached.update(fresh)
+    return {p["slug"]: cached[p["hash"]] for p in posts}
+
+
+# ---------- 链接检查 ----------
+
+def resolve_link(url, slug):
+    """
+    站内链接 → (相对站点根目录的路径, 锚点)；站外链接返回 None
+
+    路径相对文章页 posts/<slug>.html 解析；只有锚点时路径就是文章页自己。
+    """
+    url = url.strip()
+    if not url or _SCHEME.match(url):
+        return None
+    path, _, fragment = url.partition("#")
+    path = unquote(path.split("?", 1)[0])
+    if not path:
+        return f"posts/{slug}.html", unquote(fragment)
+    if path.startswith("/"):
+        resolved = posixpath.normpath(path.lstrip("/"))
+    else:
+        resolved = posixpath.normpath(posixpath.join("posts", path))
+    if resolved.endswith("/") or resolved == ".":
+        resolved = posixpath.join(resolved, "index.html").lstrip("./")
+    return resolved, unquote(fragment)
+
+
+def check_links(analyses, root=None, output_dir=None):
+    """
+    检查所有文章的站内链接，返回坏链接 [{"slug", "line", "url", "reason"}]
+
+    文章页之间的链接检查目标文章和其中的标题 id；其他路径检查文件在 root 或 output_dir 中
+    是否存在（列表页等生成的文件应在写出后再检查）。
+    """
+    root = root or BLOG_DIR
+    roots = [root] if not output_dir or output_dir == root else [root, output_dir]
+    anchors = {
+        f"posts/{slug}.html": {h["id"] for h in analysis["headings"]}
+        for slug, analysis in analyses.items()
+    }
+    broken = []
+    for slug, analysis in sorted(analyses.items()):
+        for link in analysis["links"]:
+            target = resolve_link(link["url"], slug)
+            if target is None:
+                continue
+            path, fragment = target
+            if path in anchors:
+                if fragment and fragment not in anchors[path]:
+                    broken.append(dict(link, slug=slug, reason=f"{path} 中没有 #{fragment}"))
+            elif path.startswith("posts/") and path.endswith(".html"):
+                broken.append(dict(link, slug=slug, reason=f"没有文章 {path}"))
+            elif not any(os.path.exists(os.path.join(r, path)) for r in roots):
+                broken.append(dict(link, slug=slug, reason=f"文件不存在: {path}"))
+    return broken
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文章内容分析")
+    parser.add_argument("--outline", metavar="SLUG", help="打印这篇文章的标题树")
+    parser.add_argument("--check", action="store_true", help="有坏链接时以退出码 1 结束")
+    args = parser.parse_args(argv)
+
+    from post_index import PostIndex
+    with PostIndex(BLOG_DIR) as index:
+        index.refresh()
+        posts = index.all()
+    analyses = analyze_posts(BLOG_DIR, posts)
+
+    if args.outline:
+        def show(nodes, depth=0):
+            for node in nodes:
+                print(f"{'  ' * depth}- {node['text']}  #{node['id']}")
+                show(node["children"], depth + 1)
+        show(outline(analyses[args.outline]["headings"]))
+        return 0
+
+    broken = check_links(analyses)
+    for post in posts:
+        a = analyses[post["slug"]]
+        print(f"{post['slug'][:40]:<40} {a['words']:>6} 字  {a['code_lines']:>4} 行代码  "
+              f"{a['read_time']:>3} 分钟  {len(a['headings']):>3} 个标题")
+    for item in broken:
+        print(f"⚠️  {item['slug']}:{item['line']} {item['url']} → {item['reason']}")
+    print(f"📊 {len(posts)} 篇文章，{len(broken)} 个坏链接")
+    return 1 if args.check and broken else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,109 +7,176 @@ AI教程博客自动生成并部署脚本 + 飞书通知
 import os
 import sys
 import json
-import subprocess
+import asyncio
 from datetime import datetime
+from urllib.parse import quote
+
+from content_analyzer import analyze_posts
+import image_pipeline
+import notify_outbox
+import pipeline
+from git_publish import GitPublisher, collect_paths
+import search_index
+import section_cache
+import site_build
+import tracing
+import tutorial_api
+from post_index import open_index
 
 # 飞书用户ID
 FEISHU_USER_ID = "ou_cbeea7989e1b69e855fb519e31a57f34"
 
 # 配置
 BLOG_DIR = "/home/jacory/clawd/projects/tech-blog"
+SITE_URL = "https://serene-mochi-6ec644.netlify.app"
+# 攒够多少天的文章再提交推送（1 表示每天发布）
+PUBLISH_BATCH_DAYS = int(os.environ.get("PUBLISH_BATCH_DAYS", "1"))
+
+# 各阶段超时（秒）
+STAGE_TIMEOUTS = {
+    "generate": 120,
+    "images": 300,
+    "build": 300,
+    "search_index": 300,
+    "render_notification": 30,
+    "publish": 300,
+    "notify": 30,
+}
+
+_publisher = None
+
+def get_publisher():
+    """当前 BLOG_DIR 的 GitPublisher，同一进程内的多次运行（常驻发布进程）共用一个"""
+    global _publisher
+    if _publisher is None or _publisher.repo != BLOG_DIR:
+        _publisher = GitPublisher(BLOG_DIR, batch_days=PUBLISH_BATCH_DAYS)
+    return _publisher
 
-def run_command(cmd, cwd=None):
-    """运行命令并返回结果"""
+def generate_post():
+    """生成今天的文章（进程内调用生成 API）"""
+    print("正在生成今日教程文章...")
     try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            cwd=cwd or BLOG_DIR,
-            capture_output=True,
-            text=True,
-            timeout=120
+        post = tutorial_api.generate_post(
+            output_dir=os.path.join(BLOG_DIR, "content", "posts")
         )
-        return result.returncode == 0, result.stdout, result.stderr
     except Exception as e:
-        return False, "", str(e)
+        print(f"文章生成失败: {e}")
+        return None
+    finally:
+        # 生成阶段在流水线子进程中执行，子进程退出时不执行 atexit，这里写回章节缓存统计
+        section_cache.get_cache().flush()
+    return post.to_dict()
 
-def generate_post():
-    """生成今天的文章"""
-    print("正在生成今日教程文章...")
-    success, stdout, stderr = run_command(
-        f"python3 scripts/generate_ai_tutorial.py",
-        cwd=BLOG_DIR
-    )
-    if success:
-        # 解析输出获取信息
-        title = ""
-        next_title = ""
-        for line in stdout.split("\n"):
-            if "标题:" in line:
-                title = line.split(": ")[1].strip()
-            if "明天预告:" in line:
-                next_title = line.split(": ")[1].strip()
-        return {"title": title, "next_title": next_title}
+def process_images(inputs=None):
+    """生成响应式图片（只处理新增或变化的图片）"""
+    return image_pipeline.process_images(root=BLOG_DIR)
+
+def build_site(inputs=None):
+    """增量构建：只重建变化的文章和依赖它们的列表页"""
+    return site_build.build(root=BLOG_DIR)
+
+def build_search(inputs=None):
+    """增量更新站内搜索索引"""
+    return search_index.build_search_index(root=BLOG_DIR)
+
+async def publish_changes(inputs=None):
+    """只提交本次生成和构建改动的路径；没有变化时跳过提交和推送，返回发布结果"""
+    inputs = inputs or {}
+    post_info = inputs.get("generate")
+    sources = []
+    if post_info:
+        sources.append(f"content/posts/{post_info['filename']}")
+    paths = collect_paths(inputs.get("images"), inputs.get("build"), inputs.get("search_index"),
+                          inputs.get("changes"), sources=sources)
+    
+    outcome = await get_publisher().publish(paths, day=post_info["date"] if post_info else None)
+    status = outcome["status"]
+    if status == "deferred":
+        print(f"已记录 {len(paths)} 个改动路径，攒够 {PUBLISH_BATCH_DAYS} 天后一起发布"
+              f"（当前 {len(outcome['days'])} 天）")
+    elif status == "noop":
+        print("没有需要提交的变化，跳过提交和推送")
     else:
-        print(f"文章生成失败: {stderr}")
-        return None
+        print(f"已提交 {outcome['paths']} 个路径（{len(outcome['days'])} 天），"
+              "推送成功，GitHub Actions将自动部署")
+    return outcome
+
+def changes_stage(changed):
+    """把触发运行的源文件作为一个阶段的结果，交给发布阶段一起暂存"""
+    sources = sorted(changed)
+    return pipeline.Stage("changes", lambda inputs: {"sources": sources})
+
+def publish_stages(changed=()):
+    """
+    不生成文章的构建发布流水线
+
+    changed 是触发这次运行的源文件（如 CMS 修改的 content/site.json），
+    它们不一定出现在各阶段的结果中，随发布一起暂存。
+    """
+    stages = [
+        pipeline.Stage("images", process_images, timeout=STAGE_TIMEOUTS["images"]),
+        pipeline.Stage("build", build_site, deps=["images"], timeout=STAGE_TIMEOUTS["build"]),
+        pipeline.Stage("search_index", build_search, timeout=STAGE_TIMEOUTS["search_index"]),
+    ]
+    deps = ["images", "build", "search_index"]
+    if changed:
+        stages.append(changes_stage(changed))
+        deps.append("changes")
+    stages.append(pipeline.Stage("publish", publish_changes, deps=deps,
+                                 timeout=STAGE_TIMEOUTS["publish"]))
+    return stages
 
 def build_and_deploy():
     """构建并部署"""
     print("正在构建网站...")
-    
-    # 构建
-    success, stdout, stderr = run_command("npm run build:github", cwd=BLOG_DIR)
-    if not success:
-        print(f"构建失败: {stderr}")
-        return False
-    
-    print("构建成功，正在推送到GitHub...")
-    
-    # 配置git
-    run_command('git config user.email "bot@clawd.ai"', cwd=BLOG_DIR)
-    run_command('git config user.name "Clawd Bot"', cwd=BLOG_DIR)
-    
-    # 提交并推送
-    run_command("git add -A", cwd=BLOG_DIR)
-    
-    today = datetime.now().strftime("%Y-%m-%d")
-    success, stdout, stderr = run_command(
-        f'git commit -m "[Auto] Daily AI tutorial - {today}"',
-        cwd=BLOG_DIR
-    )
-    
-    success, stdout, stderr = run_command("git push origin HEAD", cwd=BLOG_DIR)
-    if not success:
-        print(f"推送失败: {stderr}")
+    try:
+        asyncio.run(pipeline.run_pipeline(publish_stages()))
+    except pipeline.PipelineError as e:
+        print(f"部署失败: {e}")
         return False
-    
-    print("推送成功，GitHub Actions将自动部署")
     return True
 
-def send_feishu_notification(post_info):
-    """发送飞书通知"""
+def render_notification(post_info):
+    """生成飞书通知内容"""
     if not post_info:
-        return
+        return None
     
     title = post_info.get("title", "AI教程文章")
     next_title = post_info.get("next_title", "敬请期待")
     today = datetime.now().strftime("%Y-%m-%d")
     
+    # 阅读时间和文章链接从元数据索引读取；Front Matter 没有阅读时间时取内容分析的缓存结果
+    read_time = None
+    post_url = f"{SITE_URL}/posts.html"
+    slug = os.path.splitext(post_info.get("filename", ""))[0]
+    if slug:
+        with open_index(BLOG_DIR, quick=True) as index:
+            post = index.get(slug)
+        if post:
+            read_time = post["meta"].get("readTime") or analyze_posts(BLOG_DIR, [post])[slug]["read_time"]
+            post_url = f"{SITE_URL}/posts/{quote(slug)}.html"
+    
     # 构建通知消息
     message = f"""🎉 今日AI教程博客已发布
 
 📄 文章标题：{title}
-⏱️ 阅读时间：约20分钟
+⏱️ 阅读时间：约{read_time or 5}分钟
 📅 发布日期：{today}
 
-🔗 在线阅读：https://serene-mochi-6ec644.netlify.app/posts.html
-📝 后台管理：https://serene-mochi-6ec644.netlify.app/admin/
+🔗 在线阅读：{post_url}
+📝 后台管理：{SITE_URL}/admin/
 
 📚 明天预告：{next_title}
 
 ---
 每天08:00自动更新，欢迎阅读学习！"""
+    return message
 
-    # 创建通知文件（供飞书工具读取）
+def write_notification(message):
+    """写出通知文件（供飞书工具读取）"""
+    if not message:
+        return None
+    
     notification_file = "/tmp/feishu_notification.txt"
     with open(notification_file, "w", encoding="utf-8") as f:
         f.write(message)
@@ -119,6 +186,58 @@ def send_feishu_notification(post_info):
     
     return message
 
+def notification_key(post_info):
+    """发件箱去重键：同一篇文章同一天只通知一次"""
+    return f"post:{post_info.get('filename', '')}:{post_info.get('date', '')}"
+
+def deliver_notification(post_info, message):
+    """写出通知文件，并通过发件箱投递到飞书 webhook（已配置时）"""
+    write_notification(message)
+    if message:
+        notify_outbox.notify(notification_key(post_info), message)
+    return message
+
+def send_feishu_notification(post_info):
+    """发送飞书通知"""
+    return deliver_notification(post_info, render_notification(post_info))
+
+def require_post():
+    """生成阶段：生成失败时抛出异常"""
+    post_info = generate_post()
+    if not post_info:
+        raise RuntimeError("文章生成失败")
+    print(f"文章生成成功: {post_info['title']}")
+    return post_info
+
+def notify_stage(inputs):
+    """通知阶段：攒批中（还没有推送）时不发通知"""
+    if inputs["publish"]["status"] == "deferred":
+        print("文章尚未推送，暂不发送通知")
+        return None
+    return deliver_notification(inputs["generate"], inputs["render_notification"])
+
+def deploy_stages(changed=()):
+    """每日发布流水线：构建、搜索索引和通知渲染在生成完成后并发执行"""
+    timeout = STAGE_TIMEOUTS
+    extra = [changes_stage(changed)] if changed else []
+    return extra + [
+        pipeline.Stage("generate", lambda inputs: require_post(), timeout=timeout["generate"]),
+        pipeline.Stage("images", process_images, timeout=timeout["images"]),
+        # 页面标记依赖图片清单（srcset、宽高）
+        pipeline.Stage("build", build_site, deps=["generate", "images"], timeout=timeout["build"]),
+        pipeline.Stage("search_index", build_search, deps=["generate"],
+                       timeout=timeout["search_index"]),
+        pipeline.Stage("render_notification",
+                       lambda inputs: render_notification(inputs["generate"]),
+                       deps=["generate"], timeout=timeout["render_notification"]),
+        pipeline.Stage("publish", publish_changes,
+                       deps=["generate", "images", "build", "search_index"]
+                       + [stage.name for stage in extra],
+                       timeout=timeout["publish"]),
+        pipeline.Stage("notify", notify_stage, deps=["generate", "publish", "render_notification"],
+                       timeout=timeout["notify"]),
+    ]
+
 def main():
     """主函数"""
     print("=" * 50)
@@ -126,33 +245,37 @@ def main():
     print(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
     
-    # 1. 生成文章
-    post_info = generate_post()
-    if not post_info:
-        print("文章生成失败")
-        return False
-    
-    print(f"文章生成成功: {post_info['title']}")
-    
-    # 2. 构建并部署
-    if not build_and_deploy():
-        print("部署失败")
+    tracing.reset_tracer("deploy")
+    try:
+        with tracing.span("deploy"):
+            results, report = asyncio.run(pipeline.run_pipeline(deploy_stages()))
+    except pipeline.PipelineError as e:
+        print("=" * 50)
+        print(f"发布失败: {e}")
+        for name, entry in e.report.items():
+            print(f"  {name}: {entry['status']} ({entry['elapsed']:.2f}s)")
         return False
+    finally:
+        # 无论成功失败都写出 trace，方便定位慢在哪个阶段
+        trace_path, summary = tracing.write_trace(root=BLOG_DIR)
+        print(f"⏱️  {summary}\n   trace: {trace_path}")
     
-    # 3. 发送飞书通知
-    notification = send_feishu_notification(post_info)
+    post_info = results["generate"]
+    notification = results["notify"]
     
     print("=" * 50)
     print("全部完成！")
     print(f"文章: {post_info['title']}")
     print(f"明天: {post_info['next_title']}")
+    for name, entry in report.items():
+        print(f"  {name}: {entry['elapsed']:.2f}s")
     print("=" * 50)
     
     # 输出通知内容供外部使用
     if notification:
         print(f"\nFEISHU_NOTIFICATION_START\n{notification}\nFEISHU_NOTIFICATION_END")
     
-    return True, post_info
+    return True
 
 if __name__ == "__main__":
     success = main()
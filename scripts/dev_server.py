@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开发服务器：文件监视 + 内存中增量重建 + 浏览器自动刷新
+
+- 通过 inotify（ctypes 调用 libc，无需第三方库）监视 content/、css/、js/、images/、admin/、
+  根目录的页面和构建模板（site_build.py、templates.py 等）；不支持 inotify 的系统退回轮询 mtime。
+  一连串变化（编辑器保存、CMS 一次写多个文件）合并后只处理一次。
+- 文章页、列表页和归档页在内存中生成，只重建输入签名变化的页面，不写入工作区；
+  其他文件（首页、css/js、图片）直接从磁盘读取。
+- 页面注入一小段脚本，通过 server-sent events（/__livereload）接收变化通知，
+  只有当前页面受影响时才刷新（css/js、模板变化时刷新所有页面）。
+
+用法:
+    python3 scripts/dev_server.py                  # http://localhost:8080
+    python3 scripts/dev_server.py --port 3000 --polling
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import struct
+import select
+import ctypes
+import ctypes.util
+import argparse
+import importlib
+import mimetypes
+import threading
+import posixpath
+import traceback
+from urllib.parse import unquote, urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from blog_utils import BLOG_DIR
+import image_pipeline
+import markdown_render
+import related
+import content_analyzer
+import templates
+import site_build
+
+DEFAULT_PORT = 8080
+# 最后一次变化后安静这么久才开始重建
+DEBOUNCE_SECONDS = 0.15
+# 持续有变化时最多等这么久也要重建一次
+MAX_DELAY_SECONDS = 1.0
+POLL_INTERVAL = 0.5
+# SSE 连接的心跳间隔
+KEEPALIVE_SECONDS = 15
+LIVERELOAD_PATH = "/__livereload"
+
+WATCH_DIRS = ("content", "css", "js", "images", "admin")
+# 修改后需要重新加载模块并全量重建的模板代码（按依赖顺序）
+TEMPLATE_MODULES = (templates, image_pipeline, markdown_render, content_analyzer, related, site_build)
+IGNORED_DIRS = {".git", ".cache", "node_modules", "dist", "__pycache__"}
+
+LIVERELOAD_SCRIPT = b"""<script>
+(function () {
+    var page = decodeURIComponent(location.pathname).replace(/^\\//, '').replace(/(^|\\/)$/, '$1index.html');
+    var source = new EventSource('""" + LIVERELOAD_PATH.encode() + b"""');
+    source.onmessage = function (event) {
+        var change = JSON.parse(event.data);
+        if (change.all || change.paths.indexOf(page) !== -1) location.reload();
+    };
+})();
+</script>
+"""
+
+
+# ---------- 文件监视 ----------
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")
+
+# 任何变化都可能影响页面时返回的特殊路径
+ALL_CHANGED = "*"
+
+
+class InotifyWatcher:
+    """
+    用 inotify 监视目录：dirs 递归监视，flat_dirs 只监视目录本身的文件；
+    poll() 返回相对 root 的变化路径集合（根目录下只关心 .html）
+    """
+
+    def __init__(self, root, dirs, flat_dirs=()):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.root = root = os.path.normpath(root)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.watches = {}
+        self.flat = {os.path.normpath(os.path.join(root, d)) for d in flat_dirs}
+        for directory in dirs:
+            self._add_tree(os.path.join(root, directory))
+        for directory in flat_dirs:
+            self._add(os.path.normpath(os.path.join(root, directory)))
+
+    def _add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(err, f"inotify_add_watch {path}: {os.strerror(err)}")
+        self.watches[wd] = path
+
+    def _add_tree(self, top):
+        if not os.path.isdir(top):
+            return
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS and not d.startswith(".")]
+            self._add(dirpath)
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.add(ALL_CHANGED)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and directory not in self.flat:
+                    # 新目录：加入监视，其中已有的文件也算变化
+                    self._add_tree(path)
+                    for dirpath, _, filenames in os.walk(path):
+                        changed.update(os.path.join(dirpath, f) for f in filenames)
+                continue
+            if directory == self.root and not path.endswith(".html"):
+                continue
+            changed.add(path)
+        return {p if p == ALL_CHANGED else os.path.relpath(p, self.root).replace(os.sep, "/")
+                for p in changed}
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """轮询 mtime 的后备实现，接口与 InotifyWatcher 相同"""
+
+    def __init__(self, root, dirs, flat_dirs=()):
+        self.root = os.path.normpath(root)
+        self.dirs = dirs
+        self.flat_dirs = flat_dirs
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        state = {}
+        for directory in self.dirs:
+            for dirpath, dirnames, filenames in os.walk(os.path.join(self.root, directory)):
+                dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS and not d.startswith(".")]
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    state[path] = (st.st_mtime_ns, st.st_size)
+        for directory in self.flat_dirs:
+            base = os.path.normpath(os.path.join(self.root, directory))
+            for entry in os.scandir(base):
+                if entry.is_file() and (base != self.root or entry.name.endswith(".html")):
+                    st = entry.stat()
+                    state[entry.path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def poll(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {p for p in current.keys() | self.snapshot.keys()
+                       if current.get(p) != self.snapshot.get(p)}
+            self.snapshot = current
+            if changed or time.monotonic() >= deadline:
+                return {os.path.relpath(p, self.root).replace(os.sep, "/") for p in changed}
+            time.sleep(min(POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+def make_watcher(root, polling=False, dirs=WATCH_DIRS, flat_dirs=(".", "scripts")):
+    """
+    优先使用 inotify，不可用时（非 Linux、句柄数不够）退回轮询
+
+    默认监视开发服务器关心的目录；根目录的手写页面和 scripts/ 中的模板代码不递归监视。
+    """
+    dirs = [d for d in dirs if os.path.isdir(os.path.join(root, d))]
+    if not polling:
+        try:
+            return InotifyWatcher(root, dirs, flat_dirs), "inotify"
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, dirs, flat_dirs), "轮询"
+
+
+def debounced_changes(watcher, stop):
+    """产出合并后的一批变化路径"""
+    while not stop.is_set():
+        changed = watcher.poll(1.0)
+        if not changed:
+            continue
+        deadline = time.monotonic() + MAX_DELAY_SECONDS
+        while time.monotonic() < deadline:
+            more = watcher.poll(DEBOUNCE_SECONDS)
+            if not more:
+                break
+            changed |= more
+        yield changed
+
+
+# ---------- 内存中的站点 ----------
+
+class DevSite:
+    """文章页和列表页保存在内存中，按输入签名增量重建"""
+
+    def __init__(self, root):
+        self.root = root
+        self.pages = {}
+        self.signatures = {}
+        self.lock = threading.Lock()
+
+    def get(self, rel):
+        with self.lock:
+            return self.pages.get(rel)
+
+    def rebuild(self, full=False):
+        """重建输入有变化的页面，返回变化的页面路径"""
+        started = time.perf_counter()
+        if full:
+            self.signatures = {}
+        template = site_build.template_version()
+        posts, _ = site_build.load_posts(self.root, {})
+        all_meta = [dict(p["meta"], slug=p["slug"]) for p in posts]
+        meta_by_slug = {m["slug"]: m for m in all_meta}
+        analyses = content_analyzer.analyze_posts(self.root, posts)
+        site_build.fill_read_time(all_meta, analyses)
+        images = image_pipeline.ImageCatalog.load(self.root)
+        related_slugs, _ = related.related_map(self.root, posts, full)
+
+        pages = {}
+        signatures = {}
+        to_render = []
+        for post in posts:
+            meta = meta_by_slug[post["slug"]]
+            rel = f"posts/{post['slug']}.html"
+            signatures[rel] = site_build.page_signature(
+                template, post, site_build.related_posts(meta, meta_by_slug, related_slugs),
+                site_build.page_image_keys(meta, analyses.get(post["slug"]), images),
+            )
+            if signatures[rel] != self.signatures.get(rel):
+                to_render.append((rel, post))
+        bodies = [site_build.read_body(self.root, post["source"]) for _, post in to_render]
+        for (rel, post), html in zip(to_render, site_build.render_markdown_batch(bodies, self.root)):
+            meta = meta_by_slug[post["slug"]]
+            pages[rel] = b"".join(site_build.generate_post_page(
+                meta, html, site_build.related_posts(meta, meta_by_slug, related_slugs), images
+            ))
+
+        if all_meta:
+            card_keys = {m["slug"]: site_build.card_key(m, images) for m in all_meta}
+            cards = {}
+            for page in site_build.list_pages(all_meta):
+                rel = page["path"]
+                signatures[rel] = site_build.list_page_signature(template, page, card_keys)
+                if signatures[rel] != self.signatures.get(rel):
+                    pages[rel] = b"".join(site_build.generate_list_page(page, images, cards=cards))
+
+        removed = set(self.signatures) - set(signatures)
+        with self.lock:
+            self.pages.update(pages)
+            for rel in removed:
+                self.pages.pop(rel, None)
+            self.signatures = signatures
+        changed = sorted(set(pages) | removed)
+        print(f"🔄 重建 {len(pages)} 个页面，移除 {len(removed)} 个，"
+              f"耗时 {time.perf_counter() - started:.2f}s", flush=True)
+        return changed
+
+
+def reload_templates():
+    """重新加载模板代码（按依赖顺序），失败时保留旧模块"""
+    for module in TEMPLATE_MODULES:
+        importlib.reload(module)
+
+
+# ---------- 自动刷新 ----------
+
+class Broadcaster:
+    """把变化通知推送给所有 SSE 连接"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.message = b""
+
+    def publish(self, paths=(), all_pages=False):
+        data = json.dumps({"all": all_pages, "paths": sorted(paths)}, ensure_ascii=False)
+        with self.condition:
+            self.version += 1
+            self.message = f"data: {data}\n\n".encode("utf-8")
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        """等待新消息，返回 (版本, 消息)；超时返回 (原版本, None)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            if self.version == version:
+                return version, None
+            return self.version, self.message
+
+
+def classify(changed):
+    """
+    把变化路径分为 (需要重新加载模板, 需要重建页面, 需要刷新的磁盘文件, 是否刷新所有页面)
+    """
+    template_files = {f"scripts/{os.path.basename(m.__file__)}" for m in TEMPLATE_MODULES}
+    reload_code = bool(changed & template_files)
+    everything = reload_code or ALL_CHANGED in changed
+    rebuild = everything or any(p.startswith("content/posts/") for p in changed)
+    static = {p for p in changed if p.endswith(".html") and not p.startswith("admin/")}
+    # 样式、脚本、图片和 about/contact 读取的 JSON 可能出现在任何页面上
+    all_pages = everything or any(
+        p.startswith(("css/", "js/", "images/", "content/images/"))
+        or (p.startswith("content/") and p.endswith(".json"))
+        for p in changed
+    )
+    return reload_code, rebuild, static, all_pages
+
+
+def watch_loop(site, broadcaster, watcher, stop):
+    for changed in debounced_changes(watcher, stop):
+        names = sorted(p for p in changed if p != ALL_CHANGED)
+        print(f"📝 变化: {', '.join(names[:5])}{' ...' if len(names) > 5 else ''}", flush=True)
+        reload_code, rebuild, static, all_pages = classify(changed)
+        pages = set(static)
+        try:
+            if reload_code:
+                reload_templates()
+            if rebuild:
+                pages.update(site.rebuild(full=reload_code))
+        except Exception:
+            # 模板或文章有错误时保留上一次的页面，修好后下一次变化会重新构建
+            traceback.print_exc()
+            continue
+        if pages or all_pages:
+            broadcaster.publish(pages, all_pages)
+
+
+# ---------- HTTP ----------
+
+class DevHandler(BaseHTTPRequestHandler):
+    site = None
+    broadcaster = None
+    root = BLOG_DIR
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path)
+        if path == LIVERELOAD_PATH:
+            return self.serve_events()
+        rel = path.lstrip("/")
+        if rel == "" or rel.endswith("/"):
+            rel += "index.html"
+        rel = posixpath.normpath(rel)
+        if rel.startswith("..") or any(part.startswith(".") or part in IGNORED_DIRS
+                                       for part in rel.split("/")):
+            return self.send_error(404)
+
+        body = self.site.get(rel)
+        if body is None:
+            full_path = os.path.join(self.root, rel)
+            if os.path.isdir(full_path):
+                self.send_response(301)
+                self.send_header("Location", path.rstrip("/") + "/")
+                self.end_headers()
+                return
+            try:
+                with open(full_path, "rb") as f:
+                    body = f.read()
+            except (FileNotFoundError, IsADirectoryError):
+                return self.send_error(404)
+        content_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        if content_type == "text/html":
+            body = inject_livereload(body)
+            content_type += "; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def serve_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "keep-alive")
+        self.end_headers()
+        version = self.broadcaster.version
+        try:
+            self.wfile.write(b": connected\n\n")
+            self.wfile.flush()
+            while True:
+                version, message = self.broadcaster.wait(version, KEEPALIVE_SECONDS)
+                self.wfile.write(message or b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def inject_livereload(html):
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + LIVERELOAD_SCRIPT
+    return html[:index] + LIVERELOAD_SCRIPT + html[index:]
+
+
+def serve(root=None, host="127.0.0.1", port=DEFAULT_PORT, polling=False):
+    root = root or BLOG_DIR
+    site = DevSite(root)
+    print("📦 执行初始构建...")
+    site.rebuild()
+    broadcaster = Broadcaster()
+    watcher, mode = make_watcher(root, polling)
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_loop, args=(site, broadcaster, watcher, stop), daemon=True)
+    thread.start()
+
+    handler = type("Handler", (DevHandler,), {"site": site, "broadcaster": broadcaster, "root": root})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"👀 文件监视: {mode}（{', '.join(WATCH_DIRS)}、模板代码）")
+    print(f"🌐 网站地址: http://{host}:{port}")
+    print(f"📝 管理后台: http://{host}:{port}/admin\n")
+    print("💡 提示: 按 Ctrl+C 停止服务器\n", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 停止服务器...")
+    finally:
+        stop.set()
+        server.server_close()
+        watcher.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="开发服务器（监视、内存增量重建、自动刷新）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--polling", action="store_true", help="不使用 inotify，轮询文件变化")
+    args = parser.parse_args(argv)
+    serve(host=args.host, port=args.port, polling=args.polling)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
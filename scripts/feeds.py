@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS / Atom 订阅源和站点地图
+
+由文章元数据生成，XML 按元素流式写出，不拼接整个文档:
+    - feed.xml（RSS 2.0）和 atom.xml：最新的 FEED_SIZE 篇文章；
+    - sitemap.xml：站点地图索引，指向 sitemap-pages.xml（首页、列表页、归档页）
+      和 sitemap-posts-<k>.xml（文章页，从最旧的一篇起每 SITEMAP_CHUNK 篇一个文件）。
+
+新文章只进入最新的文章分片，旧分片成员不变；每个文件按内容签名判断是否重写。
+每篇文章的 lastmod 记录在 .cache/feeds-manifest.json：第一次出现时取发布日期，
+之后源文件哈希变化时更新为当时的时间，列表页和分片的 lastmod 取其中文章的最大值。
+
+用法:
+    python3 scripts/feeds.py          # 按文章索引更新订阅源和站点地图
+    python3 scripts/feeds.py --full   # 重写所有文件（保留 lastmod 记录）
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import datetime
+from email.utils import format_datetime
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from blog_utils import (
+    BLOG_DIR, atomic_write_chunks, cache_path, load_json, save_json, text_sha256, parse_post_date,
+)
+
+MANIFEST_NAME = "feeds-manifest.json"
+# 输出格式变化时递增，所有文件重写
+FEEDS_VERSION = 1
+DEFAULT_SITE_URL = "https://serene-mochi-6ec644.netlify.app"
+SITE_TITLE = "TechBlog"
+SITE_DESCRIPTION = "分享AI、前端、后端技术干货"
+
+FEED_SIZE = 20
+# 协议限制：每个站点地图最多 50000 个 URL、50MB；文章 URL 远小于 1KB，按条数切分即可
+SITEMAP_CHUNK = 50000
+RSS_NAME = "feed.xml"
+ATOM_NAME = "atom.xml"
+SITEMAP_NAME = "sitemap.xml"
+PAGES_SITEMAP_NAME = "sitemap-pages.xml"
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+
+def site_url(root=None):
+    """站点地址：admin/config.yml 的 site_url，没有时用默认地址"""
+    root = root or BLOG_DIR
+    try:
+        with open(os.path.join(root, "admin", "config.yml"), "r", encoding="utf-8") as f:
+            match = re.search(r"^site_url:\s*[\"']?([^\"'\s#]+)", f.read(), re.M)
+    except OSError:
+        match = None
+    return (match.group(1) if match else DEFAULT_SITE_URL).rstrip("/")
+
+
+def page_url(base, path):
+    return f"{base}/{quote(path)}"
+
+
+def post_path(slug):
+    return f"posts/{slug}.html"
+
+
+# ---------- 流式 XML ----------
+
+class XMLWriter:
+    """
+    逐个元素产出 XML 文本片段
+
+    start / end / element 返回字符串，调用方按顺序 yield 出去即可；
+    end 不需要标签名，由栈保证开闭配对。
+    """
+
+    def __init__(self, indent="  "):
+        self.indent = indent
+        self.stack = []
+
+    @staticmethod
+    def declaration():
+        return '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+    @staticmethod
+    def _attrs(attrs):
+        return "".join(f" {key}={quoteattr(str(value))}" for key, value in attrs.items() if value is not None)
+
+    def start(self, tag, **attrs):
+        text = f"{self.indent * len(self.stack)}<{tag}{self._attrs(attrs)}>\n"
+        self.stack.append(tag)
+        return text
+
+    def end(self):
+        tag = self.stack.pop()
+        return f"{self.indent * len(self.stack)}</{tag}>\n"
+
+    def element(self, tag, text=None, **attrs):
+        pad = self.indent * len(self.stack)
+        if text is None:
+            return f"{pad}<{tag}{self._attrs(attrs)}/>\n"
+        return f"{pad}<{tag}{self._attrs(attrs)}>{escape(str(text))}</{tag}>\n"
+
+
+# ---------- 时间 ----------
+
+def _aware(value):
+    """本地时间的 ISO 字符串 → 带时区的 datetime"""
+    return datetime.fromisoformat(value).astimezone()
+
+
+def w3c_time(value):
+    return _aware(value).isoformat(timespec="seconds")
+
+
+def rfc822_time(value):
+    return format_datetime(_aware(value))
+
+
+# ---------- 文档 ----------
+
+def iter_rss(base, posts, updated):
+    xml = XMLWriter()
+    yield xml.declaration()
+    yield xml.start("rss", **{"version": "2.0", "xmlns:atom": ATOM_NS})
+    yield xml.start("channel")
+    yield xml.element("title", SITE_TITLE)
+    yield xml.element("link", f"{base}/")
+    yield xml.element("description", SITE_DESCRIPTION)
+    yield xml.element("language", "zh-CN")
+    yield xml.element("atom:link", href=f"{base}/{RSS_NAME}", rel="self", type="application/rss+xml")
+    if updated:
+        yield xml.element("lastBuildDate", rfc822_time(updated))
+    for post in posts:
+        link = page_url(base, post_path(post["slug"]))
+        yield xml.start("item")
+        yield xml.element("title", post.get("title") or post["slug"])
+        yield xml.element("link", link)
+        yield xml.element("guid", link, isPermaLink="true")
+        yield xml.element("pubDate", rfc822_time(post["date"]))
+        for category in [post.get("category")] + list(post.get("tags") or []):
+            if category:
+                yield xml.element("category", category)
+        yield xml.element("description", post.get("excerpt") or "")
+        yield xml.end()
+    yield xml.end()
+    yield xml.end()
+
+
+def iter_atom(base, posts, updated):
+    xml = XMLWriter()
+    yield xml.declaration()
+    yield xml.start("feed", xmlns=ATOM_NS, **{"xml:lang": "zh-CN"})
+    yield xml.element("title", SITE_TITLE)
+    yield xml.element("subtitle", SITE_DESCRIPTION)
+    yield xml.element("id", f"{base}/")
+    yield xml.element("link", href=f"{base}/")
+    yield xml.element("link", href=f"{base}/{ATOM_NAME}", rel="self", type="application/atom+xml")
+    yield xml.element("updated", w3c_time(updated) if updated else "1970-01-01T00:00:00Z")
+    for post in posts:
+        link = page_url(base, post_path(post["slug"]))
+        yield xml.start("entry")
+        yield xml.element("title", post.get("title") or post["slug"])
+        yield xml.element("id", link)
+        yield xml.element("link", href=link)
+        yield xml.element("published", w3c_time(post["date"]))
+        yield xml.element("updated", w3c_time(post["lastmod"]))
+        if post.get("author"):
+            yield xml.start("author")
+            yield xml.element("name", post["author"])
+            yield xml.end()
+        for category in [post.get("category")] + list(post.get("tags") or []):
+            if category:
+                yield xml.element("category", term=category)
+        yield xml.element("summary", post.get("excerpt") or "")
+        yield xml.end()
+    yield xml.end()
+
+
+def iter_urlset(entries):
+    """entries: [(绝对地址, lastmod 或 None)]"""
+    xml = XMLWriter()
+    yield xml.declaration()
+    yield xml.start("urlset", xmlns=SITEMAP_NS)
+    for loc, lastmod in entries:
+        yield xml.start("url")
+        yield xml.element("loc", loc)
+        if lastmod:
+            yield xml.element("lastmod", w3c_time(lastmod))
+        yield xml.end()
+    yield xml.end()
+
+
+def iter_sitemap_index(entries):
+    xml = XMLWriter()
+    yield xml.declaration()
+    yield xml.start("sitemapindex", xmlns=SITEMAP_NS)
+    for loc, lastmod in entries:
+        yield xml.start("sitemap")
+        yield xml.element("loc", loc)
+        if lastmod:
+            yield xml.element("lastmod", w3c_time(lastmod))
+        yield xml.end()
+    yield xml.end()
+
+
+# ---------- 增量更新 ----------
+
+def post_lastmods(posts, known, now=None):
+    """
+    每篇文章的 lastmod：新文章取发布日期，源文件哈希变化时取 now
+
+    known 是上次记录的 {slug: {"hash", "lastmod"}}，返回新的记录。
+    """
+    now = now or datetime.now().isoformat(timespec="seconds")
+    records = {}
+    for post in posts:
+        old = known.get(post["slug"])
+        if old is None:
+            lastmod = post["date"]
+        elif old["hash"] != post["hash"]:
+            lastmod = max(now, post["date"])
+        else:
+            lastmod = old["lastmod"]
+        records[post["slug"]] = {"hash": post["hash"], "lastmod": lastmod}
+    return records
+
+
+def sitemap_chunks(posts):
+    """文章（按日期倒序）→ 分片列表 [[文章, ...]]，从最旧的一篇起每 SITEMAP_CHUNK 篇一片"""
+    oldest_first = posts[::-1]
+    return [oldest_first[i:i + SITEMAP_CHUNK] for i in range(0, len(oldest_first), SITEMAP_CHUNK)]
+
+
+def plan_files(base, posts, list_pages=()):
+    """
+    需要生成的所有文件：[(路径, 签名依据, 产出文本片段的函数)]
+
+    posts 按日期倒序且带 lastmod；list_pages 是 site_build.list_pages 的结果（只用路径和成员）。
+    """
+    files = []
+    newest = max((p["lastmod"] for p in posts), default=None)
+
+    window = posts[:FEED_SIZE]
+    window_key = [[p["slug"], p.get("title"), p.get("excerpt"), p.get("category"), p.get("tags"),
+                   p.get("author"), p["date"], p["lastmod"]] for p in window]
+    window_updated = max((p["lastmod"] for p in window), default=None)
+    files.append((RSS_NAME, window_key, lambda: iter_rss(base, window, window_updated)))
+    files.append((ATOM_NAME, window_key, lambda: iter_atom(base, window, window_updated)))
+
+    lastmod = {p["slug"]: p["lastmod"] for p in posts}
+    page_entries = [(f"{base}/", newest)]
+    for page in list_pages:
+        members = [lastmod[p["slug"]] for p in page["posts"] if p["slug"] in lastmod]
+        page_entries.append((page_url(base, page["path"]), max(members, default=None)))
+    for path in ("about.html", "contact.html"):
+        page_entries.append((page_url(base, path), None))
+    files.append((PAGES_SITEMAP_NAME, page_entries, lambda: iter_urlset(page_entries)))
+
+    index_entries = [(page_url(base, PAGES_SITEMAP_NAME), max((m for _, m in page_entries if m), default=None))]
+    for k, chunk in enumerate(sitemap_chunks(posts), 1):
+        entries = [(page_url(base, post_path(p["slug"])), p["lastmod"]) for p in chunk]
+        name = f"sitemap-posts-{k}.xml"
+        files.append((name, entries, lambda entries=entries: iter_urlset(entries)))
+        index_entries.append((page_url(base, name), max(m for _, m in entries)))
+    files.append((SITEMAP_NAME, index_entries, lambda: iter_sitemap_index(index_entries)))
+    return files
+
+
+def update(root=None, output_dir=None, posts=(), list_pages=(), full=False):
+    """
+    更新订阅源和站点地图，返回 {"written": [...], "deleted": [...]}（相对 output_dir 的路径）
+
+    posts 是按日期倒序的文章元数据（Front Matter 加 slug、hash），签名没变的文件不重写。
+    """
+    root = root or BLOG_DIR
+    output_dir = output_dir or root
+    manifest_path = cache_path(MANIFEST_NAME, root)
+    manifest = load_json(manifest_path, {}) or {}
+    base = site_url(root)
+    posts = [dict(p, date=parse_post_date(p.get("date")).isoformat(timespec="seconds")) for p in posts]
+    records = post_lastmods(posts, manifest.get("posts", {}))
+    posts = [dict(p, lastmod=records[p["slug"]]["lastmod"]) for p in posts]
+
+    old_files = {} if full or manifest.get("version") != FEEDS_VERSION else manifest.get("files", {})
+    files = {}
+    written = []
+    for path, key, chunks in plan_files(base, posts, list_pages):
+        signature = text_sha256(json.dumps([base, key], ensure_ascii=False))
+        files[path] = signature
+        output = os.path.join(output_dir, path)
+        if old_files.get(path) == signature and os.path.exists(output):
+            continue
+        atomic_write_chunks(output, chunks(), fsync=False)
+        written.append(path)
+
+    deleted = []
+    for path in set(manifest.get("files", {})) - set(files):
+        output = os.path.join(output_dir, path)
+        if os.path.exists(output):
+            os.remove(output)
+            deleted.append(path)
+
+    save_json(manifest_path, {"version": FEEDS_VERSION, "posts": records, "files": files})
+    return {"written": written, "deleted": deleted}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成 RSS / Atom 订阅源和站点地图")
+    parser.add_argument("--full", action="store_true", help="重写所有文件")
+    args = parser.parse_args(argv)
+
+    import site_build
+    from post_index import PostIndex
+    with PostIndex(BLOG_DIR) as index:
+        index.refresh()
+        posts = [dict(p["meta"], slug=p["slug"], hash=p["hash"]) for p in index.all()]
+    result = update(BLOG_DIR, posts=posts, list_pages=site_build.list_pages(posts), full=args.full)
+    for path in result["written"]:
+        print(f"✅ 生成: {path}")
+    for path in result["deleted"]:
+        print(f"🗑️  删除: {path}")
+    print(f"📡 {len(posts)} 篇文章，写入 {len(result['written'])} 个文件，删除 {len(result['deleted'])} 个")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
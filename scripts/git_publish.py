@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+精确发布到 git
+
+只暂存构建实际改动的路径（文章源文件、posts/*.html、列表页和归档页、search/ 分片），
+不再对整个仓库（包括 node_modules）执行 git add -A。暂存后没有差异就跳过提交和推送。
+
+可以把几天的运行攒成一次提交：每次运行的路径先记在 .cache/publish-pending.json，
+攒够 batch_days 天（或 flush=True）时一起暂存、提交、推送；推送失败时提交留在本地，
+下次运行会先补推。
+
+用法:
+    python3 scripts/git_publish.py --status          # 查看待发布的路径
+    python3 scripts/git_publish.py --flush           # 立即提交并推送待发布的路径
+    python3 scripts/git_publish.py --self-test       # 在临时的本地裸仓库上检查发布流程
+
+--self-test 在临时目录中创建工作仓库和裸仓库，依次检查：只推送指定路径、无差异时跳过、
+攒批、删除、推送失败后补推、游离 HEAD 时报错。也可以手动在本地裸仓库上试验:
+    git init --bare /tmp/blog-remote.git
+    git remote add test /tmp/blog-remote.git
+    python3 scripts/git_publish.py --remote test --flush
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+
+from blog_utils import BLOG_DIR, cache_path, ensure_dir, load_json, save_json
+from pipeline import CommandError, run_command
+
+PENDING_NAME = "publish-pending.json"
+DEFAULT_REMOTE = "origin"
+AUTHOR_NAME = "Clawd Bot"
+AUTHOR_EMAIL = "bot@clawd.ai"
+# 单条 git 命令最多带多少个路径，避免超出命令行长度限制
+PATHS_PER_COMMAND = 200
+
+
+class PublishError(Exception):
+    """仓库状态不允许发布（如 HEAD 游离）"""
+
+
+def collect_paths(*results, sources=()):
+    """从各阶段的构建结果（图片、页面、搜索索引）收集需要发布的路径（相对仓库根目录）"""
+    paths = set(sources)
+    for result in results:
+        if not result:
+            continue
+        paths.update(result.get("written", []))
+        paths.update(result.get("deleted", []))
+        paths.update(result.get("sources", []))
+    return sorted(p.replace(os.sep, "/") for p in paths)
+
+
+def _chunks(items, size=PATHS_PER_COMMAND):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class GitPublisher:
+    """把指定路径提交并推送到远程仓库"""
+
+    def __init__(self, repo=None, remote=DEFAULT_REMOTE, batch_days=1, timeout=120,
+                 pending_path=None):
+        self.repo = repo or BLOG_DIR
+        self.remote = remote
+        self.batch_days = max(1, batch_days)
+        self.timeout = timeout
+        self.pending_path = pending_path or cache_path(PENDING_NAME, self.repo)
+
+    async def git(self, *args, check=True):
+        return await run_command(
+            ["git", "-c", f"user.name={AUTHOR_NAME}", "-c", f"user.email={AUTHOR_EMAIL}", *args],
+            cwd=self.repo, timeout=self.timeout, check=check,
+        )
+
+    def load_pending(self):
+        """{日期: [路径, ...]}"""
+        return load_json(self.pending_path, {}) or {}
+
+    def add_pending(self, paths, day=None):
+        """记录一次运行改动的路径，返回当前待发布的内容"""
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        pending = self.load_pending()
+        pending[day] = sorted(set(pending.get(day, [])) | set(paths))
+        save_json(self.pending_path, pending)
+        return pending
+
+    def clear_pending(self):
+        if os.path.exists(self.pending_path):
+            os.remove(self.pending_path)
+
+    async def stage(self, paths):
+        """只暂存这些路径：存在的 git add，已删除的从索引移除"""
+        present = [p for p in paths if os.path.lexists(os.path.join(self.repo, p))]
+        missing = sorted(set(paths) - set(present))
+        for chunk in _chunks(present):
+            await self.git("add", "--", *chunk)
+        for chunk in _chunks(missing):
+            await self.git("rm", "--cached", "--quiet", "--ignore-unmatch", "--", *chunk)
+
+    async def staged_paths(self, paths):
+        """这些路径中与 HEAD 有差异的暂存路径"""
+        staged = []
+        for chunk in _chunks(paths):
+            result = await self.git("diff", "--cached", "--name-only", "-z", "--", *chunk)
+            staged.extend(p for p in result.stdout.split("\0") if p)
+        return staged
+
+    async def commit(self, paths, message):
+        """只提交这些路径（路径列表通过文件传给 git，不受命令行长度限制）"""
+        spec = cache_path("publish-pathspec", self.repo)
+        ensure_dir(os.path.dirname(spec))
+        with open(spec, "w", encoding="utf-8") as f:
+            f.write("\0".join(paths))
+        try:
+            await self.git("commit", "--quiet", "-m", message,
+                           f"--pathspec-from-file={spec}", "--pathspec-file-nul")
+        finally:
+            os.remove(spec)
+
+    async def branch(self):
+        """当前检出的分支名；HEAD 游离时没有可推送的分支，抛出 PublishError"""
+        result = await self.git("symbolic-ref", "--quiet", "--short", "HEAD", check=False)
+        branch = result.stdout.strip()
+        if result.returncode != 0 or not branch:
+            raise PublishError(f"{self.repo} 的 HEAD 处于游离状态，请先检出要发布的分支")
+        return branch
+
+    async def unpushed(self, branch):
+        """本地分支是否有远程还没有的提交（没有远程分支时视为有）"""
+        local = await self.git("rev-parse", "--verify", "--quiet", "HEAD", check=False)
+        if local.returncode != 0:
+            return False
+        ref = f"refs/remotes/{self.remote}/{branch}"
+        remote = await self.git("rev-parse", "--verify", "--quiet", ref, check=False)
+        if remote.returncode != 0:
+            return True
+        ahead = await self.git("rev-list", "--count", f"{ref}..HEAD")
+        return int(ahead.stdout.strip() or 0) > 0
+
+    @staticmethod
+    def commit_message(days):
+        if len(days) == 1:
+            return f"[Auto] Daily AI tutorial - {days[0]}"
+        return f"[Auto] Daily AI tutorials - {days[0]} ~ {days[-1]} ({len(days)} days)"
+
+    async def publish(self, paths, day=None, flush=False):
+        """
+        记录并（攒够天数时）发布，返回 {"status": ..., "days": [...], "paths": n}
+
+        status: deferred（攒批中）/ noop（没有差异，未推送）/ pushed（提交并推送）/
+        pushed-pending（没有新提交，补推之前推送失败的提交）
+        """
+        # 没有改动的运行不计入攒批天数
+        pending = self.add_pending(paths, day) if paths else self.load_pending()
+        days = sorted(pending)
+        all_paths = sorted({p for day_paths in pending.values() for p in day_paths})
+        outcome = {"status": "deferred", "days": days, "paths": len(all_paths)}
+        if not flush and days and len(days) < self.batch_days:
+            return outcome
+
+        # 先确认分支，HEAD 游离时待发布的路径原样保留
+        branch = await self.branch()
+        await self.stage(all_paths)
+        staged = await self.staged_paths(all_paths)
+        if staged:
+            await self.commit(staged, self.commit_message(days))
+            outcome["status"] = "pushed"
+        elif await self.unpushed(branch):
+            outcome["status"] = "pushed-pending"
+        else:
+            self.clear_pending()
+            outcome["status"] = "noop"
+            return outcome
+
+        # 提交已经记录在本地，推送失败时下次运行会补推
+        self.clear_pending()
+        await self.git("push", self.remote, f"HEAD:refs/heads/{branch}")
+        return outcome
+
+
+async def _remote_files(remote, branch="main"):
+    result = await run_command(["git", "--git-dir", remote, "ls-tree", "-r", "--name-only", branch])
+    return set(result.stdout.split())
+
+
+async def self_test(workdir):
+    """在 workdir 中的工作仓库和本地裸仓库上走一遍发布流程，返回 [(检查项, 是否通过)]"""
+    remote = os.path.join(workdir, "remote.git")
+    repo = os.path.join(workdir, "repo")
+    await run_command(["git", "init", "--quiet", "--bare", remote])
+    await run_command(["git", "init", "--quiet", "-b", "main", repo])
+    publisher = GitPublisher(repo, remote="test", pending_path=os.path.join(workdir, "pending.json"))
+    await publisher.git("remote", "add", "test", remote)
+
+    def write(path, text="x"):
+        full = os.path.join(repo, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    checks = []
+    write("content/posts/a.md")
+    write("node_modules/noise.js")
+    outcome = await publisher.publish(["content/posts/a.md"])
+    files = await _remote_files(remote)
+    checks.append(("只推送指定路径", outcome["status"] == "pushed" and files == {"content/posts/a.md"}))
+
+    outcome = await publisher.publish(["content/posts/a.md"])
+    checks.append(("没有差异时跳过提交和推送", outcome["status"] == "noop"))
+
+    publisher.batch_days = 2
+    write("content/posts/b.md")
+    first = await publisher.publish(["content/posts/b.md"], day="2026-01-01")
+    write("content/posts/c.md")
+    second = await publisher.publish(["content/posts/c.md"], day="2026-01-02")
+    subject = (await publisher.git("log", "-1", "--format=%s")).stdout.strip()
+    checks.append(("攒够天数后一起提交", first["status"] == "deferred" and second["status"] == "pushed"
+                   and subject == GitPublisher.commit_message(["2026-01-01", "2026-01-02"])))
+    publisher.batch_days = 1
+
+    os.remove(os.path.join(repo, "content/posts/a.md"))
+    await publisher.publish(["content/posts/a.md"])
+    checks.append(("删除的文件从远程移除", "content/posts/a.md" not in await _remote_files(remote)))
+
+    await publisher.git("remote", "set-url", "test", os.path.join(workdir, "missing.git"))
+    write("content/posts/d.md")
+    try:
+        await publisher.publish(["content/posts/d.md"])
+        failed = False
+    except CommandError:
+        failed = True
+    await publisher.git("remote", "set-url", "test", remote)
+    outcome = await publisher.publish([])
+    checks.append(("推送失败后下次补推", failed and outcome["status"] == "pushed-pending"
+                   and "content/posts/d.md" in await _remote_files(remote)))
+
+    await publisher.git("checkout", "--quiet", "--detach")
+    write("content/posts/e.md")
+    try:
+        await publisher.publish(["content/posts/e.md"])
+        detached = False
+    except PublishError:
+        detached = True
+    pending = {p for paths in publisher.load_pending().values() for p in paths}
+    checks.append(("HEAD 游离时报错并保留待发布路径", detached and "content/posts/e.md" in pending))
+    return checks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="精确发布到 git")
+    parser.add_argument("--status", action="store_true", help="查看待发布的路径")
+    parser.add_argument("--flush", action="store_true", help="立即提交并推送待发布的路径")
+    parser.add_argument("--remote", default=DEFAULT_REMOTE, help="远程仓库名")
+    parser.add_argument("--repo", default=BLOG_DIR, help="仓库目录")
+    parser.add_argument("--self-test", action="store_true", help="在临时的本地裸仓库上检查发布流程")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        with tempfile.TemporaryDirectory() as workdir:
+            checks = asyncio.run(self_test(workdir))
+        for name, ok in checks:
+            print(f"{'✅' if ok else '❌'} {name}")
+        return 0 if all(ok for _, ok in checks) else 1
+
+    publisher = GitPublisher(args.repo, remote=args.remote)
+    if args.flush:
+        outcome = asyncio.run(publisher.publish([], flush=True))
+        print(f"{outcome['status']}: {len(outcome['days'])} 天，{outcome['paths']} 个路径")
+        return 0
+    pending = publisher.load_pending()
+    if not pending:
+        print("没有待发布的路径")
+    for day, paths in sorted(pending.items()):
+        print(f"{day}: {len(paths)} 个路径")
+        for path in paths[:10]:
+            print(f"  {path}")
+        if len(paths) > 10:
+            print(f"  ... 共 {len(paths)} 个")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片处理：响应式尺寸、现代格式和懒加载标记
+
+images/ 和 content/images/（CMS 上传目录）中的图片按几个宽度缩放，
+输出 WebP（Pillow 支持时还有 AVIF）和原格式的回退版本到 images/responsive/，
+文件名带源文件哈希；处理结果记录在 .cache/images-manifest.json，
+源文件没变的图片不会重新处理，需要处理的图片多时用进程池并行。
+
+ImageCatalog 根据清单生成 <img>/<picture> 标记（srcset、sizes、width/height、
+loading="lazy"），供文章卡片和文章页使用；images.unsplash.com 的图片通过 w= 参数
+生成 srcset。没有安装 Pillow 时不生成缩放版本，只从文件头读取宽高。
+
+用法:
+    python3 scripts/image_pipeline.py            # 处理所有图片
+    python3 scripts/image_pipeline.py --full     # 忽略缓存全部重新处理
+"""
+
+import os
+import re
+import sys
+import time
+import struct
+import argparse
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+from blog_utils import BLOG_DIR, cache_path, file_sha256, text_sha256, load_json, save_json
+from tracing import span
+
+MANIFEST_NAME = "images-manifest.json"
+MANIFEST_VERSION = 1
+SOURCE_DIRS = ("images", "content/images")
+OUTPUT_DIR = "images/responsive"
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+# 输出的宽度（不会超过原图宽度）
+WIDTHS = (400, 800, 1200)
+QUALITY = {"avif": 55, "webp": 78, "jpeg": 80}
+MIME_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+EXTENSIONS = {"avif": ".avif", "webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+# 需要处理的图片达到这个数量时使用进程池（单张图片的编码就很耗时）
+PARALLEL_THRESHOLD = 4
+
+# 各位置图片的显示宽度（与 css/style.css 的布局对应）
+CARD_SIZES = "(max-width: 1024px) 100vw, 580px"
+COVER_SIZES = "(max-width: 1200px) 100vw, 1200px"
+CONTENT_SIZES = "(max-width: 800px) 100vw, 800px"
+# 作者头像的显示尺寸（.author-avatar）
+AVATAR_SIZE = 32
+# 列表页首屏的文章卡片数（两列网格的第一行）：封面不懒加载，第一张提高优先级
+EAGER_CARDS = 2
+
+UNSPLASH_HOST = "images.unsplash.com"
+UNSPLASH_QUALITY = "75"
+
+_IMG_TAG = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_ATTR = re.compile(r"""\b([a-zA-Z-]+)=(["'])(.*?)\2""")
+_NO_ENHANCE = re.compile(r"\sdata-no-enhance\b", re.IGNORECASE)
+
+
+# ---------- 读取尺寸（不依赖 Pillow） ----------
+
+def image_size(path):
+    """从文件头读取 PNG/JPEG/GIF/WebP 的宽高，无法识别时返回 None"""
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8X":
+                w = int.from_bytes(head[24:27], "little") + 1
+                h = int.from_bytes(head[27:30], "little") + 1
+                return w, h
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8 ":
+                w, h = struct.unpack("<HH", head[26:30])
+                return w & 0x3FFF, h & 0x3FFF
+            return None
+        if head[:2] == b"\xff\xd8":
+            return _jpeg_size(f)
+    return None
+
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = struct.unpack(">H", f.read(2))[0]
+        # SOF0..SOF15（不含 DHT/JPG/DAC）记录了图片尺寸
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            h, w = struct.unpack(">xHH", f.read(5))
+            return w, h
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+# ---------- 生成缩放版本 ----------
+
+def available_formats():
+    """当前环境能输出的现代格式"""
+    if Image is None:
+        return []
+    Image.init()
+    return [fmt for fmt in ("avif", "webp") if fmt.upper() in Image.SAVE]
+
+
+def variant_name(rel, digest, width, fmt):
+    """content/images/a.jpg -> images/responsive/a-<hash8>-800.webp"""
+    stem = posixpath.splitext(posixpath.basename(rel))[0].replace(" ", "-")
+    return f"{OUTPUT_DIR}/{stem}-{digest[:8]}-{width}{EXTENSIONS[fmt]}"
+
+
+def _fallback_format(image):
+    return "png" if image.mode in ("RGBA", "LA", "P") else "jpeg"
+
+
+def _process(job):
+    """缩放并编码一张图片（可在子进程中运行），返回清单条目"""
+    root, rel, digest, formats = job
+    with Image.open(os.path.join(root, rel)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.mode or image.mode == "P" else "RGB")
+    width, height = image.size
+    fallback = _fallback_format(image)
+    widths = sorted({w for w in WIDTHS if w < width} | {min(width, WIDTHS[-1])})
+    variants = []
+    for w in widths:
+        h = max(1, round(height * w / width))
+        resized = image if w == width else image.resize((w, h), Image.LANCZOS)
+        for fmt in list(formats) + [fallback]:
+            out = variant_name(rel, digest, w, fmt)
+            path = os.path.join(root, out)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            frame = resized.convert("RGB") if fmt == "jpeg" and resized.mode != "RGB" else resized
+            options = {"quality": QUALITY[fmt]} if fmt in QUALITY else {"optimize": True}
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            frame.save(tmp_path, format=fmt.upper(), **options)
+            os.replace(tmp_path, path)
+            variants.append([out, w, fmt])
+    return rel, {"width": width, "height": height, "fallback": fallback, "variants": variants}
+
+
+def source_images(root=None):
+    """需要处理的图片（相对路径，/ 分隔），不包括生成的缩放版本"""
+    root = root or BLOG_DIR
+    paths = []
+    for directory in SOURCE_DIRS:
+        base = os.path.join(root, directory)
+        for dirpath, dirnames, filenames in os.walk(base):
+            rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+            dirnames[:] = [d for d in dirnames
+                           if not d.startswith(".") and f"{rel_dir}/{d}" != OUTPUT_DIR]
+            for name in filenames:
+                if name.lower().endswith(SOURCE_EXTENSIONS):
+                    paths.append(f"{rel_dir}/{name}")
+    return sorted(paths)
+
+
+def process_images(root=None, full=False, workers=None, verbose=True):
+    """
+    处理所有图片，返回 {"images", "processed", "written", "deleted", "elapsed"}
+
+    written / deleted 是相对仓库根目录的路径，供发布阶段精确暂存。
+    """
+    started = time.perf_counter()
+    root = root or BLOG_DIR
+    manifest_path = cache_path(MANIFEST_NAME, root)
+    formats = available_formats()
+    manifest = load_json(manifest_path, {}) or {}
+    old_images = manifest.get("images", {}) if manifest.get("version") == MANIFEST_VERSION else {}
+
+    images = {}
+    jobs = []
+    for rel in source_images(root):
+        st = os.stat(os.path.join(root, rel))
+        entry = old_images.get(rel)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            digest = entry["sha256"]
+        else:
+            digest = file_sha256(os.path.join(root, rel))
+        # 没有 Pillow 时沿用已有的缩放版本，有 Pillow 时可输出的格式变了要重新处理
+        if (entry and not full and entry["sha256"] == digest
+                and (Image is None or entry.get("formats") == formats)
+                and all(os.path.exists(os.path.join(root, v[0])) for v in entry["variants"])):
+            images[rel] = dict(entry, size=st.st_size, mtime=st.st_mtime_ns)
+            continue
+        images[rel] = {"sha256": digest, "size": st.st_size, "mtime": st.st_mtime_ns,
+                       "formats": formats}
+        jobs.append((root, rel, digest, formats))
+
+    with span("images", images=len(images), processed=len(jobs)):
+        if Image is None:
+            results = []
+            for _, rel, _, _ in jobs:
+                size = image_size(os.path.join(root, rel)) or (None, None)
+                results.append((rel, {"width": size[0], "height": size[1],
+                                      "fallback": None, "variants": []}))
+        elif len(jobs) < PARALLEL_THRESHOLD:
+            results = list(map(_process, jobs))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_process, jobs))
+
+    written = []
+    for rel, info in results:
+        images[rel].update(info)
+        written.extend(v[0] for v in info["variants"])
+
+    # 删除源文件已删除或已变化的图片之前生成的版本
+    live = {v[0] for entry in images.values() for v in entry["variants"]}
+    deleted = []
+    for entry in old_images.values():
+        for path, _, _ in entry.get("variants", []):
+            if path not in live and os.path.exists(os.path.join(root, path)):
+                os.remove(os.path.join(root, path))
+                deleted.append(path)
+
+    save_json(manifest_path, {"version": MANIFEST_VERSION, "images": images})
+    result = {
+        "images": len(images),
+        "processed": len(jobs),
+        "written": written,
+        "deleted": deleted,
+        "elapsed": time.perf_counter() - started,
+    }
+    if verbose:
+        note = "" if Image is not None else "（未安装 Pillow，只读取尺寸）"
+        print(f"🖼️  图片: 共 {result['images']} 张，处理 {result['processed']} 张{note}，"
+              f"写出 {len(written)} 个文件，删除 {len(deleted)} 个，耗时 {result['elapsed']:.2f}s")
+    return result
+
+
+# ---------- 生成标记 ----------
+
+def unsplash_url(url, width, height=None):
+    """把 images.unsplash.com 的图片地址改成指定宽度（按原 w/h 比例调整 h），并让 CDN 选择格式"""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query["w"] = str(width)
+    if height:
+        query["h"] = str(height)
+    query.setdefault("auto", "format")
+    query.setdefault("q", UNSPLASH_QUALITY)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _unsplash_size(url):
+    query = dict(parse_qsl(urlsplit(url).query))
+    try:
+        return int(query["w"]), int(query["h"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _attrs(pairs):
+    return "".join(f' {name}="{value}"' for name, value in pairs if value is not None)
+
+
+class ImageCatalog:
+    """根据图片清单为 <img> 生成 srcset、尺寸和懒加载属性"""
+
+    def __init__(self, images=None):
+        self.images = images or {}
+
+    @classmethod
+    def load(cls, root=None):
+        manifest = load_json(cache_path(MANIFEST_NAME, root or BLOG_DIR), {}) or {}
+        return cls(manifest.get("images", {}))
+
+    def resolve(self, src):
+        """图片地址对应的清单路径（/content/images/a.jpg、../images/a.png 等），不在清单中返回 None"""
+        if not src or "://" in src or src.startswith("//"):
+            return None
+        rel = posixpath.normpath(unquote(src.split("?", 1)[0]).lstrip("/"))
+        while rel.startswith("../"):
+            rel = rel[3:]
+        return rel if rel in self.images else None
+
+    def key(self, src):
+        """图片标记依赖的输入，用于页面签名"""
+        rel = self.resolve(src)
+        if rel is None:
+            return src
+        entry = self.images[rel]
+        return [rel, entry["sha256"], entry.get("width"), len(entry.get("variants", []))]
+
+    def digest(self):
+        """整个清单的指纹"""
+        return text_sha256(repr(sorted((rel, self.key(rel)) for rel in self.images)))
+
+    def describe(self, src, base_path, sizes=CARD_SIZES, display_width=None):
+        """
+        返回 (img 属性列表, picture 的 source 列表)
+
+        display_width 用于固定显示尺寸的小图（头像），此时 srcset 使用 1x/2x。
+        """
+        rel = self.resolve(src)
+        if rel is not None:
+            return self._describe_local(rel, base_path, sizes)
+        if src and urlsplit(src).netloc == UNSPLASH_HOST:
+            return self._describe_unsplash(src, sizes, display_width), []
+        return [("src", src)], []
+
+    def _describe_local(self, rel, base_path, sizes):
+        entry = self.images[rel]
+        by_format = {}
+        for path, width, fmt in entry.get("variants", []):
+            by_format.setdefault(fmt, []).append(f"{base_path}{path} {width}w")
+        fallback = by_format.pop(entry.get("fallback"), None)
+        attrs = [("src", f"{base_path}{rel}")]
+        if fallback:
+            largest = max(entry["variants"], key=lambda v: (v[2] == entry["fallback"], v[1]))
+            attrs = [("src", f"{base_path}{largest[0]}"),
+                     ("srcset", ", ".join(fallback)), ("sizes", sizes)]
+        attrs += [("width", entry.get("width")), ("height", entry.get("height"))]
+        sources = [
+            f'<source type="{MIME_TYPES[fmt]}" srcset="{", ".join(srcset)}" sizes="{sizes}">'
+            for fmt, srcset in by_format.items()
+        ]
+        return attrs, sources
+
+    def _describe_unsplash(self, src, sizes, display_width):
+        size = _unsplash_size(src)
+        if not size:
+            return [("src", src)]
+        width, height = size
+        ratio = height / width
+        if display_width:
+            candidates = [(display_width * d, f"{d}x") for d in (1, 2)]
+            srcset = ", ".join(
+                f"{unsplash_url(src, w, round(w * ratio))} {d}" for w, d in candidates
+            )
+            return [("src", unsplash_url(src, display_width, round(display_width * ratio))),
+                    ("srcset", srcset),
+                    ("width", display_width), ("height", round(display_width * ratio))]
+        widths = sorted({w for w in WIDTHS if w < width} | {width})
+        srcset = ", ".join(f"{unsplash_url(src, w, round(w * ratio))} {w}w" for w in widths)
+        return [("src", unsplash_url(src, width, height)), ("srcset", srcset), ("sizes", sizes),
+                ("width", width), ("height", height)]
+
+    def img(self, src, alt, base_path, sizes=CARD_SIZES, css_class=None, lazy=True,
+            display_width=None, priority=False):
+        """生成 <img>（有现代格式版本时包在 <picture> 里）
+
+        lazy=False 只表示首屏立即加载；fetchpriority="high" 只应给页面的 LCP 图片（priority=True）。
+        """
+        attrs, sources = self.describe(src, base_path, sizes, display_width)
+        attrs += [("alt", alt), ("class", css_class),
+                  ("loading", "lazy" if lazy else None),
+                  ("fetchpriority", "high" if priority else None),
+                  ("decoding", "async")]
+        tag = f"<img{_attrs(attrs)}>"
+        if sources:
+            return f"<picture>{''.join(sources)}{tag}</picture>"
+        return tag
+
+    def enhance_html(self, html, base_path, sizes=CONTENT_SIZES, eager=0):
+        """
+        给 HTML 中还没有 srcset / loading 的 <img> 补上响应式和懒加载属性
+
+        前 eager 张（头像除外）在首屏，不懒加载，第一张加 fetchpriority="high"；
+        带 data-no-enhance 的图片（src 由脚本设置，加 srcset 会盖过脚本设置的 src）原样保留。
+        """
+        seen = 0
+
+        def replace(match):
+            nonlocal seen
+            tag = match.group(0)
+            attrs = {name.lower(): value for name, _, value in _ATTR.findall(tag)}
+            if ("srcset" in attrs or "loading" in attrs or "src" not in attrs
+                    or _NO_ENHANCE.search(tag)):
+                return tag
+            display_width = None
+            if "author-avatar" in attrs.get("class", ""):
+                display_width = AVATAR_SIZE
+                lazy, priority = True, False
+            else:
+                lazy, priority = seen >= eager, seen == 0 and eager > 0
+                seen += 1
+            extra, sources = self.describe(attrs["src"], base_path, sizes, display_width)
+            extra = dict(extra)
+            new_src = extra.pop("src")
+            tag = tag.replace(f'src="{attrs["src"]}"', f'src="{new_src}"', 1)
+            extra.update(loading="lazy" if lazy else None,
+                         fetchpriority="high" if priority else None, decoding="async")
+            pairs = [(k, v) for k, v in extra.items() if k not in attrs]
+            tag = f"{tag[:-1].rstrip('/').rstrip()}{_attrs(pairs)}>"
+            if sources:
+                return f"<picture>{''.join(sources)}{tag}</picture>"
+            return tag
+
+        return _IMG_TAG.sub(replace, html)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成响应式图片")
+    parser.add_argument("--full", action="store_true", help="忽略缓存全部重新处理")
+    args = parser.parse_args(argv)
+    process_images(full=args.full)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
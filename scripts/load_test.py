@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态服务器压测
+
+用 asyncio 打开 N 个 keep-alive 连接，在给定时长内循环请求一组路径，
+统计每秒请求数、吞吐量、p50 / p90 / p99 / 最大延迟和状态码分布。
+
+路径默认取自站点目录的 deploy-manifest.json 中的 HTML 页面（没有时只请求 /）。
+
+用法:
+    python3 scripts/load_test.py http://127.0.0.1:8080/
+    python3 scripts/load_test.py http://127.0.0.1:8080/ -c 256 -d 20 --gzip
+    python3 scripts/load_test.py http://127.0.0.1:8080/ --paths /index.html,/posts.html --json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import quote, urlsplit
+
+from blog_utils import BLOG_DIR, load_json
+import package_site
+
+
+def default_paths(limit=50):
+    manifest = load_json(os.path.join(BLOG_DIR, package_site.DIST_DIRNAME, package_site.MANIFEST_NAME), {}) or {}
+    pages = sorted(p for p in manifest.get("files", {}) if p.endswith(".html"))
+    return ["/" + p for p in pages[:limit]] or ["/"]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def read_response(reader):
+    """读一个响应，返回 (状态码, 正文字节数, 连接能否复用)；只支持 Content-Length 响应"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    version, status = lines[0].split(" ", 2)[:2]
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length and status != "304":
+        await reader.readexactly(length)
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return int(status), length, keep_alive
+
+
+async def worker(host, port, requests, deadline, stats):
+    reader = writer = None
+    i = 0
+    while time.perf_counter() < deadline:
+        if writer is None:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError:
+                stats["errors"] += 1
+                await asyncio.sleep(0.05)
+                continue
+        request = requests[i % len(requests)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, length, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats["errors"] += 1
+            writer.close()
+            reader = writer = None
+            continue
+        stats["latencies"].append(time.perf_counter() - started)
+        stats["status"][status] = stats["status"].get(status, 0) + 1
+        stats["bytes"] += length
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, paths, concurrency=64, duration=10.0, gzip=False):
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    prefix = parts.path.rstrip("/")
+    encoding = "Accept-Encoding: br, gzip\r\n" if gzip else ""
+    requests = [
+        (f"GET {quote(prefix + path, safe='/%?=&')} HTTP/1.1\r\nHost: {parts.netloc}\r\n{encoding}"
+         "Connection: keep-alive\r\n\r\n").encode("latin-1")
+        for path in paths
+    ]
+    stats = {"latencies": [], "status": {}, "bytes": 0, "errors": 0}
+    started = time.perf_counter()
+    deadline = started + duration
+    # 错开各连接的起始路径，避免所有连接同时请求同一个文件
+    await asyncio.gather(*(
+        worker(host, port, requests[i % len(requests):] + requests[:i % len(requests)], deadline, stats)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(stats["latencies"])
+    return {
+        "url": url,
+        "paths": len(paths),
+        "concurrency": concurrency,
+        "duration": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": stats["errors"],
+        "rps": round(len(latencies) / elapsed, 1),
+        "mb_per_s": round(stats["bytes"] / elapsed / 1024 / 1024, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p90": round(percentile(latencies, 0.90) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round((latencies[-1] if latencies else 0) * 1000, 2),
+        },
+        "status": {str(k): v for k, v in sorted(stats["status"].items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="静态服务器压测")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:8080/")
+    parser.add_argument("-c", "--concurrency", type=int, default=64, help="并发连接数（默认 64）")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="持续秒数（默认 10）")
+    parser.add_argument("--paths", help="逗号分隔的路径，默认取 dist 清单中的页面")
+    parser.add_argument("--gzip", action="store_true", help="请求压缩响应（Accept-Encoding: br, gzip）")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args(argv)
+
+    paths = [p if p.startswith("/") else "/" + p for p in args.paths.split(",")] if args.paths else default_paths()
+    result = asyncio.run(run(args.url, paths, args.concurrency, args.duration, args.gzip))
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        lat = result["latency_ms"]
+        print(f"🚀 {result['url']}  {result['paths']} 个路径，{result['concurrency']} 个连接，{result['duration']:.1f}s")
+        print(f"   {result['requests']} 次请求，{result['rps']:.0f} req/s，{result['mb_per_s']:.1f} MB/s，错误 {result['errors']}")
+        print(f"   延迟 p50 {lat['p50']:.2f} ms  p90 {lat['p90']:.2f} ms  p99 {lat['p99']:.2f} ms  最大 {lat['max']:.2f} ms")
+        print("   状态码: " + "，".join(f"{k} × {v}" for k, v in result["status"].items()))
+    return 1 if result["errors"] or not result["requests"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
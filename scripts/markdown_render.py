@@ -0,0 +1,1399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown 渲染引擎（marked 9 的 Python 移植）
+
+按 marked 的默认配置（gfm: true，breaks: false）解析和输出，生成的 HTML 与
+node_modules/marked 一致，可以直接替换 site_build 里的 node 调用。标题额外带上 id，
+规则与 marked-gfm-heading-id（github-slugger）相同，文章目录的 #锚点 以此为准；
+--compare 时关闭标题 id。
+
+每篇文档先切分为顶层块（段落、列表、代码块、表格……），块的 HTML 按
+"块原文 + 链接定义 + 渲染器版本" 的哈希缓存在 .cache/markdown-blocks.sqlite3：
+修改一段文字只会重新渲染这一块。需要渲染的文章多时分发到进程池。
+
+用法:
+    python3 scripts/markdown_render.py content/posts/xxx.md      # 输出 HTML
+    python3 scripts/markdown_render.py --compare                  # 与 marked 的输出逐篇比较
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+import unicodedata
+import subprocess
+from datetime import date
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
+
+from blog_utils import BLOG_DIR, posts_dir, cache_path, ensure_dir, file_sha256, text_sha256, parse_front_matter
+
+CACHE_NAME = "markdown-blocks.sqlite3"
+# 渲染器代码变化时旧的块缓存全部失效
+RENDERER_VERSION = file_sha256(__file__)[:16]
+# 超过这么多天没有用到的块从缓存中清理
+CACHE_MAX_AGE_DAYS = 30
+# 需要渲染的文章达到这个数量时使用进程池
+PARALLEL_THRESHOLD = 64
+# 每个子进程任务包含的文章数
+CHUNK_SIZE = 32
+
+
+# ---------- 把 marked 的 JS 正则转换为 Python 正则 ----------
+
+# JS 的 \s（Python 的 \s 还包括 \x1c-\x1f 等字符）
+_JS_SPACE = "\\t\\n\\x0b\\x0c\\r \\xa0\\u1680\\u2000-\\u200a\\u2028\\u2029\\u202f\\u205f\\u3000\\ufeff"
+
+
+def _punctuation_class():
+    """Unicode 标点（\\p{P}）的字符类内容（标点只分布在前两个平面）"""
+    ranges = []
+    start = prev = None
+    for code in range(0x20000):
+        if unicodedata.category(chr(code)).startswith("P"):
+            if prev is not None and code == prev + 1:
+                prev = code
+                continue
+            if start is not None:
+                ranges.append((start, prev))
+            start = prev = code
+    ranges.append((start, prev))
+    return "".join(
+        f"\\U{a:08x}" if a == b else f"\\U{a:08x}-\\U{b:08x}" for a, b in ranges
+    )
+
+
+_PUNCT = _punctuation_class()
+
+
+def _js(pattern, flags=""):
+    """
+    编译 JS 正则：\\s \\w \\d \\b 按 JS（ASCII）语义展开，$ 只匹配结尾，
+    字符类中的 [ & ~ | 转义以免触发 Python 的集合运算警告
+    """
+    pattern = pattern.replace("[\\s\\S]", "(?s:.)")
+    out = []
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            nxt = pattern[i + 1]
+            if pattern.startswith("\\p{P}", i):
+                out.append(_PUNCT if in_class else f"[{_PUNCT}]")
+                i += 5
+                continue
+            if nxt == "s":
+                out.append(_JS_SPACE if in_class else f"[{_JS_SPACE}]")
+            elif nxt == "S" and not in_class:
+                out.append(f"[^{_JS_SPACE}]")
+            elif nxt == "w":
+                out.append("A-Za-z0-9_" if in_class else "[A-Za-z0-9_]")
+            elif nxt == "d":
+                out.append("0-9" if in_class else "[0-9]")
+            elif nxt == "b" and not in_class:
+                out.append("(?:(?<=[A-Za-z0-9_])(?![A-Za-z0-9_])|(?<![A-Za-z0-9_])(?=[A-Za-z0-9_]))")
+            else:
+                if nxt in "SW" or (nxt == "D"):
+                    raise ValueError(f"unsupported escape \\{nxt} in {pattern!r}")
+                out.append(ch + nxt)
+            i += 2
+            continue
+        if in_class:
+            if ch == "]":
+                in_class = False
+                out.append(ch)
+            elif ch in "[&~|":
+                out.append("\\" + ch)
+            else:
+                out.append(ch)
+        elif ch == "[":
+            in_class = True
+            out.append(ch)
+            # [^] 和 []] 开头的 ] 是字面量
+            if pattern.startswith("^", i + 1):
+                out.append("^")
+                i += 1
+            if pattern.startswith("]", i + 1):
+                out.append("\\]")
+                i += 1
+        elif ch == "$":
+            out.append("$" if "m" in flags else "(?!(?s:.))")
+        else:
+            out.append(ch)
+        i += 1
+    re_flags = 0
+    if "i" in flags:
+        re_flags |= re.I
+    if "m" in flags:
+        re_flags |= re.M
+    return re.compile("".join(out), re_flags)
+
+
+class _Edit:
+    """marked 的 edit()：按名字替换正则模板中的片段"""
+
+    _caret = re.compile(r"(^|[^\[])\^")
+
+    def __init__(self, source, flags=""):
+        self.source = source
+        self.flags = flags
+
+    def replace(self, name, value, count=1):
+        value = self._caret.sub(r"\1", value)
+        self.source = self.source.replace(name, value, count if count else -1)
+        return self
+
+    def replace_all(self, name, value):
+        return self.replace(name, value, 0)
+
+    def get(self):
+        return self.source
+
+    def compile(self):
+        return _js(self.source, self.flags)
+
+
+# ---------- 语法规则（对应 marked 的 block / inline.gfm） ----------
+
+_B_NEWLINE = r"^(?: *(?:\n|$))+"
+_B_CODE = r"^( {4}[^\n]+(?:\n(?: *(?:\n|$))*)?)+"
+_B_FENCES = (r"^ {0,3}(`{3,}(?=[^`\n]*(?:\n|$))|~{3,})([^\n]*)(?:\n|$)"
+             r"(?:|([\s\S]*?)(?:\n|$))(?: {0,3}\1[~`]* *(?=\n|$)|$)")
+_B_HR = r"^ {0,3}((?:-[\t ]*){3,}|(?:_[ \t]*){3,}|(?:\*[ \t]*){3,})(?:\n+|$)"
+_B_HEADING = r"^ {0,3}(#{1,6})(?=\s|$)(.*)(?:\n+|$)"
+_B_BLOCKQUOTE = r"^( {0,3}> ?(paragraph|[^\n]*)(?:\n|$))+"
+_B_LIST = r"^( {0,3}bull)([ \t][^\n]+?)?(?:\n|$)"
+_B_HTML = (
+    "^ {0,3}(?:"
+    "<(script|pre|style|textarea)[\\s>][\\s\\S]*?(?:</\\1>[^\\n]*\\n+|$)"
+    "|comment[^\\n]*(\\n+|$)"
+    "|<\\?[\\s\\S]*?(?:\\?>\\n*|$)"
+    "|<![A-Z][\\s\\S]*?(?:>\\n*|$)"
+    "|<!\\[CDATA\\[[\\s\\S]*?(?:\\]\\]>\\n*|$)"
+    "|</?(tag)(?: +|\\n|/?>)[\\s\\S]*?(?:(?:\\n *)+\\n|$)"
+    "|<(?!script|pre|style|textarea)([a-z][\\w-]*)(?:attribute)*? */?>(?=[ \\t]*(?:\\n|$))[\\s\\S]*?(?:(?:\\n *)+\\n|$)"
+    "|</(?!script|pre|style|textarea)[a-z][\\w-]*\\s*>(?=[ \\t]*(?:\\n|$))[\\s\\S]*?(?:(?:\\n *)+\\n|$)"
+    ")"
+)
+_B_DEF = r"^ {0,3}\[(label)\]: *(?:\n *)?([^<\s][^\s]*|<.*?>)(?:(?: +(?:\n *)?| *\n *)(title))? *(?:\n+|$)"
+_B_LHEADING = r"^(?!bull )((?:.|\n(?!\s*?\n|bull ))+?)\n {0,3}(=+|-+) *(?:\n+|$)"
+_B_PARAGRAPH = r"^([^\n]+(?:\n(?!hr|heading|lheading|blockquote|fences|list|html|table| +\n)[^\n]+)*)"
+_B_TEXT = r"^[^\n]+"
+_B_LABEL = r"(?!\s*\])(?:\\.|[^\[\]\\])+"
+_B_TITLE = r"""(?:"(?:\\"?|[^"\\])*"|'[^'\n]*(?:\n[^'\n]+)*\n?'|\([^()]*\))"""
+_B_BULLET = r"(?:[*+-]|\d{1,9}[.)])"
+_B_TAG = (
+    "address|article|aside|base|basefont|blockquote|body|caption"
+    "|center|col|colgroup|dd|details|dialog|dir|div|dl|dt|fieldset|figcaption"
+    "|figure|footer|form|frame|frameset|h[1-6]|head|header|hr|html|iframe"
+    "|legend|li|link|main|menu|menuitem|meta|nav|noframes|ol|optgroup|option"
+    "|p|param|section|source|summary|table|tbody|td|tfoot|th|thead|title|tr"
+    "|track|ul"
+)
+_B_COMMENT = r"<!--(?!-?>)[\s\S]*?(?:-->|$)"
+
+_def_source = _Edit(_B_DEF).replace("label", _B_LABEL).replace("title", _B_TITLE).get()
+_html_source = (_Edit(_B_HTML, "i").replace("comment", _B_COMMENT).replace("tag", _B_TAG)
+                .replace("attribute", r""" +[a-zA-Z:_][\w.:-]*(?: *= *"[^"\n]*"| *= *'[^'\n]*'| *= *[^\s"'=<>`]+)?""")
+                .get())
+_table_source = (
+    _Edit("^ *([^\\n ].*)\\n"
+          " {0,3}((?:\\| *)?:?-+:? *(?:\\| *:?-+:? *)*(?:\\| *)?)"
+          "(?:\\n((?:(?! *\\n|hr|heading|blockquote|code|fences|list|html).*(?:\\n|$))*)\\n*|$)")
+    .replace("hr", _B_HR)
+    .replace("heading", " {0,3}#{1,6}(?:\\s|$)")
+    .replace("blockquote", " {0,3}>")
+    .replace("code", " {4}[^\\n]")
+    .replace("fences", " {0,3}(?:`{3,}(?=[^`\\n]*\\n)|~{3,})[^\\n]*\\n")
+    .replace("list", " {0,3}(?:[*+-]|1[.)]) ")
+    .replace("html", "</?(?:tag)(?: +|\\n|/?>)|<(?:script|pre|style|textarea|!--)")
+    .replace("tag", _B_TAG)
+    .get()
+)
+_paragraph_source = (
+    _Edit(_B_PARAGRAPH)
+    .replace("hr", _B_HR)
+    .replace("heading", " {0,3}#{1,6}(?:\\s|$)")
+    .replace("|lheading", "")
+    .replace("table", _table_source)
+    .replace("blockquote", " {0,3}>")
+    .replace("fences", " {0,3}(?:`{3,}(?=[^`\\n]*\\n)|~{3,})[^\\n]*\\n")
+    .replace("list", " {0,3}(?:[*+-]|1[.)]) ")
+    .replace("html", "</?(?:tag)(?: +|\\n|/?>)|<(?:script|pre|style|textarea|!--)")
+    .replace("tag", _B_TAG)
+    .get()
+)
+
+BLOCK = {
+    "newline": _js(_B_NEWLINE),
+    "code": _js(_B_CODE),
+    "fences": _js(_B_FENCES),
+    "hr": _js(_B_HR),
+    "heading": _js(_B_HEADING),
+    "blockquote": _Edit(_B_BLOCKQUOTE).replace("paragraph", _paragraph_source).compile(),
+    "list": (_Edit(_B_LIST).replace_all("bull", _B_BULLET)
+             .replace("hr", "\\n+(?=\\1?(?:(?:- *){3,}|(?:_ *){3,}|(?:\\* *){3,})(?:\\n+|$))")
+             .replace("def", "\\n+(?=" + _def_source + ")")
+             .compile()),
+    "html": _js(_html_source, "i"),
+    "def": _js(_def_source),
+    "table": _js(_table_source),
+    "lheading": _Edit(_B_LHEADING).replace_all("bull", _B_BULLET).compile(),
+    "paragraph": _js(_paragraph_source),
+    "text": _js(_B_TEXT),
+}
+
+_I_PUNCTUATION = "\\p{P}$+<=>`^|~"
+_I_LABEL = r"(?:\[(?:\\.|[^\[\]\\])*\]|\\.|`[^`]*`|[^\[\]\\`])*?"
+_I_HREF = r"<(?:\\.|[^\n<>\\])+>|[^\s\x00-\x1f]*"
+_I_TITLE = r""""(?:\\"?|[^"\\])*"|'(?:\\'?|[^'\\])*'|\((?:\\\)?|[^)\\])*\)"""
+_I_ATTRIBUTE = r"""\s+[a-zA-Z:_][\w.:-]*(?:\s*=\s*"[^"]*"|\s*=\s*'[^']*'|\s*=\s*[^\s"'=<>`]+)?"""
+_I_COMMENT = _Edit(_B_COMMENT).replace("(?:-->|$)", "-->").get()
+_I_SCHEME = r"[a-zA-Z][a-zA-Z0-9+.-]{1,31}"
+_I_EMAIL = (r"[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+(@)[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?"
+            r"(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)+(?![-_])")
+_I_EXTENDED_EMAIL = r"[A-Za-z0-9._+-]+(@)[a-zA-Z0-9-_]+(?:\.[a-zA-Z0-9-_]*[a-zA-Z0-9])+(?![-_])"
+
+_reflink_source = (_Edit(r"^!?\[(label)\]\[(ref)\]")
+                   .replace("label", _I_LABEL).replace("ref", _B_LABEL).get())
+_nolink_source = _Edit(r"^!?\[(ref)\](?:\[\])?").replace("ref", _B_LABEL).get()
+
+INLINE = {
+    "escape": _js(r"^\\([!\"#$%&'()*+,\-./:;<=>?@\[\]\\^_`{|}~~|])"),
+    "autolink": (_Edit(r"^<(scheme:[^\s\x00-\x1f<>]*|email)>")
+                 .replace("scheme", _I_SCHEME).replace("email", _I_EMAIL).compile()),
+    "url": (_Edit(r"^((?:ftp|https?):\/\/|www\.)(?:[a-zA-Z0-9\-]+\.?)+[^\s<]*|^email", "i")
+            .replace("email", _I_EXTENDED_EMAIL).compile()),
+    "tag": (_Edit("^comment"
+                  "|^</[a-zA-Z][\\w:-]*\\s*>"
+                  "|^<[a-zA-Z][\\w-]*(?:attribute)*?\\s*/?>"
+                  "|^<\\?[\\s\\S]*?\\?>"
+                  "|^<![a-zA-Z]+\\s[\\s\\S]*?>"
+                  "|^<!\\[CDATA\\[[\\s\\S]*?\\]\\]>")
+            .replace("comment", _I_COMMENT).replace("attribute", _I_ATTRIBUTE).compile()),
+    "link": (_Edit(r"^!?\[(label)\]\(\s*(href)(?:\s+(title))?\s*\)")
+             .replace("label", _I_LABEL).replace("href", _I_HREF).replace("title", _I_TITLE)
+             .compile()),
+    "reflink": _js(_reflink_source),
+    "nolink": _js(_nolink_source),
+    "reflinkSearch": (_Edit("reflink|nolink(?!\\()")
+                      .replace("reflink", _reflink_source).replace("nolink", _nolink_source)
+                      .compile()),
+    "lDelim": (_Edit(r"^(?:\*+(?:((?!\*)[punct])|[^\s*]))|^_+(?:((?!_)[punct])|([^\s_]))")
+               .replace_all("punct", _I_PUNCTUATION).compile()),
+    "rDelimAst": (_Edit(r"^[^_*]*?__[^_*]*?\*[^_*]*?(?=__)|[^*]+(?=[^*])|(?!\*)[punct](\*+)(?=[\s]|$)"
+                        r"|[^punct\s](\*+)(?!\*)(?=[punct\s]|$)|(?!\*)[punct\s](\*+)(?=[^punct\s])"
+                        r"|[\s](\*+)(?!\*)(?=[punct])|(?!\*)[punct](\*+)(?!\*)(?=[punct])"
+                        r"|[^punct\s](\*+)(?=[^punct\s])")
+                  .replace_all("punct", _I_PUNCTUATION).compile()),
+    "rDelimUnd": (_Edit(r"^[^_*]*?\*\*[^_*]*?_[^_*]*?(?=\*\*)|[^_]+(?=[^_])|(?!_)[punct](_+)(?=[\s]|$)"
+                        r"|[^punct\s](_+)(?!_)(?=[punct\s]|$)|(?!_)[punct\s](_+)(?=[^punct\s])"
+                        r"|[\s](_+)(?!_)(?=[punct])|(?!_)[punct](_+)(?!_)(?=[punct])")
+                  .replace_all("punct", _I_PUNCTUATION).compile()),
+    "code": _js(r"^(`+)([^`]|[^`][\s\S]*?[^`])\1(?!`)"),
+    "br": _js(r"^( {2,}|\\)\n(?!\s*$)"),
+    "del": _js(r"^(~~?)(?=[^\s~])([\s\S]*?[^\s~])\1(?=[^~]|$)"),
+    "text": _js(r"^([`~]+|[^`~])(?:(?= {2,}\n)|(?=[a-zA-Z0-9.!#$%&'*+\/=?_`{\|}~-]+@)"
+                r"|[\s\S]*?(?:(?=[\\<!\[`*~_]|\b_|https?:\/\/|ftp:\/\/|www\.|$)|[^ ](?= {2,}\n)"
+                r"|[^a-zA-Z0-9.!#$%&'*+\/=?_`{\|}~-](?=[a-zA-Z0-9.!#$%&'*+\/=?_`{\|}~-]+@)))"),
+    "punctuation": _Edit(r"^((?![*_])[\spunctuation])").replace_all("punctuation", _I_PUNCTUATION).compile(),
+    "blockSkip": _js(r"\[[^[\]]*?\]\([^\(\)]*?\)|`[^`]*?`|<[^<>]*?>"),
+    "anyPunctuation": _Edit(r"\\[punct]").replace_all("punct", _I_PUNCTUATION).compile(),
+    "escapes": _Edit(r"\\([punct])").replace_all("punct", _I_PUNCTUATION).compile(),
+    "backpedal": _js(r"""(?:[^?!.,:;*_'"~()&]+|\([^)]*\)|&(?![a-zA-Z0-9]+;$)|[?!.,:;*_'"~)]+(?!$))+"""),
+}
+
+
+# ---------- 辅助函数 ----------
+
+_ESCAPE_ENCODE = re.compile(r"[&<>\"']")
+_ESCAPE_NO_ENCODE = re.compile(r"[<>\"']|&(?!(#\d{1,7}|#[Xx][a-fA-F0-9]{1,6}|\w+);)", re.A)
+_ESCAPE_REPLACEMENTS = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}
+
+
+def escape(html, encode=False):
+    pattern = _ESCAPE_ENCODE if encode else _ESCAPE_NO_ENCODE
+    return pattern.sub(lambda m: _ESCAPE_REPLACEMENTS[m.group(0)[0]], html)
+
+
+def clean_url(href):
+    """encodeURI(href)，保留已有的 % 编码"""
+    try:
+        return quote(href, safe=";,/?:@&=+$-_.!~*'()#").replace("%25", "%")
+    except UnicodeEncodeError:
+        return None
+
+
+def rtrim(text, char, invert=False):
+    """去掉结尾连续的 char（invert=True 时去掉结尾连续的非 char）"""
+    end = len(text)
+    while end > 0 and ((text[end - 1] == char) != invert):
+        end -= 1
+    return text[:end]
+
+
+def find_closing_bracket(text, brackets):
+    if brackets[1] not in text:
+        return -1
+    level = 0
+    i = 0
+    while i < len(text):
+        if text[i] == "\\":
+            i += 1
+        elif text[i] == brackets[0]:
+            level += 1
+        elif text[i] == brackets[1]:
+            level -= 1
+            if level < 0:
+                return i
+        i += 1
+    return -1
+
+
+def split_cells(row, count=None):
+    def mark(match):
+        escaped = False
+        pos = match.start() - 1
+        while pos >= 0 and row[pos] == "\\":
+            escaped = not escaped
+            pos -= 1
+        return "|" if escaped else " |"
+
+    cells = re.sub(r"\|", mark, row).split(" |")
+    if cells and not cells[0].strip():
+        cells.pop(0)
+    if cells and not cells[-1].strip():
+        cells.pop()
+    if count:
+        if len(cells) > count:
+            del cells[count:]
+        else:
+            cells.extend([""] * (count - len(cells)))
+    return [cell.strip().replace("\\|", "|") for cell in cells]
+
+
+def _search(pattern, text):
+    """JS 的 str.search()"""
+    match = re.search(pattern, text)
+    return match.start() if match else -1
+
+
+def _indent_code_compensation(raw, text):
+    match = re.match(r"^(\s+)(?:```)", raw)
+    if match is None:
+        return text
+    indent = len(match.group(1))
+    lines = []
+    for line in text.split("\n"):
+        node_indent = re.match(r"^\s+", line)
+        if node_indent is None:
+            lines.append(line)
+        elif len(node_indent.group(0)) >= indent:
+            lines.append(line[indent:])
+        else:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+# ---------- 词法分析 ----------
+
+class Lexer:
+    """块级词法分析；行内词法分析在渲染时按块进行"""
+
+    def __init__(self):
+        self.links = {}
+        self.in_link = False
+        self.in_raw_block = False
+        self.top = True
+
+    def lex(self, src):
+        src = re.sub(r"\r\n|\r", "\n", src)
+        return self.block_tokens(src, [])
+
+    def block_tokens(self, src, tokens):
+        src = re.sub(r"^( *)(\t+)", lambda m: m.group(1) + "    " * len(m.group(2)), src, flags=re.M)
+        while src:
+            cap = BLOCK["newline"].search(src)
+            if cap and cap.group(0):
+                raw = cap.group(0)
+                src = src[len(raw):]
+                if len(raw) == 1 and tokens:
+                    tokens[-1]["raw"] += "\n"
+                else:
+                    tokens.append({"type": "space", "raw": raw})
+                continue
+
+            cap = BLOCK["code"].search(src)
+            if cap:
+                raw = cap.group(0)
+                src = src[len(raw):]
+                text = rtrim(re.sub(r"^ {1,4}", "", raw, flags=re.M), "\n")
+                last = tokens[-1] if tokens else None
+                if last and last["type"] in ("paragraph", "text"):
+                    last["raw"] += "\n" + raw
+                    last["text"] += "\n" + text
+                else:
+                    tokens.append({"type": "code", "raw": raw, "lang": None, "text": text})
+                continue
+
+            cap = BLOCK["fences"].search(src)
+            if cap:
+                raw = cap.group(0)
+                src = src[len(raw):]
+                lang = cap.group(2)
+                if lang:
+                    lang = INLINE["escapes"].sub(r"\1", lang.strip())
+                tokens.append({"type": "code", "raw": raw, "lang": lang,
+                               "text": _indent_code_compensation(raw, cap.group(3) or "")})
+                continue
+
+            cap = BLOCK["heading"].search(src)
+            if cap:
+                raw = cap.group(0)
+                src = src[len(raw):]
+                text = cap.group(2).strip()
+                if text.endswith("#"):
+                    trimmed = rtrim(text, "#")
+                    if not trimmed or trimmed.endswith(" "):
+                        text = trimmed.strip()
+                tokens.append({"type": "heading", "raw": raw, "depth": len(cap.group(1)), "text": text})
+                continue
+
+            cap = BLOCK["hr"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                tokens.append({"type": "hr", "raw": cap.group(0)})
+                continue
+
+            cap = BLOCK["blockquote"].search(src)
+            if cap:
+                raw = cap.group(0)
+                src = src[len(raw):]
+                text = rtrim(re.sub(r"^ *>[ \t]?", "", raw, flags=re.M), "\n")
+                top = self.top
+                self.top = True
+                children = self.block_tokens(text, [])
+                self.top = top
+                tokens.append({"type": "blockquote", "raw": raw, "tokens": children})
+                continue
+
+            token = self.list(src)
+            if token:
+                src = src[len(token["raw"]):]
+                tokens.append(token)
+                continue
+
+            cap = BLOCK["html"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                tokens.append({"type": "html", "raw": cap.group(0), "text": cap.group(0)})
+                continue
+
+            cap = BLOCK["def"].search(src)
+            if cap:
+                raw = cap.group(0)
+                src = src[len(raw):]
+                last = tokens[-1] if tokens else None
+                if last and last["type"] in ("paragraph", "text"):
+                    last["raw"] += "\n" + raw
+                    last["text"] += "\n" + raw
+                else:
+                    tag = re.sub(r"\s+", " ", cap.group(1).lower())
+                    if tag not in self.links:
+                        href = cap.group(2) or ""
+                        if href:
+                            href = INLINE["escapes"].sub(r"\1", re.sub(r"^<(.*)>$", r"\1", href))
+                        title = cap.group(3)
+                        if title:
+                            title = INLINE["escapes"].sub(r"\1", title[1:-1])
+                        self.links[tag] = {"href": href, "title": title}
+                continue
+
+            token = self.table(src)
+            if token:
+                src = src[len(token["raw"]):]
+                tokens.append(token)
+                continue
+
+            cap = BLOCK["lheading"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                tokens.append({"type": "heading", "raw": cap.group(0),
+                               "depth": 1 if cap.group(2)[0] == "=" else 2, "text": cap.group(1)})
+                continue
+
+            if self.top:
+                cap = BLOCK["paragraph"].search(src)
+                if cap:
+                    text = cap.group(1)[:-1] if cap.group(1).endswith("\n") else cap.group(1)
+                    tokens.append({"type": "paragraph", "raw": cap.group(0), "text": text})
+                    src = src[len(cap.group(0)):]
+                    continue
+
+            cap = BLOCK["text"].search(src)
+            if cap:
+                raw = cap.group(0)
+                src = src[len(raw):]
+                last = tokens[-1] if tokens else None
+                if last and last["type"] == "text":
+                    last["raw"] += "\n" + raw
+                    last["text"] += "\n" + raw
+                else:
+                    tokens.append({"type": "text", "raw": raw, "text": raw})
+                continue
+
+            raise ValueError(f"Infinite loop on byte: {ord(src[0])}")
+        self.top = True
+        return tokens
+
+    def list(self, src):
+        cap = BLOCK["list"].search(src)
+        if not cap:
+            return None
+        bull = cap.group(1).strip()
+        ordered = len(bull) > 1
+        token = {"type": "list", "raw": "", "ordered": ordered,
+                 "start": int(bull[:-1]) if ordered else "", "loose": False, "items": []}
+        bull = f"\\d{{1,9}}\\{bull[-1]}" if ordered else f"\\{bull}"
+        item_regex = _js(f"^( {{0,3}}{bull})((?:[\t ][^\\n]*)?(?:\\n|$))")
+        raw = ""
+        item_contents = ""
+        ends_with_blank_line = False
+        while src:
+            end_early = False
+            cap = item_regex.search(src)
+            if not cap:
+                break
+            if BLOCK["hr"].search(src):
+                break
+            raw = cap.group(0)
+            src = src[len(raw):]
+            line = re.sub(r"^\t+", lambda m: " " * (3 * len(m.group(0))), cap.group(2).split("\n", 1)[0])
+            next_line = src.split("\n", 1)[0]
+            indent = _search(r"[^ ]", cap.group(2))
+            indent = 1 if indent > 4 else indent
+            item_contents = line[indent:] if indent >= 0 else line[len(line) + indent:]
+            indent += len(cap.group(1))
+            blank_line = False
+            if not line and re.fullmatch(r" *", next_line):
+                raw += next_line + "\n"
+                src = src[len(next_line) + 1:]
+                end_early = True
+            if not end_early:
+                spaces = min(3, indent - 1)
+                next_bullet = _js(f"^ {{0,{spaces}}}(?:[*+-]|\\d{{1,9}}[.)])((?:[ \t][^\\n]*)?(?:\\n|$))")
+                hr_regex = _js(f"^ {{0,{spaces}}}((?:- *){{3,}}|(?:_ *){{3,}}|(?:\\* *){{3,}})(?:\\n+|$)")
+                fences_begin = _js(f"^ {{0,{spaces}}}(?:```|~~~)")
+                heading_begin = _js(f"^ {{0,{spaces}}}#")
+                while src:
+                    raw_line = src.split("\n", 1)[0]
+                    next_line = raw_line
+                    if fences_begin.search(next_line):
+                        break
+                    if heading_begin.search(next_line):
+                        break
+                    if next_bullet.search(next_line):
+                        break
+                    if hr_regex.search(src):
+                        break
+                    if _search(r"[^ ]", next_line) >= indent or not next_line.strip():
+                        item_contents += "\n" + next_line[indent:]
+                    else:
+                        if blank_line:
+                            break
+                        if _search(r"[^ ]", line) >= 4:
+                            break
+                        if fences_begin.search(line):
+                            break
+                        if heading_begin.search(line):
+                            break
+                        if hr_regex.search(line):
+                            break
+                        item_contents += "\n" + next_line
+                    if not blank_line and not next_line.strip():
+                        blank_line = True
+                    raw += raw_line + "\n"
+                    src = src[len(raw_line) + 1:]
+                    line = next_line[indent:]
+            if not token["loose"]:
+                if ends_with_blank_line:
+                    token["loose"] = True
+                elif re.search(r"\n *\n *\Z", raw):
+                    ends_with_blank_line = True
+            task = None
+            checked = None
+            task = re.match(r"^\[[ xX]\] ", item_contents)
+            if task:
+                checked = task.group(0) != "[ ] "
+                item_contents = re.sub(r"^\[[ xX]\] +", "", item_contents)
+            token["items"].append({"type": "list_item", "raw": raw, "task": bool(task),
+                                   "checked": checked, "loose": False, "text": item_contents})
+            token["raw"] += raw
+        token["items"][-1]["raw"] = raw.rstrip()
+        token["items"][-1]["text"] = item_contents.rstrip()
+        token["raw"] = token["raw"].rstrip()
+        for item in token["items"]:
+            self.top = False
+            item["tokens"] = self.block_tokens(item["text"], [])
+            if not token["loose"]:
+                spacers = [t for t in item["tokens"] if t["type"] == "space"]
+                token["loose"] = any(re.search(r"\n.*\n", t["raw"]) for t in spacers)
+        if token["loose"]:
+            for item in token["items"]:
+                item["loose"] = True
+        return token
+
+    def table(self, src):
+        cap = BLOCK["table"].search(src)
+        if not cap or not re.search(r"[:|]", cap.group(2)):
+            return None
+        header = split_cells(cap.group(1))
+        align = re.sub(r"^\||\| *(?!(?s:.))", "", cap.group(2)).split("|")
+        rows_src = cap.group(3)
+        rows = (re.sub(r"\n[ \t]*\Z", "", rows_src).split("\n")
+                if rows_src and rows_src.strip() else [])
+        if len(header) != len(align):
+            return None
+        for i, value in enumerate(align):
+            if re.fullmatch(r" *-+: *", value):
+                align[i] = "right"
+            elif re.fullmatch(r" *:-+: *", value):
+                align[i] = "center"
+            elif re.fullmatch(r" *:-+ *", value):
+                align[i] = "left"
+            else:
+                align[i] = None
+        return {
+            "type": "table",
+            "raw": cap.group(0),
+            "header": header,
+            "align": align,
+            "rows": [split_cells(row, len(header)) for row in rows],
+        }
+
+    # ----- 行内 -----
+
+    def inline_tokens(self, src):
+        tokens = []
+        masked = src
+        if self.links:
+            links = list(self.links)
+
+            def mask_reflink(match):
+                text = match.group(0)
+                if text[text.rfind("[") + 1:-1] in links:
+                    return "[" + "a" * (len(text) - 2) + "]"
+                return text
+
+            masked = INLINE["reflinkSearch"].sub(mask_reflink, masked)
+        masked = INLINE["blockSkip"].sub(lambda m: "[" + "a" * (len(m.group(0)) - 2) + "]", masked)
+        masked = INLINE["anyPunctuation"].sub("++", masked)
+
+        keep_prev = False
+        prev_char = ""
+        while src:
+            if not keep_prev:
+                prev_char = ""
+            keep_prev = False
+
+            cap = INLINE["escape"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                tokens.append({"type": "text", "text": escape(cap.group(1))})
+                continue
+
+            cap = INLINE["tag"].search(src)
+            if cap:
+                raw = cap.group(0)
+                if not self.in_link and re.match(r"^<a ", raw, re.I):
+                    self.in_link = True
+                elif self.in_link and re.match(r"^</a>", raw, re.I):
+                    self.in_link = False
+                if not self.in_raw_block and re.match(r"^<(pre|code|kbd|script)(\s|>)", raw, re.I):
+                    self.in_raw_block = True
+                elif self.in_raw_block and re.match(r"^</(pre|code|kbd|script)(\s|>)", raw, re.I):
+                    self.in_raw_block = False
+                src = src[len(raw):]
+                tokens.append({"type": "html", "text": raw})
+                continue
+
+            token = self.link(src)
+            if token:
+                src = src[len(token["raw"]):]
+                tokens.append(token)
+                continue
+
+            token = self.reflink(src)
+            if token:
+                src = src[len(token["raw"]):]
+                last = tokens[-1] if tokens else None
+                if last and token["type"] == "text" and last["type"] == "text":
+                    last["raw"] = last.get("raw", "") + token["raw"]
+                    last["text"] += token["text"]
+                else:
+                    tokens.append(token)
+                continue
+
+            token = self.em_strong(src, masked, prev_char)
+            if token:
+                src = src[len(token["raw"]):]
+                tokens.append(token)
+                continue
+
+            cap = INLINE["code"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                text = cap.group(2).replace("\n", " ")
+                if re.search(r"[^ ]", text) and text.startswith(" ") and text.endswith(" "):
+                    text = text[1:-1]
+                tokens.append({"type": "codespan", "text": escape(text, True)})
+                continue
+
+            cap = INLINE["br"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                tokens.append({"type": "br"})
+                continue
+
+            cap = INLINE["del"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                tokens.append({"type": "del", "tokens": self.inline_tokens(cap.group(2))})
+                continue
+
+            cap = INLINE["autolink"].search(src)
+            if cap:
+                src = src[len(cap.group(0)):]
+                text = escape(cap.group(1))
+                href = "mailto:" + text if cap.group(2) == "@" else text
+                tokens.append({"type": "link", "href": href, "title": None,
+                               "tokens": [{"type": "text", "text": text}]})
+                continue
+
+            if not self.in_link:
+                cap = INLINE["url"].search(src)
+                if cap:
+                    raw = cap.group(0)
+                    if cap.group(2) == "@":
+                        text = escape(raw)
+                        href = "mailto:" + text
+                    else:
+                        while True:
+                            previous = raw
+                            raw = INLINE["backpedal"].search(raw).group(0)
+                            if raw == previous:
+                                break
+                        text = escape(raw)
+                        href = "http://" + raw if cap.group(1) == "www." else raw
+                    src = src[len(raw):]
+                    tokens.append({"type": "link", "href": href, "title": None,
+                                   "tokens": [{"type": "text", "text": text}]})
+                    continue
+
+            cap = INLINE["text"].search(src)
+            if cap:
+                raw = cap.group(0)
+                src = src[len(raw):]
+                text = raw if self.in_raw_block else escape(raw)
+                if raw[-1] != "_":
+                    prev_char = raw[-1]
+                keep_prev = True
+                last = tokens[-1] if tokens else None
+                if last and last["type"] == "text":
+                    last["text"] += text
+                else:
+                    tokens.append({"type": "text", "text": text})
+                continue
+
+            raise ValueError(f"Infinite loop on byte: {ord(src[0])}")
+        return tokens
+
+    def _output_link(self, cap_text, href, title, raw):
+        title = escape(title) if title else None
+        text = re.sub(r"\\([\[\]])", r"\1", cap_text)
+        if raw[0] != "!":
+            self.in_link = True
+            children = self.inline_tokens(text)
+            self.in_link = False
+            return {"type": "link", "raw": raw, "href": href, "title": title, "tokens": children}
+        return {"type": "image", "raw": raw, "href": href, "title": title, "text": escape(text)}
+
+    def link(self, src):
+        cap = INLINE["link"].search(src)
+        if not cap:
+            return None
+        raw, label, href, title = cap.group(0), cap.group(1), cap.group(2), cap.group(3)
+        trimmed = href.strip()
+        if trimmed.startswith("<"):
+            if not trimmed.endswith(">"):
+                return None
+            rtrim_slash = rtrim(trimmed[:-1], "\\")
+            if (len(trimmed) - len(rtrim_slash)) % 2 == 0:
+                return None
+        else:
+            last_paren = find_closing_bracket(href, "()")
+            if last_paren > -1:
+                start = 5 if raw.startswith("!") else 4
+                link_len = start + len(label) + last_paren
+                href = href[:last_paren]
+                raw = raw[:link_len].strip()
+                title = ""
+        title = title[1:-1] if title else ""
+        href = href.strip()
+        if href.startswith("<"):
+            href = href[1:-1]
+        return self._output_link(
+            label,
+            INLINE["escapes"].sub(r"\1", href) if href else href,
+            INLINE["escapes"].sub(r"\1", title) if title else title,
+            raw,
+        )
+
+    def reflink(self, src):
+        cap = INLINE["reflink"].search(src) or INLINE["nolink"].search(src)
+        if not cap:
+            return None
+        name = cap.group(2) if cap.lastindex and cap.lastindex >= 2 and cap.group(2) else cap.group(1)
+        link = self.links.get(re.sub(r"\s+", " ", name).lower())
+        if not link:
+            text = cap.group(0)[0]
+            return {"type": "text", "raw": text, "text": text}
+        return self._output_link(cap.group(1), link["href"], link["title"], cap.group(0))
+
+    def em_strong(self, src, masked, prev_char=""):
+        match = INLINE["lDelim"].search(src)
+        if not match:
+            return None
+        if match.group(3) and re.match(r"[^\W_]", prev_char or " "):
+            return None
+        next_char = match.group(1) or match.group(2) or ""
+        if next_char and prev_char and not INLINE["punctuation"].search(prev_char):
+            return None
+        l_length = len(match.group(0)) - 1
+        delim_total = l_length
+        mid_delim_total = 0
+        end_reg = INLINE["rDelimAst"] if match.group(0)[0] == "*" else INLINE["rDelimUnd"]
+        masked = masked[len(masked) - len(src) + l_length:] if len(src) - l_length > 0 else masked[len(masked):]
+        for m in end_reg.finditer(masked):
+            groups = m.groups() + (None,) * (6 - len(m.groups()))
+            r_delim = next((g for g in groups if g), None)
+            if not r_delim:
+                continue
+            r_length = len(r_delim)
+            if groups[2] or groups[3]:
+                delim_total += r_length
+                continue
+            if groups[4] or groups[5]:
+                if l_length % 3 and not (l_length + r_length) % 3:
+                    mid_delim_total += r_length
+                    continue
+            delim_total -= r_length
+            if delim_total > 0:
+                continue
+            r_length = min(r_length, r_length + delim_total + mid_delim_total)
+            raw = src[:l_length + m.start() + 1 + r_length]
+            if min(l_length, r_length) % 2:
+                return {"type": "em", "raw": raw, "tokens": self.inline_tokens(raw[1:-1])}
+            return {"type": "strong", "raw": raw, "tokens": self.inline_tokens(raw[2:-2])}
+        return None
+
+
+# ---------- 输出 HTML ----------
+
+class Renderer:
+    """把 Lexer 的 token 输出为与 marked 相同的 HTML"""
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+
+    def inline(self, text):
+        return self.render_inline(self.lexer.inline_tokens(text))
+
+    def render(self, tokens, top=True):
+        out = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            kind = token["type"]
+            if kind == "space":
+                pass
+            elif kind == "hr":
+                out.append("<hr>\n")
+            elif kind == "heading":
+                depth = token["depth"]
+                id_attr = f' id="{token["id"]}"' if "id" in token else ""
+                out.append(f"<h{depth}{id_attr}>{self.inline(token['text'])}</h{depth}>\n")
+            elif kind == "code":
+                out.append(self.code(token["text"], token.get("lang")))
+            elif kind == "table":
+                out.append(self.table(token))
+            elif kind == "blockquote":
+                out.append(f"<blockquote>\n{self.render(token['tokens'])}</blockquote>\n")
+            elif kind == "list":
+                out.append(self.list(token))
+            elif kind == "html":
+                out.append(token["text"])
+            elif kind == "paragraph":
+                out.append(f"<p>{self.inline(token['text'])}</p>\n")
+            elif kind == "text":
+                body = token["prefix"] + self.inline(token["text"]) if "prefix" in token else \
+                    self.inline(token["text"])
+                while i + 1 < len(tokens) and tokens[i + 1]["type"] == "text":
+                    i += 1
+                    body += "\n" + self.inline(tokens[i]["text"])
+                out.append(f"<p>{body}</p>\n" if top else body)
+            else:
+                raise ValueError(f'Token with "{kind}" type was not found.')
+            i += 1
+        return "".join(out)
+
+    @staticmethod
+    def code(code, infostring):
+        match = re.match(r"^[^\s]*", infostring or "")
+        lang = match.group(0) if match else ""
+        code = re.sub(r"\n\Z", "", code) + "\n"
+        if not lang:
+            return f"<pre><code>{escape(code, True)}</code></pre>\n"
+        return f'<pre><code class="language-{escape(lang)}">{escape(code, True)}</code></pre>\n'
+
+    def table(self, token):
+        def cell(content, tag, align):
+            open_tag = f'<{tag} align="{align}">' if align else f"<{tag}>"
+            return f"{open_tag}{content}</{tag}>\n"
+
+        header = "".join(cell(self.inline(text), "th", token["align"][j])
+                         for j, text in enumerate(token["header"]))
+        body = "".join(
+            "<tr>\n" + "".join(cell(self.inline(text), "td", token["align"][k])
+                               for k, text in enumerate(row)) + "</tr>\n"
+            for row in token["rows"]
+        )
+        if body:
+            body = f"<tbody>{body}</tbody>"
+        return f"<table>\n<thead>\n<tr>\n{header}</tr>\n</thead>\n{body}</table>\n"
+
+    def list(self, token):
+        loose = token["loose"]
+        body = []
+        for item in token["items"]:
+            item_body = ""
+            tokens = item["tokens"]
+            if item["task"]:
+                checkbox = ('<input checked="" disabled="" type="checkbox">' if item["checked"]
+                            else '<input disabled="" type="checkbox">')
+                if loose:
+                    if tokens and tokens[0]["type"] == "paragraph":
+                        first = tokens[0]
+                        inline = self.lexer.inline_tokens(first["text"])
+                        if inline and inline[0]["type"] == "text":
+                            inline[0] = dict(inline[0], text=f"{checkbox} {inline[0]['text']}")
+                        tokens = [dict(first, type="_rendered",
+                                       html=f"<p>{self.render_inline(inline)}</p>\n")] + tokens[1:]
+                    else:
+                        tokens = [{"type": "text", "text": "", "prefix": checkbox + " "}] + tokens
+                else:
+                    item_body += checkbox + " "
+            item_body += self._render_item(tokens, loose)
+            body.append(f"<li>{item_body}</li>\n")
+        tag = "ol" if token["ordered"] else "ul"
+        start = token["start"]
+        start_attr = f' start="{start}"' if token["ordered"] and start != 1 else ""
+        return f"<{tag}{start_attr}>\n{''.join(body)}</{tag}>\n"
+
+    def _render_item(self, tokens, loose):
+        if tokens and tokens[0]["type"] == "_rendered":
+            return tokens[0]["html"] + self.render(tokens[1:], loose)
+        return self.render(tokens, loose)
+
+    def render_inline(self, tokens):
+        out = []
+        for token in tokens:
+            kind = token["type"]
+            if kind in ("text", "html"):
+                out.append(token["text"])
+            elif kind == "link":
+                out.append(self.link(token["href"], token["title"], self.render_inline(token["tokens"])))
+            elif kind == "image":
+                href = clean_url(token["href"])
+                if href is None:
+                    out.append(token["text"])
+                else:
+                    title = f' title="{token["title"]}"' if token["title"] else ""
+                    out.append(f'<img src="{href}" alt="{token["text"]}"{title}>')
+            elif kind == "strong":
+                out.append(f"<strong>{self.render_inline(token['tokens'])}</strong>")
+            elif kind == "em":
+                out.append(f"<em>{self.render_inline(token['tokens'])}</em>")
+            elif kind == "codespan":
+                out.append(f"<code>{token['text']}</code>")
+            elif kind == "br":
+                out.append("<br>")
+            elif kind == "del":
+                out.append(f"<del>{self.render_inline(token['tokens'])}</del>")
+            else:
+                raise ValueError(f'Token with "{kind}" type was not found.')
+        return "".join(out)
+
+    @staticmethod
+    def link(href, title, text):
+        href = clean_url(href)
+        if href is None:
+            return text
+        title = f' title="{title}"' if title else ""
+        return f'<a href="{href}"{title}>{text}</a>'
+
+
+# ---------- 标题 id（与 marked-gfm-heading-id / github-slugger 一致） ----------
+
+# github-slugger 保留字母、组合符号、十进制和字母数字、连接符号（_），以及 - 和空格
+_SLUG_CATEGORIES = {"Lu", "Ll", "Lt", "Lm", "Lo", "Mn", "Mc", "Me", "Nd", "Nl", "Pc"}
+_UNESCAPE = re.compile(r"&(#(?:\d+)|(?:#x[0-9A-Fa-f]+)|(?:\w+));?", re.I)
+_HEADING_TAG = re.compile(r"<[!/a-z].*?>", re.I)
+
+
+def unescape(html):
+    """marked 的 unescape：只还原数字实体和 &colon;，其他命名实体直接去掉"""
+    def replace(match):
+        name = match.group(1).lower()
+        if name == "colon":
+            return ":"
+        if name.startswith("#x"):
+            return chr(int(name[2:], 16))
+        if name.startswith("#"):
+            return chr(int(name[1:]))
+        return ""
+    return _UNESCAPE.sub(replace, html)
+
+
+def slugify(text):
+    return "".join(
+        ch for ch in text.lower() if ch in "- " or unicodedata.category(ch) in _SLUG_CATEGORIES
+    ).replace(" ", "-")
+
+
+class Slugger:
+    """一篇文档内的标题 id；重复的标题依次加 -1、-2 后缀"""
+
+    def __init__(self):
+        self.occurrences = {}
+
+    def slug(self, text):
+        original = result = slugify(text)
+        while result in self.occurrences:
+            self.occurrences[original] += 1
+            result = f"{original}-{self.occurrences[original]}"
+        self.occurrences[result] = 0
+        return result
+
+
+def _plain_text(tokens):
+    """行内 token 的纯文本（marked 的 TextRenderer）"""
+    out = []
+    for token in tokens:
+        kind = token["type"]
+        if kind in ("link", "strong", "em", "del"):
+            out.append(_plain_text(token["tokens"]))
+        elif kind != "br":
+            out.append(token["text"])
+    return "".join(out)
+
+
+def heading_text(text, links=None):
+    """标题行内 Markdown 的纯文本"""
+    lexer = Lexer()
+    lexer.links = links or {}
+    return unescape(_plain_text(lexer.inline_tokens(text)))
+
+
+def heading_id(text, slugger, links=None):
+    """标题的 id，slugger 记录同一文档中已经用过的 id"""
+    return slugger.slug(_HEADING_TAG.sub("", heading_text(text, links).lower().strip()))
+
+
+def iter_headings(tokens):
+    """按文档顺序产出标题 token（包括引用块和列表中的标题）"""
+    for token in tokens:
+        if token["type"] == "heading":
+            yield token
+        elif token["type"] == "blockquote":
+            yield from iter_headings(token["tokens"])
+        elif token["type"] == "list":
+            for item in token["items"]:
+                yield from iter_headings(item["tokens"])
+
+
+def assign_heading_ids(tokens, links):
+    slugger = Slugger()
+    for token in iter_headings(tokens):
+        token["id"] = heading_id(token["text"], slugger, links)
+
+
+def render(markdown, heading_ids=True):
+    """渲染一篇 Markdown（不使用缓存）；heading_ids=False 时与未加扩展的 marked 输出一致"""
+    lexer = Lexer()
+    tokens = lexer.lex(markdown)
+    if heading_ids:
+        assign_heading_ids(tokens, lexer.links)
+    return Renderer(lexer).render(tokens)
+
+
+# ---------- 块缓存 ----------
+
+class BlockCache:
+    """顶层块的 HTML 缓存：{块哈希: (html, 渲染后的行内状态)}"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS blocks (
+        key TEXT PRIMARY KEY,
+        html TEXT NOT NULL,
+        state INTEGER NOT NULL,
+        used INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            ensure_dir(os.path.dirname(path))
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(self.SCHEMA)
+
+    @classmethod
+    def open_readonly(cls, path):
+        """子进程只读打开；缓存还不存在时返回 None"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path, readonly=True)
+        except sqlite3.Error:
+            return None
+
+    def get_many(self, keys):
+        """{key: (html, state, used)}"""
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, html, state, used FROM blocks WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for key, html, state, used in rows:
+                found[key] = (html, state, used)
+        return found
+
+    def put_many(self, entries, today):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO blocks (key, html, state, used) VALUES (?, ?, ?, ?)",
+            [(key, html, state, today) for key, html, state in entries],
+        )
+
+    def touch(self, keys, today):
+        self.conn.executemany("UPDATE blocks SET used = ? WHERE key = ?", [(today, k) for k in keys])
+
+    def prune(self, today, max_age=CACHE_MAX_AGE_DAYS):
+        return self.conn.execute("DELETE FROM blocks WHERE used < ?", (today - max_age,)).rowcount
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def _state_code(lexer):
+    return int(lexer.in_link) | int(lexer.in_raw_block) << 1
+
+
+def _set_state(lexer, code):
+    lexer.in_link = bool(code & 1)
+    lexer.in_raw_block = bool(code & 2)
+
+
+def document_key(markdown):
+    """整篇文档的缓存键：正文没变时连块切分都可以跳过"""
+    return text_sha256(f"{RENDERER_VERSION}\0document\0{markdown}") + ":doc"
+
+
+def render_document(markdown, lookup=None):
+    """
+    按顶层块渲染一篇 Markdown
+
+    lookup(keys) 返回已缓存的 {key: (html, state, used)}；
+    返回 (html, 新渲染的块 [(key, html, state)], 命中的块 {key: used}, 块数)
+    """
+    lexer = Lexer()
+    tokens = lexer.lex(markdown)
+    assign_heading_ids(tokens, lexer.links)
+    renderer = Renderer(lexer)
+    # 引用式链接的定义影响所有块的输出，计入每个块的键
+    links_key = json.dumps(sorted(lexer.links.items()), ensure_ascii=False) if lexer.links else ""
+    blocks = [token for token in tokens if token["type"] != "space"]
+    # 标题 id 取决于前面的同名标题，也计入键
+    keys = [text_sha256(f"{RENDERER_VERSION}\0{links_key}\0{token['type']}\0{token['raw']}\0"
+                        + "\0".join(h["id"] for h in iter_headings([token])))
+            for token in blocks]
+    cached = lookup({f"{k}:{s}" for k in keys for s in range(4)}) if lookup and keys else {}
+
+    out = []
+    new = []
+    hits = {}
+    # 行内状态（是否在 <a>、<pre> 等标签内）会跨块延续，作为键的一部分
+    state = 0
+    for token, base_key in zip(blocks, keys):
+        key = f"{base_key}:{state}"
+        entry = cached.get(key)
+        if entry is not None:
+            html, state, used = entry
+            hits[key] = used
+        else:
+            _set_state(lexer, state)
+            html = renderer.render([token])
+            state = _state_code(lexer)
+            new.append((key, html, state))
+        out.append(html)
+    return "".join(out), new, hits, len(blocks)
+
+
+def _render_chunk(job):
+    """渲染一批文章（可在子进程中运行），返回每篇的 (html, 新块, 命中, 块数)"""
+    bodies, cache_file = job
+    cache = BlockCache.open_readonly(cache_file)
+    lookup = cache.get_many if cache is not None else None
+    documents = lookup([document_key(body) for body in bodies]) if lookup else {}
+    results = []
+    try:
+        for body in bodies:
+            doc_key = document_key(body)
+            entry = documents.get(doc_key)
+            if entry is not None:
+                results.append((entry[0], [], {doc_key: entry[2]}, 0))
+                continue
+            html, new, hits, count = render_document(body, lookup)
+            new.append((doc_key, html, 0))
+            results.append((html, new, hits, count))
+    finally:
+        if cache is not None:
+            cache.close()
+    return results
+
+
+def render_batch(bodies, root=None, workers=None, use_cache=True):
+    """
+    渲染一批 Markdown，返回 (HTML 列表, 统计)
+
+    统计: {"documents", "unchanged", "blocks", "rendered", "cached"}，
+    unchanged 是整篇命中缓存的文档数，blocks/rendered/cached 只统计其余文档的块
+    """
+    cache_file = cache_path(CACHE_NAME, root or BLOG_DIR) if use_cache else None
+    if len(bodies) < PARALLEL_THRESHOLD:
+        results = _render_chunk((bodies, cache_file))
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunks = [(bodies[i:i + CHUNK_SIZE], cache_file) for i in range(0, len(bodies), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [doc for chunk in pool.map(_render_chunk, chunks) for doc in chunk]
+
+    stats = {"documents": len(bodies), "unchanged": 0, "blocks": 0, "rendered": 0, "cached": 0}
+    new = {}
+    stale = set()
+    today = date.today().toordinal()
+    for _, doc_new, doc_hits, count in results:
+        if not doc_new:
+            stats["unchanged"] += 1
+        else:
+            stats["blocks"] += count
+            stats["rendered"] += len(doc_new) - 1
+            stats["cached"] += count - len(doc_new) + 1
+        for key, html, state in doc_new:
+            new[key] = (key, html, state)
+        # 每天最多更新一次使用日期
+        stale.update(key for key, used in doc_hits.items() if used != today)
+
+    if cache_file and (new or stale):
+        cache = BlockCache(cache_file)
+        try:
+            cache.put_many(new.values(), today)
+            cache.touch(stale, today)
+            cache.prune(today)
+            cache.commit()
+        finally:
+            cache.close()
+    return [html for html, _, _, _ in results], stats
+
+
+# ---------- 与 marked 比较 ----------
+
+MARKED_SCRIPT = (
+    "const {marked}=require('marked');let s='';"
+    "process.stdin.setEncoding('utf8');"
+    "process.stdin.on('data',d=>s+=d);"
+    "process.stdin.on('end',()=>process.stdout.write("
+    "JSON.stringify(JSON.parse(s).map(t=>marked(t)))));"
+)
+
+
+def render_with_marked(bodies, root=None):
+    """用 node 的 marked 渲染（对照用）"""
+    result = subprocess.run(
+        ["node", "-e", MARKED_SCRIPT],
+        cwd=root or BLOG_DIR,
+        input=json.dumps(bodies, ensure_ascii=False),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def compare(paths, root=None):
+    """逐篇比较本模块与 marked 的输出，返回不一致的文件列表"""
+    bodies = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            bodies.append(parse_front_matter(f.read())[1])
+    expected = render_with_marked(bodies, root)
+    mismatched = []
+    for path, body, want in zip(paths, bodies, expected):
+        got = render(body, heading_ids=False)
+        if got != want:
+            mismatched.append(path)
+            for i, (a, b) in enumerate(zip(got, want)):
+                if a != b:
+                    break
+            else:
+                i = min(len(got), len(want))
+            print(f"❌ {os.path.basename(path)}: 第 {i} 个字符起不同")
+            print(f"   python: {got[max(0, i - 60):i + 60]!r}")
+            print(f"   marked: {want[max(0, i - 60):i + 60]!r}")
+    print(f"比较 {len(paths)} 篇，{len(paths) - len(mismatched)} 篇一致")
+    return mismatched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Markdown 渲染（marked 兼容）")
+    parser.add_argument("files", nargs="*", help="Markdown 文件")
+    parser.add_argument("--compare", action="store_true", help="与 marked 的输出逐篇比较")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        paths = args.files or sorted(
+            os.path.join(posts_dir(), name) for name in os.listdir(posts_dir()) if name.endswith(".md")
+        )
+        return 1 if compare(paths) else 0
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            sys.stdout.write(render(parse_front_matter(f.read())[1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
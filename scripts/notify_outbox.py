@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通知发件箱
+
+通知先写进 .cache/notify-outbox.sqlite3，再由投递器通过 HTTP（保持连接复用）发到
+飞书机器人 webhook。同一篇文章同一天只入队一次；投递失败按指数退避重试，超过
+最大次数标记为 dead；同一个 webhook 积压的多条通知合并成一条消息发送。
+
+webhook 地址和签名密钥来自环境变量 FEISHU_WEBHOOK_URL / FEISHU_WEBHOOK_SECRET。
+
+用法:
+    python3 scripts/notify_outbox.py                    # 查看发件箱
+    python3 scripts/notify_outbox.py --dispatch         # 投递到期的通知
+    python3 scripts/notify_outbox.py --serve-test 8099  # 本地模拟 webhook（--fail-rate 0.5 模拟失败）
+
+在本地模拟 webhook 上试验:
+    python3 scripts/notify_outbox.py --serve-test 8099 &
+    FEISHU_WEBHOOK_URL=http://127.0.0.1:8099/hook python3 scripts/notify_outbox.py --dispatch
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import base64
+import random
+import hashlib
+import sqlite3
+import argparse
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from blog_utils import cache_path, ensure_dir
+
+OUTBOX_NAME = "notify-outbox.sqlite3"
+SCHEMA_VERSION = 1
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# 一条合并消息最多包含多少条通知
+MAX_BATCH = 10
+HTTP_TIMEOUT = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    webhook TEXT NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    created REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+"""
+
+
+class DeliveryError(Exception):
+    """webhook 返回失败"""
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """第 attempts 次失败后的等待秒数（指数退避 + 随机抖动）"""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class HttpPool:
+    """按 (协议, 主机, 端口) 复用 HTTP/1.1 长连接"""
+
+    def __init__(self, timeout=HTTP_TIMEOUT):
+        self.timeout = timeout
+        self._connections = {}
+
+    def _connection(self, scheme, netloc):
+        key = (scheme, netloc)
+        conn = self._connections.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=self.timeout)
+            self._connections[key] = conn
+        return conn
+
+    def _drop(self, key):
+        conn = self._connections.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+    def post_json(self, url, payload):
+        """POST JSON，返回 (状态码, 响应正文)；复用的连接被服务器关闭时重连一次"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        for attempt in (1, 2):
+            reused = key in self._connections
+            conn = self._connection(*key)
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+                    http.client.CannotSendRequest, http.client.BadStatusLine):
+                self._drop(key)
+                if reused and attempt == 1:
+                    continue
+                raise
+            except OSError:
+                self._drop(key)
+                raise
+            if response.will_close:
+                self._drop(key)
+            return response.status, data.decode("utf-8", "replace")
+
+    def close(self):
+        for key in list(self._connections):
+            self._drop(key)
+
+
+def feishu_payload(text, secret=None):
+    """飞书自定义机器人的文本消息（配置了签名密钥时附带签名）"""
+    payload = {"msg_type": "text", "content": {"text": text}}
+    if secret:
+        timestamp = str(int(time.time()))
+        string_to_sign = f"{timestamp}\n{secret}".encode("utf-8")
+        sign = base64.b64encode(hmac.new(string_to_sign, digestmod=hashlib.sha256).digest())
+        payload.update({"timestamp": timestamp, "sign": sign.decode("ascii")})
+    return payload
+
+
+def check_response(status, body):
+    """2xx 且飞书返回码为 0 才算成功"""
+    if not 200 <= status < 300:
+        raise DeliveryError(f"HTTP {status}: {body[:200]}")
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        return
+    code = data.get("code", data.get("StatusCode", 0)) if isinstance(data, dict) else 0
+    if code:
+        raise DeliveryError(f"webhook 返回 {code}: {data.get('msg') or data.get('StatusMessage')}")
+
+
+def merge_texts(texts):
+    """多条通知合并成一条消息"""
+    if len(texts) == 1:
+        return texts[0]
+    return f"📬 共 {len(texts)} 条通知\n\n" + "\n\n---\n\n".join(texts)
+
+
+class Outbox:
+    """持久化的通知发件箱"""
+
+    def __init__(self, path=None):
+        self.path = path or cache_path(OUTBOX_NAME)
+        ensure_dir(os.path.dirname(self.path))
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS outbox")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def enqueue(self, dedup_key, text, webhook):
+        """入队，同一个 dedup_key 已存在时忽略；返回是否新入队"""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (dedup_key, webhook, text, next_attempt, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (dedup_key, webhook, text, now, now),
+            )
+        return cursor.rowcount == 1
+
+    def due(self, now=None):
+        """到期待投递的通知，按 webhook 分组 {webhook: [row, ...]}"""
+        now = time.time() if now is None else now
+        groups = {}
+        for row in self.conn.execute(
+            "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt <= ? ORDER BY id",
+            (now,),
+        ):
+            groups.setdefault(row["webhook"], []).append(row)
+        return groups
+
+    def mark_sent(self, ids):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1, "
+                "last_error = NULL WHERE id = ?",
+                [(time.time(), i) for i in ids],
+            )
+
+    def mark_failed(self, rows, error):
+        """记录失败并安排重试；超过最大次数标记为 dead"""
+        now = time.time()
+        with self.conn:
+            for row in rows:
+                attempts = row["attempts"] + 1
+                status = "dead" if attempts >= MAX_ATTEMPTS else "pending"
+                self.conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ? "
+                    "WHERE id = ?",
+                    (status, attempts, now + backoff_delay(attempts), str(error)[:500], row["id"]),
+                )
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+    def recent(self, limit=10):
+        return self.conn.execute(
+            "SELECT * FROM outbox ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+
+def dispatch(outbox, pool=None, secret=None, max_batch=MAX_BATCH, verbose=True):
+    """投递所有到期的通知，返回 {"sent": n, "failed": n, "requests": n}"""
+    own_pool = pool is None
+    pool = pool or HttpPool()
+    secret = secret if secret is not None else os.environ.get("FEISHU_WEBHOOK_SECRET")
+    stats = {"sent": 0, "failed": 0, "requests": 0}
+    try:
+        for webhook, rows in outbox.due().items():
+            for i in range(0, len(rows), max_batch):
+                batch = rows[i:i + max_batch]
+                payload = feishu_payload(merge_texts([row["text"] for row in batch]), secret)
+                stats["requests"] += 1
+                try:
+                    check_response(*pool.post_json(webhook, payload))
+                except (OSError, http.client.HTTPException, DeliveryError) as e:
+                    outbox.mark_failed(batch, e)
+                    stats["failed"] += len(batch)
+                    if verbose:
+                        print(f"⚠️  通知投递失败（{len(batch)} 条，稍后重试）: {e}")
+                    continue
+                outbox.mark_sent([row["id"] for row in batch])
+                stats["sent"] += len(batch)
+    finally:
+        if own_pool:
+            pool.close()
+    if verbose and stats["requests"]:
+        print(f"📨 通知: 投递 {stats['sent']} 条，失败 {stats['failed']} 条，"
+              f"{stats['requests']} 次请求")
+    return stats
+
+
+def notify(dedup_key, text, webhook=None, outbox_path=None, verbose=True):
+    """入队一条通知并立即尝试投递；没有配置 webhook 时返回 None"""
+    webhook = webhook or os.environ.get("FEISHU_WEBHOOK_URL")
+    if not webhook:
+        return None
+    with Outbox(outbox_path) as outbox:
+        if not outbox.enqueue(dedup_key, text, webhook) and verbose:
+            print(f"通知已在发件箱中，不重复入队: {dedup_key}")
+        return dispatch(outbox, verbose=verbose)
+
+
+class _TestWebhook(BaseHTTPRequestHandler):
+    """本地模拟的飞书 webhook"""
+
+    protocol_version = "HTTP/1.1"
+    fail_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if random.random() < self.fail_rate:
+            status, body = 500, {"code": 500, "msg": "simulated failure"}
+        else:
+            status, body = 200, {"code": 0, "msg": "success"}
+            print(f"--- 收到通知 ---\n{payload.get('content', {}).get('text', '')}\n", flush=True)
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_test_webhook(port, fail_rate=0.0):
+    handler = type("TestWebhook", (_TestWebhook,), {"fail_rate": fail_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    print(f"模拟 webhook: http://127.0.0.1:{port}/hook（失败率 {fail_rate:.0%}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="通知发件箱")
+    parser.add_argument("--dispatch", action="store_true", help="投递到期的通知")
+    parser.add_argument("--serve-test", type=int, metavar="PORT", help="启动本地模拟 webhook")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="模拟 webhook 的失败率")
+    args = parser.parse_args(argv)
+
+    if args.serve_test:
+        serve_test_webhook(args.serve_test, args.fail_rate)
+        return 0
+    with Outbox() as outbox:
+        if args.dispatch:
+            dispatch(outbox)
+        print(f"发件箱: {outbox.counts() or '空'}")
+        for row in outbox.recent():
+            error = f"  ({row['last_error']})" if row["last_error"] else ""
+            print(f"  #{row['id']} {row['status']:<7} 尝试 {row['attempts']} 次  "
+                  f"{row['dedup_key']}{error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
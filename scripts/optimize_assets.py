@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态资源指纹和预压缩（作用于 dist/）
+
+1. css/*.css、js/*.js 按内容哈希复制一份带指纹的文件（style.<hash>.css），
+   HTML 中 href/src 对它们的引用改写为带指纹的文件名，可以放心长期缓存；
+   原文件保留（CMS 预览等脚本里写死的路径仍然可用）。
+   手写的页面（首页、关于页等）中的 <img> 同时补上 srcset、尺寸和懒加载属性。
+2. 文本文件（html/css/js/json/svg/xml/txt）写出 .gz 和 .br（brotli 可选）兄弟文件。
+   压缩结果按内容哈希保存在 .cache/precompressed/，内容没变的文件不会重新压缩；
+   需要压缩的文件多时用进程池并行。
+
+用法:
+    python3 scripts/optimize_assets.py            # 处理 dist/（通常由 package_site.py 调用）
+"""
+
+import os
+import re
+import sys
+import gzip
+import shutil
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from blog_utils import BLOG_DIR, cache_path, file_sha256, text_sha256, atomic_write, load_json, save_json
+import image_pipeline
+from image_pipeline import CARD_SIZES, EAGER_CARDS, ImageCatalog
+
+STATE_NAME = "assets-state.json"
+PRECOMPRESSED_DIRNAME = "precompressed"
+FINGERPRINT_DIRS = {"css": ".css", "js": ".js"}
+COMPRESS_EXTENSIONS = (".html", ".css", ".js", ".json", ".svg", ".xml", ".txt")
+# 小于这个大小的文件压缩收益很小
+MIN_COMPRESS_BYTES = 512
+# 需要压缩的文件达到这个数量时使用进程池
+PARALLEL_THRESHOLD = 32
+# 带指纹文件名中的哈希长度
+HASH_LENGTH = 10
+
+_FINGERPRINTED = re.compile(r"\.[0-9a-f]{%d}\.[a-z]+$" % HASH_LENGTH)
+_REF = re.compile(r"""(?P<attr>\b(?:href|src))=(?P<q>["'])(?P<url>[^"'#?]+)(?P<rest>[^"']*)(?P=q)""")
+
+
+def fingerprint_name(rel, digest):
+    """css/style.css -> css/style.<hash>.css"""
+    stem, ext = posixpath.splitext(rel)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def fingerprint_assets(dist, sources):
+    """为 css/js 写出带指纹的副本，返回 {原路径: 带指纹路径}"""
+    mapping = {}
+    for rel, entry in sources.items():
+        directory = rel.split("/", 1)[0]
+        if FINGERPRINT_DIRS.get(directory) != posixpath.splitext(rel)[1]:
+            continue
+        if _FINGERPRINTED.search(rel):
+            continue
+        target = fingerprint_name(rel, entry["sha256"])
+        target_path = os.path.join(dist, target)
+        if not os.path.exists(target_path):
+            shutil.copy2(os.path.join(dist, rel), target_path)
+        mapping[rel] = target
+    return mapping
+
+
+def rewrite_references(html, html_rel, mapping):
+    """把 HTML 中指向 mapping 里资源的 href/src 改写为带指纹的路径"""
+    base = posixpath.dirname(html_rel)
+
+    def replace(match):
+        url = match.group("url")
+        if "://" in url or url.startswith("//"):
+            return match.group(0)
+        if url.startswith("/"):
+            target = url.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join(base, url))
+        if target not in mapping:
+            return match.group(0)
+        new_url = url[: len(url) - len(posixpath.basename(url))] + posixpath.basename(mapping[target])
+        return f"{match.group('attr')}={match.group('q')}{new_url}{match.group('rest')}{match.group('q')}"
+
+    return _REF.sub(replace, html)
+
+
+def _compressed_paths(cache_dir, digest):
+    base = os.path.join(cache_dir, digest[:2], digest)
+    return base + ".gz", base + ".br"
+
+
+def _compress(job):
+    """压缩一个文件到缓存目录（可在子进程中运行），返回写出的格式"""
+    path, digest, cache_dir = job
+    with open(path, "rb") as f:
+        data = f.read()
+    gz_path, br_path = _compressed_paths(cache_dir, digest)
+    written = []
+    if not os.path.exists(gz_path):
+        atomic_write(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+        written.append("gz")
+    if brotli is not None and not os.path.exists(br_path):
+        atomic_write(br_path, brotli.compress(data, quality=11))
+        written.append("br")
+    return written
+
+
+def _link_or_copy(src, dst):
+    try:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def precompress(dist, files, cache_dir=None, workers=None):
+    """
+    为 files（{dist 相对路径: sha256}）写出 .gz/.br 兄弟文件
+
+    返回 (本次实际压缩的文件数, 写出的兄弟文件列表)
+    """
+    cache_dir = cache_dir or cache_path(PRECOMPRESSED_DIRNAME)
+    formats = ("gz", "br") if brotli is not None else ("gz",)
+    jobs = []
+    for rel, digest in files.items():
+        gz_path, br_path = _compressed_paths(cache_dir, digest)
+        missing = not os.path.exists(gz_path) or (brotli is not None and not os.path.exists(br_path))
+        if missing:
+            jobs.append((os.path.join(dist, rel), digest, cache_dir))
+
+    if len(jobs) < PARALLEL_THRESHOLD:
+        list(map(_compress, jobs))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_compress, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    siblings = []
+    for rel, digest in files.items():
+        for fmt, cached in zip(("gz", "br"), _compressed_paths(cache_dir, digest)):
+            if fmt not in formats:
+                continue
+            target = os.path.join(dist, f"{rel}.{fmt}")
+            # 已经是同一个缓存文件（硬链接）时不用再链接
+            try:
+                if os.path.samefile(cached, target):
+                    siblings.append(f"{rel}.{fmt}")
+                    continue
+            except FileNotFoundError:
+                pass
+            _link_or_copy(cached, target)
+            siblings.append(f"{rel}.{fmt}")
+    return len(jobs), siblings
+
+
+def optimize(root, dist, sources, copied=(), workers=None, verbose=True):
+    """
+    对 dist 做指纹和预压缩
+
+    sources 是 package_site 的源文件清单 {路径: {"size", "sha256"}}，
+    copied 是本次刚从源文件复制到 dist 的路径（其中的 HTML 必须重新改写）；
+    返回 {"fingerprinted": {...}, "rewritten": n, "compressed": n, "outputs": [...]}
+    """
+    state_path = cache_path(STATE_NAME, root)
+    state = load_json(state_path, {}) or {}
+    mapping = fingerprint_assets(dist, sources)
+    images = ImageCatalog.load(root)
+    rewrite_digest = text_sha256(repr([
+        sorted(mapping.items()), images.digest(), file_sha256(image_pipeline.__file__),
+    ]))
+
+    # 源文件、资源映射、图片清单或图片标记规则变了的 HTML 才重新改写
+    html_state = state.get("html", {})
+    copied = set(copied)
+    rewritten = 0
+    for rel, entry in sources.items():
+        if not rel.endswith(".html"):
+            continue
+        key = [entry["sha256"], rewrite_digest]
+        if html_state.get(rel) == key and rel not in copied:
+            continue
+        with open(os.path.join(root, rel), "r", encoding="utf-8") as f:
+            html = f.read()
+        html = rewrite_references(html, rel, mapping)
+        if not rel.startswith("admin/"):
+            # 手写页面中的图片基本都是文章卡片；第一行卡片在首屏，不懒加载
+            html = images.enhance_html(html, "../" * rel.count("/") or "./", CARD_SIZES,
+                                       eager=EAGER_CARDS)
+        atomic_write(os.path.join(dist, rel), html)
+        html_state[rel] = key
+        rewritten += 1
+    for rel in list(html_state):
+        if rel not in sources:
+            del html_state[rel]
+
+    # 需要压缩的文件：源文件（HTML 用改写后的内容）+ 带指纹的副本
+    digests = state.get("digests", {})
+    to_compress = {}
+    for rel, entry in sources.items():
+        if not rel.endswith(COMPRESS_EXTENSIONS) or entry["size"] < MIN_COMPRESS_BYTES:
+            continue
+        if rel.endswith(".html"):
+            key = "|".join(html_state[rel])
+            if key not in digests:
+                digests[key] = file_sha256(os.path.join(dist, rel))
+            to_compress[rel] = digests[key]
+        else:
+            to_compress[rel] = entry["sha256"]
+    for rel, target in mapping.items():
+        if target.endswith(COMPRESS_EXTENSIONS) and sources[rel]["size"] >= MIN_COMPRESS_BYTES:
+            to_compress[target] = sources[rel]["sha256"]
+    live_keys = {"|".join(v) for v in html_state.values()}
+    digests = {k: v for k, v in digests.items() if k in live_keys}
+
+    compressed, siblings = precompress(dist, to_compress, cache_path(PRECOMPRESSED_DIRNAME, root), workers)
+    outputs = sorted(set(mapping.values()) | set(siblings))
+
+    # 清理上次生成、这次不再需要的文件（旧指纹、删除文件的压缩副本）
+    for rel in set(state.get("outputs", [])) - set(outputs):
+        try:
+            os.remove(os.path.join(dist, rel))
+        except FileNotFoundError:
+            pass
+
+    save_json(state_path, {"html": html_state, "digests": digests, "outputs": outputs}, compact=True)
+    result = {
+        "fingerprinted": mapping,
+        "rewritten": rewritten,
+        "compressed": compressed,
+        "outputs": outputs,
+    }
+    if verbose:
+        formats = "gz/br" if brotli is not None else "gz（未安装 brotli，跳过 br）"
+        print(f"🗜️  资源: 指纹 {len(mapping)} 个，改写 HTML {rewritten} 个，"
+              f"新压缩 {compressed} 个文件（{formats}），共 {len(siblings)} 个压缩副本")
+    return result
+
+
+def main():
+    import package_site
+
+    root = BLOG_DIR
+    dist = os.path.join(root, package_site.DIST_DIRNAME)
+    sources = package_site.build_manifest(root)
+    copied, _ = package_site.sync_dist(root, dist, sources)
+    optimize(root, dist, sources, copied=copied)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
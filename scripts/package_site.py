@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打包部署产物
+
+只把需要发布的文件（页面（含分页和标签 / 分类归档页）、css/js/图片（含 CMS 上传的 content/images/）、搜索索引、
+about/contact 页面读取的 JSON、CMS 后台入口）同步到 dist/，node_modules、scripts、文章源文件和其他后台配置不会进入产物。
+
+每次打包生成 dist/deploy-manifest.json（路径 → 大小、SHA-256）。GitHub Actions / Netlify
+打包后上传整个 dist/，这份清单随产物上线，线上的 /deploy-manifest.json 就是当前实际部署的内容。
+用 --previous 指定上一次部署的清单（文件或 URL，通常是线上的 /deploy-manifest.json）时，
+比较得到新增 / 修改 / 删除的文件，输出:
+    .cache/deploy/delta.tar.gz      只包含新增和修改的文件
+    .cache/deploy/upload-plan.json  需要上传和删除的路径、字节数
+没有 --previous 或读取失败时，所有文件都算新增。
+
+用法:
+    python3 scripts/package_site.py
+    python3 scripts/package_site.py --previous https://example.com/deploy-manifest.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tarfile
+import argparse
+import fnmatch
+import posixpath
+import urllib.request
+
+from blog_utils import BLOG_DIR, cache_path, file_sha256, text_sha256, load_json, save_json
+import optimize_assets
+
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "deploy-manifest.json"
+HASH_CACHE_NAME = "package-hashes.json"
+DIST_HASH_CACHE_NAME = "dist-hashes.json"
+SYNC_STATE_NAME = "package-sync.json"
+BUNDLE_DIRNAME = "deploy"
+
+# 需要发布的文件（相对仓库根目录；目录/** 表示整个目录）
+PUBLISH_PATTERNS = (
+    "*.html",
+    "*.xml",
+    "posts/*.html",
+    "page/*.html",
+    "tags/**",
+    "categories/**",
+    "search/*.json",
+    "css/**",
+    "js/**",
+    "images/**",
+    "content/images/**",
+    "content/site.json",
+    "content/about.json",
+    "content/contact.json",
+    "admin/index.html",
+    "admin/config.yml",
+)
+EXCLUDE_PATTERNS = ("*.md", "admin/config-*.yml", ".*")
+
+
+def _walk(directory):
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            yield os.path.join(dirpath, name)
+
+
+def publishable_files(root=None):
+    """需要发布的文件的相对路径（/ 分隔），只遍历规则涉及的目录"""
+    root = root or BLOG_DIR
+    paths = set()
+    for pattern in PUBLISH_PATTERNS:
+        directory, name = posixpath.split(pattern)
+        base = os.path.join(root, directory)
+        if not os.path.isdir(base):
+            continue
+        if name == "**":
+            candidates = _walk(base)
+        else:
+            candidates = (os.path.join(base, n) for n in fnmatch.filter(os.listdir(base), name))
+        for path in candidates:
+            if not os.path.isfile(path):
+                continue
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            if not any(fnmatch.fnmatch(rel, ex) or fnmatch.fnmatch(posixpath.basename(rel), ex)
+                       for ex in EXCLUDE_PATTERNS):
+                paths.add(rel)
+    return sorted(paths)
+
+
+def dist_files(dist):
+    """dist 中的所有文件（不含清单本身）"""
+    paths = []
+    for path in _walk(dist):
+        rel = os.path.relpath(path, dist).replace(os.sep, "/")
+        if rel != MANIFEST_NAME:
+            paths.append(rel)
+    return sorted(paths)
+
+
+def build_manifest(root=None, paths=None, hash_cache=HASH_CACHE_NAME, cache_root=None):
+    """{路径: {"size": ..., "sha256": ...}}；大小和 mtime 没变的文件复用上次的哈希"""
+    root = root or BLOG_DIR
+    paths = publishable_files(root) if paths is None else paths
+    hash_cache_path = cache_path(hash_cache, cache_root or root)
+    cached = load_json(hash_cache_path, {}) or {}
+    fresh = {}
+    manifest = {}
+    for rel in paths:
+        st = os.stat(os.path.join(root, rel))
+        entry = cached.get(rel)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            digest = entry[2]
+        else:
+            digest = file_sha256(os.path.join(root, rel))
+        fresh[rel] = [st.st_size, st.st_mtime_ns, digest]
+        manifest[rel] = {"size": st.st_size, "sha256": digest}
+    if fresh != cached:
+        save_json(hash_cache_path, fresh, compact=True)
+    return manifest
+
+
+def manifest_digest(manifest):
+    """清单整体的指纹"""
+    return text_sha256(json.dumps(
+        {path: entry["sha256"] for path, entry in sorted(manifest.items())}, sort_keys=True
+    ))
+
+
+def diff_manifests(previous, current):
+    """返回 {"added": [...], "modified": [...], "removed": [...], "unchanged": n}"""
+    previous = previous or {}
+    added = [p for p in current if p not in previous]
+    modified = [p for p in current
+                if p in previous and previous[p].get("sha256") != current[p]["sha256"]]
+    removed = [p for p in previous if p not in current]
+    return {
+        "added": sorted(added),
+        "modified": sorted(modified),
+        "removed": sorted(removed),
+        "unchanged": len(current) - len(added) - len(modified),
+    }
+
+
+def load_manifest(source):
+    """从文件或 http(s) URL 读取清单，读取失败返回 None"""
+    if not source:
+        return None
+    if source.startswith(("http://", "https://")):
+        try:
+            with urllib.request.urlopen(source, timeout=15) as response:
+                data = json.loads(response.read().decode("utf-8"))
+        except (OSError, ValueError):
+            return None
+    else:
+        data = load_json(source)
+    if isinstance(data, dict):
+        return data.get("files", data)
+    return None
+
+
+def sync_dist(root, dist, sources):
+    """把源文件同步到 dist/，只复制有变化的文件，删除已不发布的文件，返回 (复制的路径, 删除的路径)"""
+    state_path = cache_path(SYNC_STATE_NAME, root)
+    existing = load_json(state_path, {}) or {}
+    if not os.path.isdir(dist):
+        existing = {}
+    copied = []
+    removed = []
+    for rel, entry in sources.items():
+        target = os.path.join(dist, rel)
+        if existing.get(rel) == entry["sha256"] and os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(os.path.join(root, rel), target)
+        copied.append(rel)
+    for rel in existing:
+        if rel not in sources:
+            try:
+                os.remove(os.path.join(dist, rel))
+                removed.append(rel)
+            except FileNotFoundError:
+                pass
+    save_json(state_path, {rel: entry["sha256"] for rel, entry in sources.items()}, compact=True)
+    return copied, removed
+
+
+def write_bundle(dist, bundle_dir, manifest, diff, base_digest):
+    """写出增量包和上传计划，返回上传计划"""
+    os.makedirs(bundle_dir, exist_ok=True)
+    upload = diff["added"] + diff["modified"]
+    plan = {
+        "base": base_digest,
+        "target": manifest_digest(manifest),
+        "upload": [dict(manifest[p], path=p) for p in sorted(upload)],
+        "delete": diff["removed"],
+        "upload_bytes": sum(manifest[p]["size"] for p in upload),
+        "total_bytes": sum(entry["size"] for entry in manifest.values()),
+        "files": len(manifest),
+    }
+    bundle_path = os.path.join(bundle_dir, "delta.tar.gz")
+    tmp_path = bundle_path + ".tmp"
+    with tarfile.open(tmp_path, "w:gz", compresslevel=6) as tar:
+        for rel in sorted(upload):
+            info = tar.gettarinfo(os.path.join(dist, rel), arcname=rel)
+            # 固定属性，相同内容得到相同的包
+            info.mtime = 0
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            with open(os.path.join(dist, rel), "rb") as f:
+                tar.addfile(info, f)
+    os.replace(tmp_path, bundle_path)
+    plan["bundle"] = bundle_path
+    plan["bundle_bytes"] = os.path.getsize(bundle_path)
+    save_json(os.path.join(bundle_dir, "upload-plan.json"), plan)
+    return plan
+
+
+def package(root=None, dist=None, previous=None, bundle_dir=None, optimize=True, verbose=True):
+    """打包部署产物，返回上传计划（附带 diff 统计）"""
+    started = time.perf_counter()
+    root = root or BLOG_DIR
+    dist = dist or os.path.join(root, DIST_DIRNAME)
+    bundle_dir = bundle_dir or cache_path(BUNDLE_DIRNAME, root)
+    previous_manifest = load_manifest(previous)
+
+    sources = build_manifest(root)
+    copied, removed = sync_dist(root, dist, sources)
+    if optimize:
+        optimize_assets.optimize(root, dist, sources, copied=copied, verbose=verbose)
+
+    # 部署清单描述 dist 的实际内容（含改写后的 HTML、指纹文件和压缩副本）
+    manifest = build_manifest(dist, dist_files(dist), DIST_HASH_CACHE_NAME, cache_root=root)
+    diff = diff_manifests(previous_manifest, manifest)
+    save_json(os.path.join(dist, MANIFEST_NAME), {
+        "digest": manifest_digest(manifest),
+        "files": manifest,
+    })
+    base = manifest_digest(previous_manifest) if previous_manifest else None
+    plan = write_bundle(dist, bundle_dir, manifest, diff, base)
+    plan.update({
+        "added": len(diff["added"]),
+        "modified": len(diff["modified"]),
+        "removed": len(diff["removed"]),
+        "unchanged": diff["unchanged"],
+        "dist_copied": len(copied),
+        "dist_removed": len(removed),
+        "elapsed": time.perf_counter() - started,
+    })
+    if verbose:
+        print(f"📦 部署产物: {plan['files']} 个文件 {plan['total_bytes'] / 1024:.0f} KB → {dist}")
+        print(f"   相对上次部署: 新增 {plan['added']}，修改 {plan['modified']}，"
+              f"删除 {plan['removed']}，上传 {plan['upload_bytes'] / 1024:.1f} KB"
+              f"（增量包 {plan['bundle_bytes'] / 1024:.1f} KB），耗时 {plan['elapsed']:.2f}s")
+    return plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="打包部署产物")
+    parser.add_argument("--dist", help="输出目录，默认 dist/")
+    parser.add_argument("--previous", help="上一次部署的清单（文件路径或 URL）")
+    parser.add_argument("--bundle-dir", help="增量包和上传计划的输出目录")
+    parser.add_argument("--no-optimize", action="store_true", help="跳过资源指纹和预压缩")
+    args = parser.parse_args(argv)
+
+    package(dist=args.dist, previous=args.previous, bundle_dir=args.bundle_dir,
+            optimize=not args.no_optimize)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步阶段调度器
+
+每个阶段声明依赖，依赖全部成功后立即开始，互不依赖的阶段并发执行。
+每个阶段有独立超时；阶段失败时依赖它的阶段被跳过，其余阶段照常完成，
+最后汇总所有失败并抛出 PipelineError。
+
+阶段函数接收 {依赖阶段名: 返回值}：
+    - async 函数直接在事件循环中执行，超时会被取消；
+    - 普通函数在 fork 出的子进程中执行（返回值和异常通过管道传回，需要能被 pickle），
+      超时或被取消时杀掉整个子进程组；没有 fork 的平台退回线程执行，超时后只能停止等待。
+      常驻的多线程进程（publisher_daemon）传 processes=False，在本进程的线程中执行，
+      既复用已加载的缓存，也不在有其他线程时 fork。
+外部命令请使用 run_command()，超时或取消时会杀掉子进程。
+每个阶段和外部命令都记录为 tracing 的 span，阶段各占 trace 中的一行；
+子进程中记录的 span 随结果传回，合并到同一份 trace。
+"""
+
+import os
+import time
+import signal
+import asyncio
+import multiprocessing
+
+from tracing import get_tracer, span
+
+# 普通函数阶段是否在子进程中执行
+USE_PROCESSES = "fork" in multiprocessing.get_all_start_methods()
+
+
+class CommandError(Exception):
+    """外部命令返回非零退出码"""
+
+    def __init__(self, args, returncode, stdout, stderr):
+        self.cmd = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        detail = (stderr or stdout).strip().splitlines()
+        super().__init__(
+            f"命令失败 (退出码 {returncode}): {' '.join(args)}"
+            + (f"\n{detail[-1]}" if detail else "")
+        )
+
+    def __reduce__(self):
+        # 阶段子进程把异常 pickle 传回父进程
+        return type(self), (self.cmd, self.returncode, self.stdout, self.stderr)
+
+
+class StageTimeout(Exception):
+    """阶段超时"""
+
+
+class StageCrashed(Exception):
+    """执行阶段的子进程没有传回结果就退出了"""
+
+
+class PipelineError(Exception):
+    """流水线中有阶段失败"""
+
+    def __init__(self, failures, report):
+        self.failures = failures
+        self.report = report
+        lines = [f"{name}: {type(exc).__name__}: {exc}" for name, exc in failures.items()]
+        super().__init__(f"{len(failures)} 个阶段失败\n  " + "\n  ".join(lines))
+
+
+class CommandResult:
+    """外部命令的执行结果"""
+
+    def __init__(self, args, returncode, stdout, stderr):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class Stage:
+    """流水线中的一个阶段"""
+
+    def __init__(self, name, func, deps=(), timeout=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+
+
+async def run_command(args, cwd=None, timeout=None, check=True, env=None):
+    """异步执行外部命令；超时或被取消时杀掉子进程"""
+    with span("exec " + " ".join(args[:2]), argv=" ".join(args)) as current:
+        proc = await asyncio.create_subprocess_exec(
+            *args, cwd=cwd, env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            current.set(exit_status=proc.returncode, killed=True)
+            raise
+        current.set(exit_status=proc.returncode)
+    result = CommandResult(
+        list(args), proc.returncode,
+        stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace"),
+    )
+    if check and result.returncode != 0:
+        raise CommandError(result.args, result.returncode, result.stdout, result.stderr)
+    return result
+
+
+def _stage_child(conn, func, inputs):
+    """子进程：执行阶段函数，把 (状态, 返回值或异常, 新增的 span) 发回父进程"""
+    # 自成进程组，超时时连同它启动的外部命令一起杀掉
+    os.setpgid(0, 0)
+    tracer = get_tracer()
+    first = len(tracer.records)
+    try:
+        message = ("ok", func(inputs))
+    except BaseException as exc:
+        message = ("error", exc)
+    try:
+        conn.send(message + (tracer.records[first:],))
+    except Exception as exc:
+        # 返回值或异常不能 pickle
+        conn.send(("error", RuntimeError(f"阶段结果无法传回: {type(exc).__name__}: {exc}"), []))
+    conn.close()
+
+
+def _kill_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+    proc.join()
+
+
+async def run_in_process(func, inputs):
+    """在 fork 出的子进程中执行 func(inputs)；超时或被取消时杀掉子进程组"""
+    context = multiprocessing.get_context("fork")
+    reader, writer = context.Pipe(duplex=False)
+    proc = context.Process(target=_stage_child, args=(writer, func, inputs), daemon=True)
+    proc.start()
+    writer.close()
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    loop.add_reader(reader.fileno(), lambda: ready.done() or ready.set_result(None))
+    try:
+        await ready
+        try:
+            status, value, records = reader.recv()
+        except EOFError:
+            proc.join()
+            raise StageCrashed(f"阶段进程异常退出 (退出码 {proc.exitcode})") from None
+        except Exception as exc:
+            raise StageCrashed(f"阶段结果无法解析: {type(exc).__name__}: {exc}") from exc
+        proc.join()
+    finally:
+        loop.remove_reader(reader.fileno())
+        reader.close()
+        if proc.exitcode is None:
+            _kill_group(proc)
+    get_tracer().records.extend(records)
+    if status == "error":
+        raise value
+    return value
+
+
+def _check_graph(stages):
+    """检查阶段名唯一、依赖存在且无环"""
+    names = {}
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"阶段名重复: {stage.name}")
+        names[stage.name] = stage
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in names:
+                raise ValueError(f"阶段 {stage.name} 依赖不存在的阶段 {dep}")
+
+    visiting, done = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"阶段依赖存在环: {name}")
+        visiting.add(name)
+        for dep in names[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in names:
+        visit(name)
+
+
+async def run_pipeline(stages, verbose=True, processes=None):
+    """
+    按依赖关系执行所有阶段，返回 ({阶段名: 返回值}, report)
+
+    processes 决定普通函数阶段是否在子进程中执行，默认 USE_PROCESSES。
+
+    有阶段失败时抛出 PipelineError，其中 failures 包含每个失败阶段的异常，
+    report 包含每个阶段的状态（ok / failed / timeout / skipped / cancelled）和耗时。
+    """
+    _check_graph(stages)
+    if processes is None:
+        processes = USE_PROCESSES
+    results = {}
+    failures = {}
+    report = {}
+    tasks = {}
+
+    async def execute(stage):
+        # 等待依赖完成；任何依赖没有成功就跳过
+        if stage.deps:
+            await asyncio.gather(*(tasks[dep] for dep in stage.deps), return_exceptions=True)
+        blocked = [dep for dep in stage.deps if report.get(dep, {}).get("status") != "ok"]
+        if blocked:
+            report[stage.name] = {"status": "skipped", "elapsed": 0.0, "blocked_by": blocked}
+            if verbose:
+                print(f"⏭️  跳过 {stage.name}（依赖 {', '.join(blocked)} 未成功）")
+            return
+
+        inputs = {dep: results[dep] for dep in stage.deps}
+        started = time.perf_counter()
+        if verbose:
+            print(f"▶️  {stage.name}")
+        try:
+            # 在 span 内启动，子进程里的 span 继承这个阶段的 lane
+            with span(stage.name, lane=stage.name, timeout=stage.timeout):
+                if asyncio.iscoroutinefunction(stage.func):
+                    call = stage.func(inputs)
+                elif processes:
+                    call = run_in_process(stage.func, inputs)
+                else:
+                    call = asyncio.to_thread(stage.func, inputs)
+                results[stage.name] = await asyncio.wait_for(call, stage.timeout)
+        except asyncio.TimeoutError:
+            exc = StageTimeout(f"超过 {stage.timeout}s")
+            failures[stage.name] = exc
+            report[stage.name] = {"status": "timeout", "elapsed": time.perf_counter() - started}
+        except asyncio.CancelledError:
+            report[stage.name] = {"status": "cancelled", "elapsed": time.perf_counter() - started}
+            raise
+        except Exception as exc:
+            failures[stage.name] = exc
+            report[stage.name] = {"status": "failed", "elapsed": time.perf_counter() - started}
+        else:
+            report[stage.name] = {"status": "ok", "elapsed": time.perf_counter() - started}
+
+        if verbose:
+            entry = report[stage.name]
+            mark = "✅" if entry["status"] == "ok" else "❌"
+            suffix = "" if entry["status"] == "ok" else f" {failures[stage.name]}"
+            print(f"{mark} {stage.name} {entry['status']} ({entry['elapsed']:.2f}s){suffix}")
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(execute(stage))
+    try:
+        await asyncio.gather(*tasks.values())
+    except asyncio.CancelledError:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    if failures:
+        raise PipelineError(failures, report)
+    return results, report
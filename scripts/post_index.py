@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章元数据索引
+
+把 content/posts 的 Front Matter 保存在 .cache/post-index.sqlite3。
+refresh() 只对 mtime/大小变化的文件读取并比较哈希，其余文件不打开；
+"最新 N 篇"、"按标签"、"按月份" 等查询直接走 SQLite，不读取正文。
+
+用法:
+    python3 scripts/post_index.py                 # 增量刷新并打印最新 10 篇
+    python3 scripts/post_index.py --tag RAG
+    python3 scripts/post_index.py --month 2026-02
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+
+from blog_utils import (
+    BLOG_DIR, posts_dir, cache_path, ensure_dir, text_sha256,
+    parse_front_matter, parse_post_date,
+)
+
+INDEX_NAME = "post-index.sqlite3"
+SCHEMA_VERSION = 1
+EXCERPT_LENGTH = 120
+# 构建、搜索索引和通知渲染阶段会同时打开索引，等另一个连接的写锁最多这么多秒
+BUSY_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    slug TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    month TEXT NOT NULL,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    excerpt TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS post_tags (
+    tag TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    PRIMARY KEY (tag, slug)
+);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (date DESC);
+CREATE INDEX IF NOT EXISTS posts_month ON posts (month, date DESC);
+CREATE INDEX IF NOT EXISTS posts_category ON posts (category, date DESC);
+CREATE INDEX IF NOT EXISTS post_tags_slug ON post_tags (slug);
+CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_MARKDOWN_NOISE = re.compile(r"```.*?```|[#>*_`~\[\]()!|-]+", re.S)
+
+
+def make_excerpt(meta, body):
+    """优先使用 Front Matter 里的摘要，否则取正文开头"""
+    if meta.get("excerpt"):
+        return str(meta["excerpt"])
+    text = " ".join(_MARKDOWN_NOISE.sub(" ", body).split())
+    return text[:EXCERPT_LENGTH]
+
+
+class PostIndex:
+    """文章元数据索引"""
+
+    def __init__(self, root=None, path=None):
+        self.root = root or BLOG_DIR
+        self.path = path or cache_path(INDEX_NAME, self.root)
+        ensure_dir(os.path.dirname(self.path))
+        self.conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        # WAL：读连接不会被正在刷新索引的写连接挡住
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return
+        self.conn.executescript(
+            "DROP TABLE IF EXISTS posts; DROP TABLE IF EXISTS post_tags;"
+            "DROP TABLE IF EXISTS index_meta;"
+        )
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def refresh(self, quick=False):
+        """
+        增量更新索引，返回 {"added": [...], "updated": [...], "removed": [...]}（slug 列表）
+
+        quick=True 时如果目录 mtime 没变就直接跳过扫描（只能发现增删和改名）。
+        """
+        changes = {"added": [], "updated": [], "removed": []}
+        src_dir = posts_dir(self.root)
+        if not os.path.isdir(src_dir):
+            names = []
+            dir_mtime = "0"
+        else:
+            dir_mtime = str(os.stat(src_dir).st_mtime_ns)
+            if quick and self._get_meta("dir_mtime") == dir_mtime:
+                return changes
+            names = [n for n in os.listdir(src_dir) if n.endswith(".md")]
+
+        known = {
+            row["slug"]: (row["mtime_ns"], row["size"], row["hash"])
+            for row in self.conn.execute("SELECT slug, mtime_ns, size, hash FROM posts")
+        }
+        seen = set()
+        with self.conn:
+            for name in names:
+                slug = name[:-3]
+                seen.add(slug)
+                path = os.path.join(src_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                old = known.get(slug)
+                if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                source_hash = text_sha256(text)
+                if old and old[2] == source_hash:
+                    self.conn.execute(
+                        "UPDATE posts SET mtime_ns = ?, size = ? WHERE slug = ?",
+                        (st.st_mtime_ns, st.st_size, slug),
+                    )
+                    continue
+                self._upsert(slug, os.path.relpath(path, self.root), text, source_hash, st)
+                changes["updated" if old else "added"].append(slug)
+
+            for slug in known.keys() - seen:
+                self.conn.execute("DELETE FROM posts WHERE slug = ?", (slug,))
+                self.conn.execute("DELETE FROM post_tags WHERE slug = ?", (slug,))
+                changes["removed"].append(slug)
+            self._set_meta("dir_mtime", dir_mtime)
+        return changes
+
+    def _upsert(self, slug, source, text, source_hash, st):
+        meta, body = parse_front_matter(text)
+        date = parse_post_date(meta.get("date"))
+        tags = meta.get("tags") or []
+        if not isinstance(tags, list):
+            tags = [tags]
+        tags = [str(t) for t in tags]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                slug, source, date.isoformat(), date.strftime("%Y-%m"),
+                str(meta.get("title", "")), str(meta.get("category", "")),
+                json.dumps(tags, ensure_ascii=False), make_excerpt(meta, body),
+                json.dumps(meta, ensure_ascii=False, default=str),
+                source_hash, st.st_size, st.st_mtime_ns,
+            ),
+        )
+        self.conn.execute("DELETE FROM post_tags WHERE slug = ?", (slug,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO post_tags VALUES (?, ?)", [(tag, slug) for tag in tags]
+        )
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO index_meta VALUES (?, ?)", (key, value))
+
+    @staticmethod
+    def _to_post(row):
+        return {
+            "slug": row["slug"],
+            "source": row["source"],
+            "date": row["date"],
+            "title": row["title"],
+            "category": row["category"],
+            "tags": json.loads(row["tags"]),
+            "excerpt": row["excerpt"],
+            "hash": row["hash"],
+            "size": row["size"],
+            "meta": json.loads(row["meta"]),
+        }
+
+    def _query(self, sql, params=()):
+        return [self._to_post(row) for row in self.conn.execute(sql, params)]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def get(self, slug):
+        posts = self._query("SELECT * FROM posts WHERE slug = ?", (slug,))
+        return posts[0] if posts else None
+
+    def all(self):
+        """全部文章，按日期倒序"""
+        return self._query("SELECT * FROM posts ORDER BY date DESC, slug")
+
+    def latest(self, n=10):
+        return self._query("SELECT * FROM posts ORDER BY date DESC, slug LIMIT ?", (n,))
+
+    def by_tag(self, tag, limit=-1):
+        return self._query(
+            "SELECT p.* FROM posts p JOIN post_tags t ON t.slug = p.slug "
+            "WHERE t.tag = ? ORDER BY p.date DESC, p.slug LIMIT ?",
+            (tag, limit),
+        )
+
+    def by_category(self, category, limit=-1):
+        return self._query(
+            "SELECT * FROM posts WHERE category = ? ORDER BY date DESC, slug LIMIT ?",
+            (category, limit),
+        )
+
+    def by_month(self, month, limit=-1):
+        """month 形如 2026-02"""
+        return self._query(
+            "SELECT * FROM posts WHERE month = ? ORDER BY date DESC, slug LIMIT ?",
+            (month, limit),
+        )
+
+    def tag_counts(self):
+        """{标签: 文章数}"""
+        return dict(self.conn.execute(
+            "SELECT tag, COUNT(*) FROM post_tags GROUP BY tag ORDER BY COUNT(*) DESC, tag"
+        ).fetchall())
+
+
+def open_index(root=None, refresh=True, quick=False):
+    """打开索引，默认先增量刷新"""
+    index = PostIndex(root)
+    if refresh:
+        index.refresh(quick=quick)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文章元数据索引")
+    parser.add_argument("--tag", help="按标签查询")
+    parser.add_argument("--month", help="按月份查询，如 2026-02")
+    parser.add_argument("--latest", type=int, default=10, help="最新 N 篇")
+    args = parser.parse_args(argv)
+
+    with PostIndex() as index:
+        changes = index.refresh()
+        print(f"索引: {index.count()} 篇，新增 {len(changes['added'])}，"
+              f"更新 {len(changes['updated'])}，删除 {len(changes['removed'])}")
+        if args.tag:
+            posts = index.by_tag(args.tag)
+        elif args.month:
+            posts = index.by_month(args.month)
+        else:
+            posts = index.latest(args.latest)
+        for post in posts:
+            print(f"{post['date'][:10]}  [{post['category']}] {post['title']}  ({post['slug']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
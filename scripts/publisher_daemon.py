@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻发布进程
+
+代替 cron 每天冷启动 deploy.py：进程常驻，生成器、主题目录、章节缓存、模板片段和
+各模块只在启动时加载一次，之后每次运行都是增量构建 + 精确发布。触发来源:
+    - 定时：每天 --at 时刻运行完整的每日发布（生成文章、构建、发布、通知）；
+    - webhook：POST /trigger（如 GitHub push 事件，CMS 通过 git-gateway 提交时），
+      先 git pull --ff-only 再构建发布；GET /status 返回最近的运行记录；
+    - 文件变化：监视 content/ 和 images/（CMS 本地模式直接写文件）。
+
+一连串触发（CMS 一次保存产生的多个提交或文件）在安静 --debounce 秒后合并成一次运行，
+持续有触发时最多等 --max-delay 秒。运行期间到达的触发进入下一次运行；
+其中只是这次运行自己写出的文件（内容与运行结束时相同）的触发会被丢弃。
+各阶段在本进程的线程中执行（不 fork），预热的缓存和 GitPublisher 在运行之间保留。
+每次运行记录从最早一次触发到发布完成的延迟，追加到 .cache/publisher-runs.jsonl。
+
+设置 PUBLISH_WEBHOOK_SECRET 后，webhook 需要 GitHub 的 X-Hub-Signature-256 签名
+或与之相同的 X-Publish-Token 请求头。
+
+用法:
+    python3 scripts/publisher_daemon.py                     # 每天 08:00，webhook 监听 127.0.0.1:8090
+    python3 scripts/publisher_daemon.py --at 07:30 --port 0 # 不开 webhook
+    python3 scripts/publisher_daemon.py --runs 10           # 查看最近 10 次运行
+    curl -X POST http://127.0.0.1:8090/trigger              # 手动触发一次构建发布
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import signal
+import asyncio
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from blog_utils import cache_path, file_sha256
+import deploy
+import pipeline
+import tracing
+import tutorial_api
+from dev_server import make_watcher
+from git_publish import collect_paths
+from post_index import PostIndex
+from topic_catalog import get_catalog
+
+DEFAULT_PORT = 8090
+DEFAULT_AT = "08:00"
+# 最后一次触发后安静这么久才开始运行
+DEBOUNCE_SECONDS = 5.0
+# 持续有触发时最多等这么久也要运行一次
+MAX_DELAY_SECONDS = 60.0
+RUNS_NAME = "publisher-runs.jsonl"
+# 只有这些目录中的源文件变化才触发；构建输出（图片变体）不算
+WATCH_DIRS = ("content", "images")
+IGNORED_PREFIXES = ("images/responsive/",)
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def is_source(path):
+    name = os.path.basename(path)
+    return not (path.startswith(IGNORED_PREFIXES) or name.startswith(".") or name.endswith("~"))
+
+
+def next_run_at(at, now=None):
+    """下一次 HH:MM 的时刻"""
+    now = now or datetime.now()
+    hour, minute = (int(part) for part in at.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return target if target > now else target + timedelta(days=1)
+
+
+class TriggerQueue:
+    """
+    收集触发并合并成批
+
+    触发是 {"kind", "at"（时间戳）, "paths", "detail"}；wait_batch() 等到有触发后
+    再等安静 debounce 秒（最多 max_delay 秒），取出这段时间内的全部触发。
+    """
+
+    def __init__(self, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.pending = []
+        self.last = 0.0
+        self.closed = False
+
+    def add(self, kind, paths=(), detail=""):
+        with self.condition:
+            self.pending.append({"kind": kind, "at": time.time(), "paths": sorted(paths), "detail": detail})
+            self.last = time.monotonic()
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def snapshot(self):
+        with self.condition:
+            return list(self.pending)
+
+    def discard_paths(self, predicate):
+        """从待处理的文件触发中去掉 predicate(path) 为真的路径，路径全被去掉的触发整个丢弃"""
+        with self.condition:
+            kept = []
+            for trigger in self.pending:
+                if trigger["kind"] == "file":
+                    paths = [p for p in trigger["paths"] if not predicate(p)]
+                    if not paths:
+                        continue
+                    trigger = dict(trigger, paths=paths)
+                kept.append(trigger)
+            self.pending = kept
+
+    def wait_batch(self):
+        """返回一批触发；关闭后返回 None"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending or self.closed)
+            if self.closed:
+                return None
+            first = time.monotonic()
+            while not self.closed:
+                now = time.monotonic()
+                remaining = min(self.last + self.debounce, first + self.max_delay) - now
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            batch, self.pending = self.pending, []
+            return batch
+
+
+class PublisherDaemon:
+    """常驻状态 + 触发来源 + 串行执行的运行"""
+
+    def __init__(self, root, at=DEFAULT_AT, port=DEFAULT_PORT, bind="127.0.0.1", watch=True,
+                 polling=False, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS, pull=True):
+        self.root = root
+        self.at = at
+        self.port = port
+        self.bind = bind
+        self.watch = watch
+        self.polling = polling
+        self.pull = pull
+        self.queue = TriggerQueue(debounce, max_delay)
+        self.stop = threading.Event()
+        self.secret = os.environ.get("PUBLISH_WEBHOOK_SECRET", "")
+        self.runs_path = cache_path(RUNS_NAME, root)
+        self.recent = load_runs(self.runs_path, 20)
+        self.running = None
+        # deploy 的各阶段读取模块级的 BLOG_DIR；发布阶段和 webhook 拉取共用同一个 GitPublisher
+        deploy.BLOG_DIR = root
+        self.publisher = deploy.get_publisher()
+        # 上次运行写出的源文件及其哈希：监视器报告的这些变化不是新的编辑
+        self.own_writes = {}
+        self.threads = []
+        self.server = None
+
+    # ---------- 常驻状态 ----------
+
+    def warm_up(self):
+        """加载生成器、主题目录和文章索引，之后的运行不再付出这些开销"""
+        started = time.perf_counter()
+        tutorial_api.load_generator()
+        get_catalog()
+        with PostIndex(self.root) as index:
+            index.refresh()
+            count = len(index.all())
+        print(f"🔥 预热完成：{count} 篇文章，耗时 {time.perf_counter() - started:.2f}s", flush=True)
+
+    # ---------- 触发来源 ----------
+
+    def _schedule_loop(self):
+        while not self.stop.is_set():
+            target = next_run_at(self.at)
+            print(f"⏰ 下一次每日发布: {target:%Y-%m-%d %H:%M}", flush=True)
+            # 分段等待，系统休眠或改时间后重新计算
+            while not self.stop.is_set() and datetime.now() < target:
+                self.stop.wait(min(60.0, max(0.0, (target - datetime.now()).total_seconds())))
+            if not self.stop.is_set():
+                self.queue.add("schedule", detail=f"{target:%H:%M}")
+
+    def _watch_loop(self):
+        watcher, mode = make_watcher(self.root, self.polling, dirs=WATCH_DIRS, flat_dirs=())
+        print(f"👀 监视源文件变化（{mode}）", flush=True)
+        try:
+            while not self.stop.is_set():
+                changed = {p for p in watcher.poll(1.0) if is_source(p)}
+                changed = {p for p in changed if not self._own_write(p)}
+                if changed:
+                    self.queue.add("file", changed)
+        finally:
+            watcher.close()
+
+    def _own_write(self, path):
+        digest = self.own_writes.get(path)
+        if digest is None:
+            return False
+        full = os.path.join(self.root, path)
+        return os.path.exists(full) and file_sha256(full) == digest
+
+    def _make_server(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/status":
+                    return self._reply(404, {"error": "not found"})
+                self._reply(200, daemon.status())
+
+            def do_POST(self):
+                if self.path.split("?", 1)[0] != "/trigger":
+                    return self._reply(404, {"error": "not found"})
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    return self._reply(413, {"error": "body too large"})
+                body = self.rfile.read(length)
+                if not daemon.authorized(self.headers, body):
+                    return self._reply(401, {"error": "bad signature"})
+                event = self.headers.get("X-GitHub-Event", "")
+                daemon.queue.add("webhook", detail=event or self.client_address[0])
+                self._reply(202, {"queued": len(daemon.queue.snapshot())})
+
+            def _reply(self, status, data):
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ThreadingHTTPServer((self.bind, self.port), Handler)
+
+    def authorized(self, headers, body):
+        if not self.secret:
+            return True
+        signature = headers.get("X-Hub-Signature-256", "")
+        if signature:
+            expected = "sha256=" + hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            return hmac.compare_digest(signature, expected)
+        return hmac.compare_digest(headers.get("X-Publish-Token", ""), self.secret)
+
+    def status(self):
+        return {
+            "running": self.running,
+            "pending": self.queue.snapshot(),
+            "next_schedule": f"{next_run_at(self.at):%Y-%m-%d %H:%M}" if self.at else None,
+            "runs": self.recent[-10:],
+        }
+
+    # ---------- 运行 ----------
+
+    async def _pull(self, publisher):
+        """拉取远程提交（CMS 通过 git-gateway 的修改），返回变化的路径"""
+        before = (await publisher.git("rev-parse", "HEAD")).stdout.strip()
+        await publisher.git("pull", "--ff-only", "--quiet", publisher.remote, await publisher.branch())
+        after = (await publisher.git("rev-parse", "HEAD")).stdout.strip()
+        if before == after:
+            return []
+        diff = await publisher.git("diff", "--name-only", "-z", before, after)
+        return [p for p in diff.stdout.split("\0") if p]
+
+    def run(self, batch):
+        """执行一次合并后的运行，返回运行记录"""
+        kinds = {}
+        for trigger in batch:
+            kinds[trigger["kind"]] = kinds.get(trigger["kind"], 0) + 1
+        changed = sorted({p for t in batch if t["kind"] == "file" for p in t["paths"]})
+        first = min(t["at"] for t in batch)
+        started = time.time()
+        self.running = {"started": started, "triggers": kinds}
+        record = {
+            "started": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+            "triggers": kinds,
+            "changed": changed[:20],
+            "queue_delay": round(started - first, 3),
+        }
+        print(f"🚀 运行：{', '.join(f'{k} × {v}' for k, v in kinds.items())}，"
+              f"最早的触发在 {started - first:.1f}s 前", flush=True)
+
+        tracing.reset_tracer("publisher")
+        results = {}
+        try:
+            with tracing.span("publish_run", **kinds):
+                if "webhook" in kinds and self.pull:
+                    pulled = asyncio.run(self._pull(self.publisher))
+                    record["pulled"] = len(pulled)
+                    changed = sorted(set(changed) | set(pulled))
+                if "schedule" in kinds:
+                    stages = deploy.deploy_stages(changed)
+                else:
+                    stages = deploy.publish_stages(changed)
+                # 监视器、定时器和 HTTP 线程都在运行，不能 fork；在线程中执行还能用上预热的缓存
+                results, report = asyncio.run(pipeline.run_pipeline(stages, processes=False))
+            outcome = results.get("publish") or {}
+            record["status"] = outcome.get("status", "ok")
+            record["stages"] = {name: round(entry["elapsed"], 3) for name, entry in report.items()}
+        except pipeline.PipelineError as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            record["stages"] = {name: entry["status"] for name, entry in e.report.items()}
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            trace_path, _ = tracing.write_trace(root=self.root)
+            self.running = None
+
+        finished = time.time()
+        record["run"] = round(finished - started, 3)
+        # 触发到发布完成的延迟（包括合并等待）
+        record["latency"] = round(finished - first, 3)
+        record["trace"] = os.path.relpath(trace_path, self.root)
+        self._remember_writes(results, changed)
+        # 运行期间监视器已经报告了生成的文章等自己写出的文件
+        self.queue.discard_paths(self._own_write)
+        append_run(self.runs_path, record)
+        self.recent = (self.recent + [record])[-20:]
+        print(f"{'✅' if record['status'] != 'failed' else '❌'} {record['status']}："
+              f"运行 {record['run']:.2f}s，触发到发布 {record['latency']:.2f}s", flush=True)
+        return record
+
+    def _remember_writes(self, results, changed):
+        """记下这次运行写出或提交的源文件，监视器随后报告它们时不再触发"""
+        paths = collect_paths(*(r for r in results.values() if isinstance(r, dict)))
+        post = results.get("generate")
+        if post:
+            paths.append(f"content/posts/{post['filename']}")
+        own = {}
+        for path in set(paths) | set(changed):
+            full = os.path.join(self.root, path)
+            if is_source(path) and path.startswith(WATCH_DIRS) and os.path.isfile(full):
+                own[path] = file_sha256(full)
+        self.own_writes = own
+
+    # ---------- 主循环 ----------
+
+    def _start(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def serve(self):
+        self.warm_up()
+        if self.at:
+            self._start(self._schedule_loop)
+        if self.watch:
+            self._start(self._watch_loop)
+        if self.port:
+            self.server = self._make_server()
+            self._start(self.server.serve_forever)
+            host, port = self.server.server_address[:2]
+            print(f"🔗 webhook: http://{host}:{port}/trigger  状态: http://{host}:{port}/status", flush=True)
+        try:
+            while not self.stop.is_set():
+                batch = self.queue.wait_batch()
+                if batch is None:
+                    break
+                self.run(batch)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.stop.set()
+        self.queue.close()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def append_run(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_runs(path, limit=20):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-limit:]
+    except FileNotFoundError:
+        return []
+    runs = []
+    for line in lines:
+        try:
+            runs.append(json.loads(line))
+        except ValueError:
+            continue
+    return runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="常驻发布进程")
+    parser.add_argument("--root", default=deploy.BLOG_DIR, help="博客目录（默认与 deploy.py 相同）")
+    parser.add_argument("--at", default=DEFAULT_AT, help="每日发布时刻 HH:MM，空字符串表示不定时")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="webhook 端口，0 表示不监听")
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--no-watch", action="store_true", help="不监视文件变化")
+    parser.add_argument("--no-pull", action="store_true", help="webhook 触发时不执行 git pull")
+    parser.add_argument("--polling", action="store_true", help="用轮询代替 inotify")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS, help="合并触发的安静时间（秒）")
+    parser.add_argument("--max-delay", type=float, default=MAX_DELAY_SECONDS, help="合并触发的最长等待（秒）")
+    parser.add_argument("--runs", type=int, metavar="N", help="打印最近 N 次运行后退出")
+    args = parser.parse_args(argv)
+
+    root = os.path.abspath(args.root)
+    if args.runs:
+        for run in load_runs(cache_path(RUNS_NAME, root), args.runs):
+            triggers = ", ".join(f"{k} × {v}" for k, v in run["triggers"].items())
+            print(f"{run['started']}  {run['status']:<8} 触发到发布 {run['latency']:>7.2f}s  "
+                  f"运行 {run['run']:>6.2f}s  ({triggers})")
+        return 0
+
+    daemon = PublisherDaemon(
+        root, at=args.at, port=args.port, bind=args.bind, watch=not args.no_watch,
+        polling=args.polling, debounce=args.debounce, max_delay=args.max_delay, pull=not args.no_pull,
+    )
+
+    def stop(signum, frame):
+        print("\n👋 收到退出信号，当前运行结束后退出", flush=True)
+        daemon.stop.set()
+        daemon.queue.close()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    daemon.serve()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
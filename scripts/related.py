@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相关文章（TF-IDF 相似度）
+
+每篇文章的标题、摘要、正文按搜索索引的规则切词（search_index.document_terms），
+再加上标签和分类的精确特征，得到加权词频；按 (1 + ln tf) × idf 加权后保留权重最高的
+VECTOR_TERMS 个词（只出现在一篇文章中的词除外）并 L2 归一化，余弦相似度最高的 RELATED_COUNT 篇
+就是相关文章。
+
+结果保存在 .cache/related-posts.sqlite3:
+    docs       slug、源文件哈希、切词结果（加权词频最高的 RAW_TERMS 个词）
+    postings   词 → (slug, 权重) 的倒排表，即稀疏的文档向量
+    df         文档频率
+    neighbors  每篇文章的相关文章和相似度
+
+全量计算时一次性构建稀疏矩阵，分块计算 M·Mᵀ 取每行的前 k 个（安装了 numpy/scipy 时，
+否则用纯 Python 的倒排表累加）。增量更新只切词变化的文章，并只重算受影响的行：
+变化的文章自身、相关文章里有变化或删除文章的行、以及新相似度能挤进前 k 的行。
+某个词的 df 跨过 MIN_DF（进入或退出向量）时，含有这个词的文章重新加权，
+它们的行和相关文章里有它们的行一起重算。
+未变化文章的向量沿用当时的 idf；MAX_DF 排除的高频词也只在全量加权时确定，增量更新沿用，
+不会因为文章数变化让大批文章重新加权。文章数相比上次全量计算变化超过 IDF_DRIFT 时重新加权全部文章。
+
+用法:
+    python3 scripts/related.py                 # 增量更新并打印每篇文章的相关文章
+    python3 scripts/related.py --full          # 全量重建
+    python3 scripts/related.py --slug 2026-02-06-rag入门：让大模型拥有外部知识
+"""
+
+import os
+import sys
+import math
+import heapq
+import json
+import sqlite3
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+from blog_utils import BLOG_DIR, cache_path, ensure_dir, parse_front_matter
+from search_index import document_terms
+from tracing import span
+
+INDEX_NAME = "related-posts.sqlite3"
+SCHEMA_VERSION = 3
+
+RELATED_COUNT = 2
+# 切词结果只保留加权词频最高的这些词（参与 df 统计）
+RAW_TERMS = 200
+# 文档向量只保留 tf-idf 权重最高的这些词
+VECTOR_TERMS = 40
+# 标签、分类精确匹配的加权词频
+FEATURE_WEIGHT = 3
+# 只出现在一篇文章中的词对相似度没有贡献，不进入向量
+MIN_DF = 2
+# 出现在超过这个比例的文章中的词不进入向量（文章数达到 MAX_DF_MIN_DOCS 时生效）
+MAX_DF = 0.5
+MAX_DF_MIN_DOCS = 20
+# 文章数相对上次全量加权变化超过这个比例时重新加权全部文章
+IDF_DRIFT = 0.1
+MIN_SCORE = 0.01
+# 全量计算时每次相乘的行数
+MATRIX_BLOCK = 1024
+# 需要切词的文章达到这个数量时使用进程池
+PARALLEL_THRESHOLD = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    slug TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (term, slug)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_slug ON postings (slug);
+CREATE TABLE IF NOT EXISTS df (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS neighbors (
+    slug TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    related TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (slug, rank)
+);
+CREATE INDEX IF NOT EXISTS neighbors_related ON neighbors (related);
+CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def post_terms(meta, body):
+    """一篇文章的 {词: 加权词频}，只保留最高的 RAW_TERMS 个词，标签和分类特征总是保留"""
+    counts = document_terms(meta, body)
+    terms = dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:RAW_TERMS])
+    tags = meta.get("tags") or []
+    if not isinstance(tags, list):
+        tags = [tags]
+    for tag in tags:
+        terms[f"#tag:{str(tag).strip().lower()}"] = FEATURE_WEIGHT
+    if meta.get("category"):
+        terms[f"#category:{str(meta['category']).strip().lower()}"] = FEATURE_WEIGHT
+    return terms
+
+
+def _post_terms_file(job):
+    """读取并切词一篇文章（可在子进程中运行）"""
+    path, meta = job
+    with open(path, "r", encoding="utf-8") as f:
+        body = parse_front_matter(f.read())[1]
+    return post_terms(meta, body)
+
+
+def _tokenize_posts(root, posts, workers=None):
+    jobs = [(os.path.join(root, p["source"]), p["meta"]) for p in posts]
+    if len(jobs) < PARALLEL_THRESHOLD:
+        return [_post_terms_file(job) for job in jobs]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_post_terms_file, jobs, chunksize=chunksize))
+
+
+def idf(df, docs):
+    return math.log((1 + docs) / (1 + df)) + 1
+
+
+def common_terms(df, docs):
+    """出现在超过 MAX_DF 比例的文章中的词（全量加权时计算，增量更新沿用）"""
+    if docs < MAX_DF_MIN_DOCS:
+        return set()
+    cutoff = MAX_DF * docs
+    return {term for term, n in df.items() if n > cutoff}
+
+
+def idf_table(df, docs, common=()):
+    """{词: idf}，只包含能进入向量的词"""
+    return {term: idf(n, docs) for term, n in df.items() if n >= MIN_DF and term not in common}
+
+
+def vectorize(terms, idfs):
+    """加权词频 → 归一化的稀疏向量 {词: 权重}"""
+    weights = [((1 + math.log(tf)) * idfs[term], term) for term, tf in terms.items() if term in idfs]
+    weights.sort(key=lambda wt: (-wt[0], wt[1]))
+    top = weights[:VECTOR_TERMS]
+    norm = math.sqrt(sum(w * w for w, _ in top)) or 1.0
+    return {term: w / norm for w, term in top}
+
+
+def pick(candidates, k=RELATED_COUNT):
+    """[(slug, 相似度)] → 前 k 个；相似度保留 6 位小数，相同时按 slug 排序，保证各种算法结果一致"""
+    scored = ((slug, round(score, 6)) for slug, score in candidates if score > MIN_SCORE)
+    return heapq.nsmallest(k, scored, key=lambda c: (-c[1], c[0]))
+
+
+def top_k_all(slugs, vectors, k=RELATED_COUNT):
+    """所有文章的前 k 篇相关文章，返回 {slug: [(slug, 相似度)]}"""
+    if not slugs:
+        return {}
+    if sparse is not None:
+        return _top_k_matrix(slugs, vectors, k)
+    return _top_k_python(slugs, vectors, k)
+
+
+def _top_k_matrix(slugs, vectors, k):
+    vocab = {}
+    indptr = [0]
+    indices = []
+    data = []
+    for vector in vectors:
+        for term, weight in vector.items():
+            indices.append(vocab.setdefault(term, len(vocab)))
+            data.append(weight)
+        indptr.append(len(indices))
+    n = len(slugs)
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+        shape=(n, max(1, len(vocab))),
+    )
+    transposed = matrix.T.tocsr()
+    # 多取几个候选，相同分数时由 pick 按 slug 决定，与纯 Python 的结果一致
+    keep = min(n, k * 4 + 1)
+    result = {}
+    for start in range(0, n, MATRIX_BLOCK):
+        block = (matrix[start:start + MATRIX_BLOCK] @ transposed).toarray()
+        rows = np.arange(block.shape[0])
+        block[rows, rows + start] = 0.0
+        if keep < n:
+            candidates = np.argpartition(-block, keep - 1, axis=1)[:, :keep]
+        else:
+            candidates = np.tile(np.arange(n), (block.shape[0], 1))
+        for row, columns in enumerate(candidates):
+            result[slugs[start + row]] = pick(
+                (slugs[j], float(block[row, j])) for j in columns.tolist()
+            )
+    return result
+
+
+def _top_k_python(slugs, vectors, k):
+    inverted = {}
+    for i, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            inverted.setdefault(term, []).append((i, weight))
+    result = {}
+    for i, vector in enumerate(vectors):
+        scores = Counter()
+        for term, weight in vector.items():
+            for j, other in inverted[term]:
+                if j != i:
+                    scores[j] += weight * other
+        result[slugs[i]] = pick(((slugs[j], s) for j, s in scores.items()), k)
+    return result
+
+
+class RelatedIndex:
+    """相关文章索引"""
+
+    def __init__(self, root=None, path=None):
+        self.root = root or BLOG_DIR
+        self.path = path or cache_path(INDEX_NAME, self.root)
+        ensure_dir(os.path.dirname(self.path))
+        self.conn = sqlite3.connect(self.path)
+        self._init_schema()
+
+    def _init_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS doc_terms; DROP TABLE IF EXISTS postings;"
+                "DROP TABLE IF EXISTS df;"
+                "DROP TABLE IF EXISTS neighbors; DROP TABLE IF EXISTS index_meta;"
+            )
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO index_meta VALUES (?, ?)", (key, str(value)))
+
+    def related(self):
+        """{slug: [相关文章 slug, ...]}"""
+        result = {}
+        for slug, related in self.conn.execute("SELECT slug, related FROM neighbors ORDER BY slug, rank"):
+            result.setdefault(slug, []).append(related)
+        return result
+
+    def update(self, posts, full=False, workers=None):
+        """
+        按文章列表（slug、source、hash、meta）更新索引，返回统计
+        {"mode": "unchanged" / "incremental" / "rebuild", "tokenized": n, "rows": 重算的行数}
+        """
+        known = dict(self.conn.execute("SELECT slug, hash FROM docs"))
+        current = {p["slug"] for p in posts}
+        changed = [p for p in posts if full or known.get(p["slug"]) != p["hash"]]
+        removed = [slug for slug in known if slug not in current]
+        if not changed and not removed:
+            return {"mode": "unchanged", "tokenized": 0, "rows": 0}
+
+        with span("tokenize", posts=len(changed)):
+            tokenized = dict(zip((p["slug"] for p in changed), _tokenize_posts(self.root, changed, workers)))
+        with self.conn:
+            weighted_docs = int(self._get_meta("weighted_docs") or 0)
+            if full or not weighted_docs or abs(len(posts) - weighted_docs) > IDF_DRIFT * weighted_docs:
+                rows = self._rebuild(posts, tokenized)
+                mode = "rebuild"
+            else:
+                rows = self._incremental(posts, tokenized, removed)
+                mode = "incremental"
+        return {"mode": mode, "tokenized": len(tokenized), "rows": rows}
+
+    def _rebuild(self, posts, tokenized):
+        """用全部文章的切词结果重新统计 df、加权并计算所有行"""
+        stored = {
+            slug: json.loads(terms) for slug, terms in self.conn.execute("SELECT slug, terms FROM docs")
+        }
+        hashes = {p["slug"]: p["hash"] for p in posts}
+        slugs = sorted(hashes)
+        terms = [tokenized[s] if s in tokenized else stored[s] for s in slugs]
+        df = Counter(t for doc in terms for t in doc)
+        common = common_terms(df, len(slugs))
+        idfs = idf_table(df, len(slugs), common)
+        vectors = [vectorize(doc, idfs) for doc in terms]
+        with span("similarity", posts=len(slugs)):
+            neighbors = top_k_all(slugs, vectors)
+
+        self.conn.executescript(
+            "DELETE FROM docs; DELETE FROM postings; DELETE FROM df; DELETE FROM neighbors;"
+        )
+        self.conn.executemany("INSERT INTO docs VALUES (?, ?, ?)", (
+            (slug, hashes[slug], json.dumps(doc, ensure_ascii=False, separators=(",", ":")))
+            for slug, doc in zip(slugs, terms)
+        ))
+        self.conn.executemany("INSERT INTO df VALUES (?, ?)", df.items())
+        self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", (
+            (term, slug, weight) for slug, vector in zip(slugs, vectors) for term, weight in vector.items()
+        ))
+        self._write_neighbors(neighbors)
+        self._set_meta("weighted_docs", len(slugs))
+        self._set_meta("common_terms", json.dumps(sorted(common), ensure_ascii=False))
+        return len(slugs)
+
+    def _incremental(self, posts, tokenized, removed):
+        """只重算受影响的行"""
+        stale = set(removed) | {slug for slug in tokenized if self._has_doc(slug)}
+        old_terms = {}
+        for slug in stale:
+            row = self.conn.execute("SELECT terms FROM docs WHERE slug = ?", (slug,)).fetchone()
+            old_terms[slug] = json.loads(row[0])
+        touched = {t for terms in old_terms.values() for t in terms} | {
+            t for terms in tokenized.values() for t in terms
+        }
+        old_df = self._df(touched)
+
+        # 旧的切词结果从 df 中减去
+        for slug, terms in old_terms.items():
+            self.conn.executemany("UPDATE df SET df = df - 1 WHERE term = ?", ((t,) for t in terms))
+            self.conn.execute("DELETE FROM docs WHERE slug = ?", (slug,))
+            self.conn.execute("DELETE FROM postings WHERE slug = ?", (slug,))
+        self.conn.execute("DELETE FROM df WHERE df <= 0")
+        hashes = {p["slug"]: p["hash"] for p in posts}
+        for slug, terms in tokenized.items():
+            self.conn.execute("INSERT INTO docs VALUES (?, ?, ?)", (
+                slug, hashes[slug], json.dumps(terms, ensure_ascii=False, separators=(",", ":"))
+            ))
+            self.conn.executemany(
+                "INSERT INTO df VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                ((t,) for t in terms),
+            )
+
+        docs = len(posts)
+        common = set(json.loads(self._get_meta("common_terms") or "[]"))
+        for slug, terms in tokenized.items():
+            self._vectorize_doc(slug, terms, docs, common)
+
+        # df 跨过 MIN_DF 的词：含有它们的其他文章的向量要重新加权。
+        # 退出向量的词只影响向量里有它的文章（倒排表）；进入向量的词要从切词结果里找
+        new_df = self._df(touched)
+        leaving, entering = set(), set()
+        for term in touched - common:
+            before, after = old_df.get(term, 0) >= MIN_DF, new_df.get(term, 0) >= MIN_DF
+            if before and not after:
+                leaving.add(term)
+            elif after and not before:
+                entering.add(term)
+        reweighted = (self._vectors_with(leaving) | self._docs_containing(entering)) - set(tokenized) - stale
+        for slug in reweighted:
+            row = self.conn.execute("SELECT terms FROM docs WHERE slug = ?", (slug,)).fetchone()
+            self.conn.execute("DELETE FROM postings WHERE slug = ?", (slug,))
+            self._vectorize_doc(slug, json.loads(row[0]), docs, common)
+        rescored = set(tokenized) | reweighted
+
+        # 相关文章里有变化、重新加权或删除的文章的行
+        affected = self._rows_with(stale | reweighted)
+        # 每行当前的相关文章数和第 k 名的相似度
+        kth = {slug: (count, score) for slug, count, score in self.conn.execute(
+            "SELECT slug, COUNT(*), MIN(score) FROM neighbors GROUP BY slug"
+        )}
+        updated = {}
+        with span("similarity", rows=len(rescored)):
+            for slug in rescored:
+                scores = self._scores(slug)
+                updated[slug] = pick(scores.items())
+                # 新的相似度能挤进前 k 的行
+                for other, score in scores.items():
+                    count, lowest = kth.get(other, (0, 0.0))
+                    if count < RELATED_COUNT or round(score, 6) >= lowest:
+                        affected.add(other)
+            affected -= rescored | stale
+            for slug in affected:
+                updated[slug] = pick(self._scores(slug).items())
+        self.conn.executemany("DELETE FROM neighbors WHERE slug = ?", ((s,) for s in set(updated) | stale))
+        self._write_neighbors(updated)
+        return len(updated)
+
+    def _vectorize_doc(self, slug, terms, docs, common):
+        """按当前 df 给一篇文章加权并写入倒排表"""
+        idfs = idf_table(self._df(terms), docs, common)
+        self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", (
+            (term, slug, weight) for term, weight in vectorize(terms, idfs).items()
+        ))
+
+    def _vectors_with(self, terms):
+        """向量中含有 terms 的文章"""
+        slugs = set()
+        terms = list(terms)
+        for i in range(0, len(terms), 500):
+            chunk = terms[i:i + 500]
+            slugs.update(slug for slug, in self.conn.execute(
+                f"SELECT DISTINCT slug FROM postings WHERE term IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return slugs
+
+    def _docs_containing(self, terms):
+        """切词结果中含有 terms 的文章（在 docs.terms 的 JSON 里查找 "词": 键，一次表扫描）"""
+        slugs = set()
+        keys = [json.dumps(t, ensure_ascii=False) + ":" for t in terms]
+        for i in range(0, len(keys), 100):
+            chunk = keys[i:i + 100]
+            slugs.update(slug for slug, in self.conn.execute(
+                "SELECT slug FROM docs WHERE " + " OR ".join(["instr(terms, ?) > 0"] * len(chunk)), chunk
+            ))
+        return slugs
+
+    def _has_doc(self, slug):
+        return self.conn.execute("SELECT 1 FROM docs WHERE slug = ?", (slug,)).fetchone() is not None
+
+    def _df(self, terms):
+        df = {}
+        terms = list(terms)
+        for i in range(0, len(terms), 500):
+            chunk = terms[i:i + 500]
+            df.update(self.conn.execute(
+                f"SELECT term, df FROM df WHERE term IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return df
+
+    def _scores(self, slug):
+        """一篇文章与其他所有文章的相似度（只包含有共同词的文章）"""
+        return dict(self.conn.execute(
+            "SELECT p.slug, SUM(p.weight * q.weight) FROM postings q "
+            "JOIN postings p ON p.term = q.term AND p.slug != q.slug "
+            "WHERE q.slug = ? GROUP BY p.slug",
+            (slug,),
+        ))
+
+    def _rows_with(self, slugs):
+        """相关文章中包含 slugs 的行"""
+        rows = set()
+        slugs = list(slugs)
+        for i in range(0, len(slugs), 500):
+            chunk = slugs[i:i + 500]
+            rows.update(slug for slug, in self.conn.execute(
+                f"SELECT DISTINCT slug FROM neighbors WHERE related IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def _write_neighbors(self, neighbors):
+        self.conn.executemany("INSERT INTO neighbors VALUES (?, ?, ?, ?)", (
+            (slug, rank, related, score)
+            for slug, items in neighbors.items()
+            for rank, (related, score) in enumerate(items)
+        ))
+
+
+def related_map(root=None, posts=None, full=False, workers=None):
+    """增量更新并返回 ({slug: [相关文章 slug, ...]}, 统计)"""
+    root = root or BLOG_DIR
+    if posts is None:
+        from post_index import PostIndex
+        with PostIndex(root) as index:
+            index.refresh()
+            posts = index.all()
+    with RelatedIndex(root) as index:
+        stats = index.update(posts, full=full, workers=workers)
+        return index.related(), stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="相关文章（TF-IDF 相似度）")
+    parser.add_argument("--full", action="store_true", help="全量重建")
+    parser.add_argument("--slug", help="只打印这篇文章的相关文章")
+    args = parser.parse_args(argv)
+
+    related, stats = related_map(full=args.full)
+    print(f"🔗 相关文章: {len(related)} 篇有结果，模式 {stats['mode']}，"
+          f"切词 {stats['tokenized']} 篇，重算 {stats['rows']} 行"
+          f"（{'scipy 矩阵' if sparse is not None else '纯 Python'}）")
+    for slug in ([args.slug] if args.slug else sorted(related)):
+        print(f"  {slug}")
+        for other in related.get(slug, []):
+            print(f"    → {other}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
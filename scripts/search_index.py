@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+站内搜索索引（静态分片）
+
+中日韩文字按二元组切词（单个字单独成词），拉丁字母和数字按单词切词。
+倒排表按词的首字符分片写到 search/ 目录，浏览器只下载查询用到的分片：
+    search/meta.json          文档数、分片规则
+    search/s-<key>.json       {"词": [文档id, 权重, 文档id, 权重, ...]}
+    search/d-<n>.json         文档表分块 {"文档id": [slug, 标题, 日期]}
+
+索引按文章增量更新：只重新切词哈希变化的文章，只重写它们涉及的分片和文档块。
+
+用法:
+    python3 scripts/search_index.py           # 增量更新
+    python3 scripts/search_index.py --full    # 全量重建
+"""
+
+import os
+import re
+import sys
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from blog_utils import BLOG_DIR, cache_path, atomic_write, load_json, save_json, parse_front_matter
+from post_index import PostIndex
+from tracing import span
+
+INDEX_VERSION = 1
+STATE_NAME = "search-state.json"
+OUTPUT_DIRNAME = "search"
+DOC_CHUNK = 500
+# 需要切词的文章达到这个数量时使用进程池
+PARALLEL_THRESHOLD = 256
+
+# 各字段的权重
+FIELD_WEIGHTS = (("title", 5), ("tags", 3), ("category", 3), ("excerpt", 2), ("body", 1))
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+TOKEN_RE = re.compile(f"[{_CJK}]+|[a-z0-9]+")
+
+
+def tokenize(text):
+    """CJK 二元组 + 拉丁单词切词（与 js/search.js 保持一致），返回词列表"""
+    tokens = []
+    for run in TOKEN_RE.findall(text.lower()):
+        if run[0] < "\u0080":
+            if len(run) >= 2:
+                tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(map(str.__add__, run, run[1:]))
+    return tokens
+
+
+@lru_cache(maxsize=None)
+def shard_key(term):
+    """词所在的分片：ASCII 按首字母，其他按首字符码位的高 12 位"""
+    first = term[0]
+    if first < "\u0080":
+        return first
+    return f"{ord(first) >> 4:03x}"
+
+
+def document_terms(meta, body):
+    """一篇文章的 {词: 加权词频}"""
+    # 正文权重为 1，直接计数；其余字段很短，逐个加权
+    counts = Counter(tokenize(body))
+    fields = {
+        "title": str(meta.get("title", "")),
+        "tags": " ".join(str(t) for t in (meta.get("tags") or [])),
+        "category": str(meta.get("category", "")),
+        "excerpt": str(meta.get("excerpt", "")),
+    }
+    for field, weight in FIELD_WEIGHTS:
+        if field == "body":
+            continue
+        for term in tokenize(fields[field]):
+            counts[term] += weight
+    return counts
+
+
+def _index_file(path):
+    """读取并切词一篇文章（可在子进程中运行）"""
+    with open(path, "r", encoding="utf-8") as f:
+        meta, body = parse_front_matter(f.read())
+    return dict(document_terms(meta, body))
+
+
+def _index_files(paths, workers=None):
+    """切词多篇文章；数量多时分发到进程池"""
+    if len(paths) < PARALLEL_THRESHOLD:
+        return [_index_file(path) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_index_file, paths, chunksize=chunksize))
+
+
+def _shard_path(output_dir, key):
+    return os.path.join(output_dir, f"s-{key}.json")
+
+
+def _doc_chunk_path(output_dir, chunk):
+    return os.path.join(output_dir, f"d-{chunk}.json")
+
+
+def _clear_output(output_dir):
+    """全量重建前清掉旧的分片和文档块"""
+    if not os.path.isdir(output_dir):
+        return
+    for name in os.listdir(output_dir):
+        if name.endswith(".json") and name[:2] in ("s-", "d-"):
+            os.remove(os.path.join(output_dir, name))
+
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def build_search_index(root=None, output_dir=None, full=False, workers=None, verbose=True):
+    """增量更新搜索索引，返回 {"written": [...], "deleted": [...], ...}（路径相对 root）"""
+    started = time.perf_counter()
+    root = root or BLOG_DIR
+    output_dir = output_dir or os.path.join(root, OUTPUT_DIRNAME)
+    state_path = cache_path(STATE_NAME, root)
+
+    state = load_json(state_path, {}) or {}
+    if full or state.get("version") != INDEX_VERSION or not os.path.isdir(output_dir):
+        state = {"version": INDEX_VERSION, "next_id": 0, "docs": {}}
+        _clear_output(output_dir)
+    docs = state["docs"]
+
+    with PostIndex(root) as index:
+        index.refresh()
+        posts = index.all()
+    current = {p["slug"]: p for p in posts}
+
+    # 找出新增、变化、删除的文章
+    changed = [p for p in posts if docs.get(p["slug"], {}).get("hash") != p["hash"]]
+    removed = [slug for slug in docs if slug not in current]
+
+    # 受影响的分片：旧词和新词所在的分片
+    touched_shards = set()
+    touched_chunks = set()
+    stale_ids = set()
+    for slug in removed:
+        entry = docs.pop(slug)
+        stale_ids.add(entry["id"])
+        touched_shards.update(entry["shards"])
+        touched_chunks.add(entry["id"] // DOC_CHUNK)
+
+    paths = [os.path.join(root, post["source"]) for post in changed]
+    postings = {}
+    with span("tokenize", posts=len(paths)):
+        indexed = _index_files(paths, workers)
+    for post, terms in zip(changed, indexed):
+        entry = docs.get(post["slug"])
+        if entry:
+            stale_ids.add(entry["id"])
+            touched_shards.update(entry["shards"])
+            doc_id = entry["id"]
+        else:
+            doc_id = state["next_id"]
+            state["next_id"] += 1
+        shards = sorted({shard_key(t) for t in terms})
+        touched_shards.update(shards)
+        touched_chunks.add(doc_id // DOC_CHUNK)
+        for term, weight in terms.items():
+            postings.setdefault(term, []).append((doc_id, weight))
+        docs[post["slug"]] = {
+            "id": doc_id,
+            "hash": post["hash"],
+            "shards": shards,
+            "title": post["title"],
+            "date": post["date"][:10],
+        }
+
+    # 按分片分组新的倒排项
+    grouped = {}
+    for term, pairs in postings.items():
+        grouped.setdefault(shard_key(term), {})[term] = pairs
+
+    written = []
+    deleted = []
+    for key in sorted(touched_shards):
+        path = _shard_path(output_dir, key)
+        shard = load_json(path, {}) or {}
+        updated = {}
+        for term, flat in shard.items():
+            pairs = [(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)
+                     if flat[i] not in stale_ids]
+            if pairs:
+                updated[term] = pairs
+        for term, pairs in grouped.get(key, {}).items():
+            updated.setdefault(term, []).extend(pairs)
+        if updated:
+            atomic_write(path, _dump({
+                term: [x for pair in sorted(pairs) for x in pair]
+                for term, pairs in updated.items()
+            }))
+            written.append(os.path.relpath(path, root))
+        elif os.path.exists(path):
+            os.remove(path)
+            deleted.append(os.path.relpath(path, root))
+
+    # 重写受影响的文档表分块
+    by_chunk = {}
+    for slug, entry in docs.items():
+        if entry["id"] // DOC_CHUNK in touched_chunks:
+            by_chunk.setdefault(entry["id"] // DOC_CHUNK, {})[entry["id"]] = [
+                slug, entry["title"], entry["date"]
+            ]
+    for chunk in sorted(touched_chunks):
+        path = _doc_chunk_path(output_dir, chunk)
+        if chunk in by_chunk:
+            atomic_write(path, _dump({str(k): v for k, v in by_chunk[chunk].items()}))
+            written.append(os.path.relpath(path, root))
+        elif os.path.exists(path):
+            os.remove(path)
+            deleted.append(os.path.relpath(path, root))
+
+    meta_path = os.path.join(output_dir, "meta.json")
+    meta = {"version": INDEX_VERSION, "docs": len(docs), "docChunk": DOC_CHUNK}
+    if load_json(meta_path) != meta:
+        atomic_write(meta_path, _dump(meta))
+        written.append(os.path.relpath(meta_path, root))
+
+    save_json(state_path, state, compact=True)
+    result = {
+        "indexed": len(changed),
+        "removed": len(removed),
+        "shards": len(touched_shards),
+        "written": written,
+        "deleted": deleted,
+        "elapsed": time.perf_counter() - started,
+    }
+    if verbose:
+        print(f"🔍 搜索索引: 共 {len(docs)} 篇，重新索引 {len(changed)} 篇，删除 {len(removed)} 篇，"
+              f"重写 {len(touched_shards)} 个分片，耗时 {result['elapsed']:.2f}s")
+    return result
+
+
+def main():
+    build_search_index(full="--full" in sys.argv[1:])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+教程章节内容缓存
+
+按 (主题 id, 章节标题, 生成器版本, compute() 额外读取的输入) 计算内容地址，
+章节正文保存在 .cache/sections/ 下。命中时原样返回缓存的文本，所以主题库改动后
+重新生成文章只会重算变化的章节：键里只有 compute() 真正读取的输入，改主题的摘要、
+标签或其他章节不影响这个章节。缓存总大小有上限，超出时按最近使用时间（文件 mtime）淘汰；命中/未命中次数累计
+保存在 stats.json，进程池里的工作进程把计数交回主进程统一写入。
+
+用法:
+    python3 scripts/section_cache.py           # 查看缓存统计
+    python3 scripts/section_cache.py --clear   # 清空缓存
+"""
+
+import os
+import sys
+import json
+import atexit
+import shutil
+
+from blog_utils import cache_path, text_sha256, atomic_write, load_json, save_json
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+STATS_NAME = "stats.json"
+
+
+class SectionCache:
+    """磁盘上的章节缓存（LRU 淘汰）"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or cache_path("sections")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+
+    @staticmethod
+    def make_key(topic_id, section, version, inputs=None):
+        """内容地址：inputs 是 compute() 除章节标题外读取的输入"""
+        return text_sha256(json.dumps([topic_id, section, version, inputs],
+                                      ensure_ascii=False, sort_keys=True, default=str))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.md")
+
+    def get(self, key):
+        """读取缓存，未命中返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # 刷新 mtime，作为 LRU 的最近使用时间
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data.decode("utf-8")
+
+    def put(self, key, text):
+        """写入缓存"""
+        data = text.encode("utf-8")
+        atomic_write(self._path(key), data)
+        self._written += len(data)
+        if self._written > self.max_bytes // 10:
+            self.evict()
+
+    def get_or_compute(self, topic_id, section, version, compute, inputs=None):
+        """命中则返回缓存内容，否则调用 compute() 生成并写入缓存"""
+        key = self.make_key(topic_id, section, version, inputs)
+        text = self.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+        self.misses += 1
+        text = compute()
+        self.put(key, text)
+        return text
+
+    def _entries(self):
+        """[(mtime, size, path), ...]"""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for sub in os.listdir(self.directory):
+            sub_dir = os.path.join(self.directory, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if not name.endswith(".md"):
+                    continue
+                path = os.path.join(sub_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+        return entries
+
+    def evict(self):
+        """超过容量时删除最久未使用的条目，返回删除的条目数"""
+        self._written = 0
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def take_counts(self):
+        """取出并清零本进程的 (命中, 未命中) 次数，工作进程用它把计数交回主进程"""
+        counts = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        return counts
+
+    def add_counts(self, hits, misses):
+        """合并其他进程交回的计数"""
+        self.hits += hits
+        self.misses += misses
+
+    def flush(self):
+        """把本进程的命中/未命中次数累加到 stats.json"""
+        if not (self.hits or self.misses):
+            return
+        stats_path = os.path.join(self.directory, STATS_NAME)
+        stats = load_json(stats_path, {}) or {}
+        stats["hits"] = stats.get("hits", 0) + self.hits
+        stats["misses"] = stats.get("misses", 0) + self.misses
+        save_json(stats_path, stats)
+        self.hits = self.misses = 0
+
+    def stats(self):
+        """累计统计 + 当前条目数和大小"""
+        stats = load_json(os.path.join(self.directory, STATS_NAME), {}) or {}
+        entries = self._entries()
+        hits = stats.get("hits", 0) + self.hits
+        misses = stats.get("misses", 0) + self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        """清空缓存"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.hits = self.misses = 0
+
+
+_cache = None
+
+
+def get_cache():
+    """进程内共享的缓存实例，退出时写回统计"""
+    global _cache
+    if _cache is None:
+        max_bytes = int(os.environ.get("SECTION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        _cache = SectionCache(max_bytes=max_bytes)
+        atexit.register(_cache.flush)
+    return _cache
+
+
+def cached_section(topic, section, version, compute, inputs=None):
+    """
+    生成器使用的入口：按主题和章节缓存 compute() 的结果
+
+    compute() 除章节标题外还读取主题的其他字段时，把这些字段的值传给 inputs，
+    它们变化时才重算这个章节
+    """
+    topic_id = topic.get("id") or topic["title"]
+    return get_cache().get_or_compute(topic_id, section, version, compute, inputs=inputs)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    cache = get_cache()
+    if "--clear" in argv:
+        cache.clear()
+        print(f"已清空章节缓存: {cache.directory}")
+        return 0
+    stats = cache.stats()
+    print(f"章节缓存: {cache.directory}")
+    print(f"  条目: {stats['entries']}，大小: {stats['bytes'] / 1024:.1f} KB / "
+          f"{stats['max_bytes'] / 1024 / 1024:.0f} MB")
+    print(f"  命中: {stats['hits']}，未命中: {stats['misses']}，命中率: {stats['hit_rate']:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
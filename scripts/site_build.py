@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TechBlog 增量构建引擎（默认 GitHub Pages 相对路径版本，--absolute 生成以 / 开头的链接）
+用源文件哈希清单记录上次构建的输入，只重建发生变化的文章及依赖它们的列表页
+（文章元数据来自 post_index 的增量索引，未变化的源文件不会被打开）；
+页面由 templates 的预编译布局和缓存的共享片段组装，流式写入输出文件
+"""
+
+import os
+import re
+import sys
+import json
+import time
+
+from blog_utils import (
+    BLOG_DIR, cache_path, text_sha256, file_sha256, atomic_write_chunks,
+    load_json, save_json, parse_front_matter, parse_post_date, format_zh_date,
+)
+from post_index import PostIndex
+import image_pipeline
+from image_pipeline import ImageCatalog
+import markdown_render
+from related import related_map
+import content_analyzer
+import feeds
+from content_analyzer import analyze_posts, check_links
+import templates
+from templates import Layout
+from tracing import span
+
+MANIFEST_NAME = "build-manifest.json"
+MANIFEST_VERSION = 2
+
+# 列表页每页的文章数（与 build-github.js 的 CONFIG.postsPerPage 一致）
+POSTS_PER_PAGE = 6
+# 标签 / 分类归档页所在目录
+ARCHIVE_DIRS = {"tag": "tags", "category": "categories"}
+
+DEFAULT_COVER = "https://images.unsplash.com/photo-1461749280684-dccba630e2f6?w=800&h=400&fit=crop"
+AUTHOR_AVATAR = "https://images.unsplash.com/photo-1507003211169-0a1dd7228f2d?w=100&h=100&fit=crop"
+
+def template_version(target="relative"):
+    """
+    模板版本：本文件、模板层、图片标记和 Markdown 渲染器的代码 + 内容分析规则（阅读时间）
+    + 链接目标
+
+    页脚年份不计入：页面里的年份由 js/main.js 更新，跨年不必重建所有页面。
+    """
+    return text_sha256(
+        f"{file_sha256(__file__)}:{file_sha256(templates.__file__)}:{file_sha256(image_pipeline.__file__)}:"
+        f"{markdown_render.RENDERER_VERSION}:{content_analyzer.ANALYZER_VERSION}:{target}"
+    )
+
+
+_ARCHIVE_UNSAFE = re.compile(r"[\s/\\?#%&:*.\"'<>|]+")
+
+
+def archive_slug(name):
+    """标签 / 分类名对应的文件名：小写，空白和路径、URL 中的特殊字符换成 -"""
+    return _ARCHIVE_UNSAFE.sub("-", str(name).strip().lower()).strip("-") or "untitled"
+
+
+def archive_path(kind, name):
+    """标签 / 分类归档首页的路径，例如 tags/rag.html"""
+    return f"{ARCHIVE_DIRS[kind]}/{archive_slug(name)}.html"
+
+
+def category_tag(post, base_path=None):
+    """分类标签（给出 base_path 时链接到分类归档页）"""
+    category = post.get("category", "")
+    css = f"tag tag-{str(category).lower()}"
+    if base_path is None or not category:
+        return f'<span class="{css}">{category}</span>'
+    return f'<a class="{css}" href="{base_path}{archive_path("category", category)}">{category}</a>'
+
+
+def tag_link(tag, base_path):
+    """链接到标签归档页的标签"""
+    return f'<a class="tag" href="{base_path}{archive_path("tag", tag)}">{tag}</a>'
+
+
+def post_date_str(post):
+    """文章日期（zh-CN 格式）"""
+    return format_zh_date(parse_post_date(post.get("date")))
+
+
+def related_posts(post, meta_by_slug, related):
+    """相关文章的元数据（related 是 related.related_map 的结果）"""
+    return [meta_by_slug[slug] for slug in related.get(post["slug"], []) if slug in meta_by_slug]
+
+
+POST_MAIN = Layout("""    <article>
+        <header class="article-header">
+            <div class="container">
+                <div class="article-meta">
+                    <div class="post-tags">{{tags}}</div>
+                    <span class="read-time"><i class="far fa-clock"></i> {{read_time}} 分钟阅读</span>
+                </div>
+                <h1 class="article-title">{{title}}</h1>
+                <div class="post-meta" style="justify-content: flex-start; gap: 2rem;">
+                    <div class="author">
+                        {{avatar}}
+                        <div>
+                            <span class="author-name">{{author}}</span><br>
+                            <span style="font-size: 0.875rem; color: var(--text-muted);">前端开发工程师</span>
+                        </div>
+                    </div>
+                    <span class="post-date">{{date}}</span>
+                </div>
+            </div>
+        </header>
+
+{{cover}}
+
+        <div class="article-content">
+            {{content}}
+        </div>
+    </article>
+
+{{share}}
+
+    <section class="featured-section">
+        <div class="container">
+            <div class="section-header">
+                <h2 class="section-title">相关文章</h2>
+            </div>
+            <div class="featured-grid" style="grid-template-columns: repeat(2, 1fr);">
+{{related}}
+            </div>
+        </div>
+    </section>""")
+
+RELATED_CARD = Layout("""
+                <article class="post-card">
+                    <div class="post-content">
+                        <div class="post-tags">
+                            {{category}}
+                        </div>
+                        <h3 class="post-title">
+                            <a href="{{href}}">{{title}}</a>
+                        </h3>
+                        <p class="post-excerpt">{{excerpt}}</p>
+                    </div>
+                </article>""")
+
+NO_RELATED = """
+                <div style="text-align: center; padding: 2rem;">
+                    <p style="color: var(--text-secondary);">暂无相关文章</p>
+                </div>"""
+
+
+def generate_post_page(post, html, related, images=None, target="relative"):
+    """生成文章页，产出 HTML 的字节块（related 是相关文章的元数据列表）"""
+    images = images or ImageCatalog()
+    base = templates.base_path(1, target)
+    # 封面在首屏，是文章页的 LCP 图片：不懒加载并提高优先级
+    cover_html = (
+        "\n        <div class=\"container\">\n            <div class=\"article-cover\">\n"
+        f"                {images.img(post['cover'], post.get('title', ''), base, image_pipeline.COVER_SIZES, lazy=False, priority=True)}\n"
+        "            </div>\n        </div>"
+        if post.get("cover") else ""
+    )
+    tags = post.get("tags") or []
+    tags_html = (
+        "".join(tag_link(tag, base) for tag in tags)
+        if tags else category_tag(post, base)
+    )
+    related_html = [
+        RELATED_CARD.render(
+            category=category_tag(p, base),
+            href=f"./{p['slug']}.html" if target == "relative" else f"{base}posts/{p['slug']}.html",
+            title=p.get("title", ""),
+            excerpt=p.get("excerpt", ""),
+        )
+        for p in related
+    ] or NO_RELATED
+
+    main = POST_MAIN.render(
+        tags=tags_html,
+        read_time=str(post.get("readTime") or 5),
+        title=post.get("title", ""),
+        avatar=images.img(AUTHOR_AVATAR, "作者", base, css_class="author-avatar", lazy=False,
+                          display_width=image_pipeline.AVATAR_SIZE),
+        author=post.get("author", ""),
+        date=post_date_str(post),
+        cover=cover_html,
+        content=images.enhance_html(html, base),
+        share=templates.fragment("share"),
+        related=related_html,
+    )
+    return templates.render_page(
+        post.get("title", ""), main, depth=1, target=target,
+        head=f'    <meta name="description" content="{post.get("excerpt", "")}">\n',
+    )
+
+
+def generate_post_card(post, base_path, images=None, lazy=True, priority=False):
+    """生成文章卡片；首屏的卡片 lazy=False，第一张 priority=True"""
+    images = images or ImageCatalog()
+    cover = post.get("cover") or DEFAULT_COVER
+    tags = post.get("tags") or []
+    tags_html = (
+        "".join(tag_link(tag, base_path) for tag in tags[:2])
+        if tags else category_tag(post, base_path)
+    )
+    return f"""<article class="post-card">
+                    <div class="post-image">
+                        {images.img(cover, post.get('title', ''), base_path, lazy=lazy, priority=priority)}
+                        <div class="post-overlay">
+                            <span class="read-time"><i class="far fa-clock"></i> {post.get('readTime') or 5} 分钟</span>
+                        </div>
+                    </div>
+                    <div class="post-content">
+                        <div class="post-tags">{tags_html}</div>
+                        <h3 class="post-title"><a href="{base_path}posts/{post['slug']}.html">{post.get('title', '')}</a></h3>
+                        <p class="post-excerpt">{post.get('excerpt', '')}</p>
+                        <div class="post-meta">
+                            <div class="author">
+                                {images.img(AUTHOR_AVATAR, "作者", base_path, css_class="author-avatar", display_width=image_pipeline.AVATAR_SIZE)}
+                                <span class="author-name">{post.get('author', '')}</span>
+                            </div>
+                            <span class="post-date">{post_date_str(post)}</span>
+                        </div>
+                    </div>
+                </article>"""
+
+
+def date_range(posts):
+    """一组文章的日期范围（posts 按日期倒序）"""
+    newest, oldest = post_date_str(posts[0]), post_date_str(posts[-1])
+    return newest if newest == oldest else f"{oldest} — {newest}"
+
+
+def paginate(posts, index_path, title, description):
+    """
+    把一个文章列表（按日期倒序）分成若干列表页
+
+    首页（index_path）显示最新的 POSTS_PER_PAGE 篇；更早的文章从最旧的一篇开始
+    每 POSTS_PER_PAGE 篇一页（<目录>/<k>.html，k 从 1 开始），新文章只会进入首页和最新的分页，
+    旧分页的成员不变，不需要重新生成。
+    """
+    per_page = POSTS_PER_PAGE
+    chunk_dir = index_path[:-len(".html")] if index_path != "posts.html" else "page"
+    # 需要分页的是首页放不下的文章，即按时间顺序前 len(posts) - per_page 篇
+    overflow = max(0, len(posts) - per_page)
+    chunks = (overflow + per_page - 1) // per_page
+
+    def chunk_path(k):
+        return f"{chunk_dir}/{k}.html"
+
+    pages = [{
+        "path": index_path,
+        "title": title,
+        "description": description,
+        "posts": posts[:per_page],
+        "newer": None,
+        "older": chunk_path(chunks) if chunks else None,
+    }]
+    oldest_first = posts[::-1]
+    for k in range(1, chunks + 1):
+        members = oldest_first[(k - 1) * per_page:k * per_page][::-1]
+        pages.append({
+            "path": chunk_path(k),
+            "title": title,
+            "description": date_range(members),
+            "posts": members,
+            "newer": chunk_path(k + 1) if k < chunks else index_path,
+            "older": chunk_path(k - 1) if k > 1 else None,
+        })
+    return pages
+
+
+def list_pages(posts):
+    """全部列表页：文章列表 + 每个分类、每个标签的归档页（posts 按日期倒序）"""
+    pages = paginate(posts, "posts.html", "所有文章", f"共 {len(posts)} 篇技术文章")
+    groups = {}
+    for post in posts:
+        names = [("category", post.get("category"))] + [("tag", t) for t in post.get("tags") or []]
+        for kind, name in names:
+            if not name:
+                continue
+            path = archive_path(kind, name)
+            # 大小写不同的同名标签合并到一页，标题用第一次出现的写法
+            group = groups.setdefault(path, {"kind": kind, "name": name, "posts": []})
+            if not group["posts"] or group["posts"][-1] is not post:
+                group["posts"].append(post)
+    for path, group in sorted(groups.items()):
+        label = "分类" if group["kind"] == "category" else "标签"
+        pages.extend(paginate(group["posts"], path, f"{label}：{group['name']}",
+                              f"共 {len(group['posts'])} 篇文章"))
+    return pages
+
+
+def list_page_signature(template, page, card_keys):
+    """列表页的输入签名：模板 + 标题 + 前后页链接 + 成员卡片"""
+    return text_sha256(json.dumps(
+        [template, page["path"], page["title"], page["description"], page["newer"], page["older"],
+         [card_keys[p["slug"]] for p in page["posts"]]],
+        ensure_ascii=False,
+    ))
+
+
+def generate_pagination(page, base_path):
+    """较新 / 更早的文章链接"""
+    links = []
+    if page["newer"]:
+        links.append(f'<a href="{base_path}{page["newer"]}" class="btn btn-outline">'
+                     '<i class="fas fa-arrow-left"></i><span>较新的文章</span></a>')
+    if page["older"]:
+        links.append(f'<a href="{base_path}{page["older"]}" class="btn btn-outline">'
+                     '<span>更早的文章</span><i class="fas fa-arrow-right"></i></a>')
+    if not links:
+        return ""
+    return f"""
+            <nav class="pagination">
+                {"".join(links)}
+            </nav>"""
+
+
+LIST_MAIN = Layout("""    <header class="page-header">
+        <div class="container">
+            <h1 class="page-title">{{title}}</h1>
+            <p class="page-description">{{description}}</p>
+            <div style="max-width: 480px; margin: 1.5rem auto 0;">
+                <input type="search" id="searchInput" placeholder="搜索文章..." autocomplete="off" style="width: 100%; padding: 0.75rem 1rem; border-radius: 8px; border: 1px solid var(--border-color); background: var(--bg-primary); color: var(--text-primary);">
+                <ul id="searchResults" style="list-style: none; padding: 0; margin-top: 1rem; text-align: left;"></ul>
+            </div>
+        </div>
+    </header>
+
+    <section class="featured-section">
+        <div class="container">
+            <div class="featured-grid">
+                {{cards}}
+            </div>{{pagination}}
+        </div>
+    </section>""")
+
+_CARD_SEPARATOR = "\n\n                ".encode("utf-8")
+
+
+def generate_list_page(page, images=None, target="relative", cards=None):
+    """
+    生成列表页（文章列表、分类 / 标签归档），产出 HTML 的字节块
+
+    cards 是跨页面共享的卡片缓存 {(slug, base, 位置): bytes}：同一篇文章出现在
+    文章列表、分类页和多个标签页时卡片只生成一次；前 EAGER_CARDS 张卡片在首屏，封面不懒加载
+    """
+    depth = page["path"].count("/")
+    base = templates.base_path(depth, target)
+    cards = {} if cards is None else cards
+
+    def card_chunks():
+        for i, post in enumerate(page["posts"]):
+            position = min(i, image_pipeline.EAGER_CARDS)
+            key = (post["slug"], base, position)
+            if key not in cards:
+                cards[key] = generate_post_card(
+                    post, base, images, lazy=i >= image_pipeline.EAGER_CARDS, priority=i == 0,
+                ).encode("utf-8")
+            if i:
+                yield _CARD_SEPARATOR
+            yield cards[key]
+
+    main = LIST_MAIN.render(
+        title=page["title"],
+        description=page["description"],
+        cards=card_chunks(),
+        pagination=generate_pagination(page, base),
+    )
+    return templates.render_page(page["title"], main, depth=depth, target=target,
+                                 scripts="search_scripts")
+
+
+def render_markdown_batch(bodies, root=None):
+    """渲染多篇 Markdown（输出与 build-github.js 的 marked 一致），返回 HTML 列表"""
+    if not bodies:
+        return []
+    with span("render markdown", posts=len(bodies)) as current:
+        rendered, stats = markdown_render.render_batch(bodies, root or BLOG_DIR)
+        current.set(**stats)
+    return rendered
+
+
+def load_posts(root, manifest_posts):
+    """
+    从文章索引读取元数据，返回 (posts, changed_sources)
+
+    索引只重新解析 mtime/大小变化的文件；changed_sources 是哈希与上次构建不同的源文件。
+    """
+    with PostIndex(root) as index:
+        index.refresh()
+        rows = index.all()
+    posts = []
+    changed = []
+    for row in rows:
+        entry = manifest_posts.get(row["slug"], {})
+        if entry.get("hash") != row["hash"]:
+            changed.append(row["source"])
+        posts.append({
+            "slug": row["slug"],
+            "source": row["source"],
+            "hash": row["hash"],
+            "meta": row["meta"],
+            "page": entry.get("page", ""),
+        })
+    return posts, changed
+
+
+def read_body(root, source):
+    """读取文章正文"""
+    with open(os.path.join(root, source), "r", encoding="utf-8") as f:
+        return parse_front_matter(f.read())[1]
+
+
+def fill_read_time(all_meta, analyses):
+    """Front Matter 没有 readTime 的文章用分析得到的阅读时间"""
+    for meta in all_meta:
+        if not meta.get("readTime") and meta["slug"] in analyses:
+            meta["readTime"] = analyses[meta["slug"]]["read_time"]
+
+
+def page_signature(template, post, related, image_keys=()):
+    """文章页的输入签名：模板 + 源文件 + 页面用到的图片（见 page_image_keys）+ 相关文章卡片"""
+    related_key = [
+        [p["slug"], p.get("title"), p.get("category"), p.get("excerpt")]
+        for p in related
+    ]
+    return text_sha256(json.dumps(
+        [template, post["hash"], list(image_keys), related_key], ensure_ascii=False
+    ))
+
+
+def page_image_keys(meta, analysis, images):
+    """文章页用到的图片（封面、作者头像、正文中的图片）在图片清单中的处理结果"""
+    body = [link["url"] for link in (analysis or {}).get("links", []) if images.resolve(link["url"])]
+    return [images.key(src) for src in [meta.get("cover"), AUTHOR_AVATAR, *body]]
+
+
+def card_key(post, images=None):
+    """列表页卡片依赖的字段（含封面图片的处理结果）"""
+    keys = ("title", "cover", "tags", "category", "readTime", "excerpt", "author", "date")
+    cover = (images or ImageCatalog()).key(post.get("cover") or DEFAULT_COVER)
+    return [post["slug"]] + [post.get(k) for k in keys] + [cover]
+
+
+def build(root=None, output_dir=None, full=False, verbose=True, target="relative"):
+    """
+    增量构建，返回本次构建的结果
+
+    target 是站内链接的形式（见 templates.TARGETS），切换目标会重建所有页面。
+
+    结果中 written / deleted 是相对 output_dir 的路径列表，
+    sources 是发生变化的源文件列表，供发布阶段精确暂存。
+    """
+    started = time.perf_counter()
+    root = root or BLOG_DIR
+    output_dir = output_dir or root
+    manifest_path = cache_path(MANIFEST_NAME, root)
+    template = template_version(target)
+
+    manifest = load_json(manifest_path, {}) or {}
+    # 清单重置（全量构建或清单格式变化）后，上次生成的页面仍要按旧记录清理
+    previous_pages = set(manifest.get("pages", {}))
+    reset = full or manifest.get("version") != MANIFEST_VERSION
+    if reset:
+        manifest = {"version": MANIFEST_VERSION, "posts": {}, "pages": {}}
+    old_posts = manifest.get("posts", {})
+
+    with span("load_posts"):
+        posts, changed_sources = load_posts(root, old_posts)
+    all_meta = [dict(p["meta"], slug=p["slug"]) for p in posts]
+    meta_by_slug = {m["slug"]: m for m in all_meta}
+    with span("analyze_posts", posts=len(posts)):
+        analyses = analyze_posts(root, posts)
+    fill_read_time(all_meta, analyses)
+    images = ImageCatalog.load(root)
+    with span("related_posts") as current_span:
+        related, related_stats = related_map(root, posts, full)
+        current_span.set(**related_stats)
+
+    written = []
+    deleted = []
+
+    # 删除源文件已不存在的输出；清单重置后没有旧记录，按 posts/ 目录中的页面清理
+    current = {p["slug"] for p in posts}
+    stale = {slug: entry["source"] for slug, entry in old_posts.items() if slug not in current}
+    posts_output = os.path.join(output_dir, "posts")
+    if reset and os.path.isdir(posts_output):
+        for name in os.listdir(posts_output):
+            if name.endswith(".html") and name[:-len(".html")] not in current:
+                stale.setdefault(name[:-len(".html")], None)
+    for slug, source in sorted(stale.items()):
+        output = os.path.join(posts_output, f"{slug}.html")
+        if os.path.exists(output):
+            os.remove(output)
+            deleted.append(os.path.relpath(output, output_dir))
+        if source:
+            changed_sources.append(source)
+
+    # 找出输入签名变化的文章页
+    to_render = []
+    for post in posts:
+        meta = meta_by_slug[post["slug"]]
+        signature = page_signature(template, post, related_posts(meta, meta_by_slug, related),
+                                   page_image_keys(meta, analyses.get(post["slug"]), images))
+        output = os.path.join(output_dir, "posts", f"{post['slug']}.html")
+        if signature != post.get("page") or not os.path.exists(output):
+            to_render.append((post, signature))
+
+    bodies = [read_body(root, post["source"]) for post, _ in to_render]
+    rendered = render_markdown_batch(bodies, root)
+
+    with span("write_pages", pages=len(to_render)):
+        for (post, signature), html in zip(to_render, rendered):
+            meta = meta_by_slug[post["slug"]]
+            output = os.path.join(output_dir, "posts", f"{post['slug']}.html")
+            atomic_write_chunks(output, generate_post_page(
+                meta, html, related_posts(meta, meta_by_slug, related), images, target
+            ), fsync=False)
+            post["page"] = signature
+            written.append(os.path.relpath(output, output_dir))
+            if verbose:
+                print(f"✅ 生成: posts/{post['slug']}.html")
+
+    # 列表页只依赖成员文章的卡片字段，成员没变的页面不重新生成
+    pages = manifest.get("pages", {})
+    list_written = 0
+    current_pages = list_pages(all_meta) if all_meta else []
+    if all_meta:
+        card_keys = {m["slug"]: card_key(m, images) for m in all_meta}
+        cards = {}
+        with span("write_list_pages", pages=len(current_pages)):
+            for page in current_pages:
+                signature = list_page_signature(template, page, card_keys)
+                output = os.path.join(output_dir, page["path"])
+                if pages.get(page["path"]) == signature and os.path.exists(output):
+                    continue
+                atomic_write_chunks(output, generate_list_page(page, images, target, cards), fsync=False)
+                pages[page["path"]] = signature
+                written.append(page["path"])
+                list_written += 1
+                if verbose:
+                    print(f"✅ 生成: {page['path']}")
+        # 删除已经没有文章的归档页和多出来的分页
+        live = {page["path"] for page in current_pages}
+        for path in sorted((set(pages) | previous_pages) - live):
+            pages.pop(path, None)
+            output = os.path.join(output_dir, path)
+            if os.path.exists(output):
+                os.remove(output)
+                deleted.append(path)
+                try:
+                    os.rmdir(os.path.dirname(output))
+                except OSError:
+                    pass
+
+    with span("feeds") as current_span:
+        feed_posts = [dict(m, hash=p["hash"]) for m, p in zip(all_meta, posts)]
+        feed_result = feeds.update(root, output_dir, feed_posts, current_pages, full)
+        written.extend(feed_result["written"])
+        deleted.extend(feed_result["deleted"])
+        current_span.set(written=len(feed_result["written"]))
+        if verbose:
+            for path in feed_result["written"]:
+                print(f"✅ 生成: {path}")
+
+    with span("check_links") as current_span:
+        broken_links = check_links(analyses, root, output_dir)
+        current_span.set(broken=len(broken_links))
+    if verbose:
+        for item in broken_links:
+            print(f"⚠️  坏链接 {item['slug']}:{item['line']} {item['url']}（{item['reason']}）")
+
+    save_json(manifest_path, {
+        "version": MANIFEST_VERSION,
+        "posts": {
+            p["slug"]: {"source": p["source"], "hash": p["hash"], "page": p["page"]}
+            for p in posts
+        },
+        "pages": pages,
+    })
+
+    result = {
+        "posts": len(posts),
+        "rendered": len(to_render),
+        "skipped": len(posts) - len(to_render),
+        "list_pages": list_written,
+        "written": written,
+        "deleted": deleted,
+        "sources": changed_sources,
+        "broken_links": broken_links,
+        "elapsed": time.perf_counter() - started,
+    }
+    if verbose:
+        print(f"📄 共 {result['posts']} 篇文章，重建 {result['rendered']} 篇，"
+              f"跳过 {result['skipped']} 篇，重建列表页 {list_written} 个，删除 {len(deleted)} 个过期页面，"
+              f"耗时 {result['elapsed']:.2f}s")
+    return result
+
+
+def main():
+    full = "--full" in sys.argv[1:]
+    target = "absolute" if "--absolute" in sys.argv[1:] else "relative"
+    print("🚀 开始增量构建 (GitHub Pages 版本)...\n" if target == "relative"
+          else "🚀 开始增量构建 (根路径版本)...\n")
+    build(full=full, target=target)
+    print("\n🎉 构建完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生产模式静态文件服务器（asyncio）
+
+- 启动时把站点文件索引到内存：小文件（默认 ≤ 1 MB）内容直接缓存，大文件用 sendfile 发送；
+- 强 ETag 取自内容 SHA-256（与 deploy-manifest 相同，和 package_site 共用按大小、mtime 的哈希缓存），
+  If-None-Match / If-Modified-Since 命中时返回 304；
+- 根据 Accept-Encoding 选择 package_site 预先生成的 .br / .gz 兄弟文件，带 Vary: Accept-Encoding；
+- 带指纹的 css/js（style.<hash>.css）长期缓存，HTML 每次验证；
+- HTTP/1.1 keep-alive，单进程 asyncio 处理大量并发连接；SIGHUP 重新加载文件索引。
+
+默认服务 dist/（先运行 package_site.py）；--root . 时只服务 package_site 规则中会发布的文件。
+
+用法:
+    python3 scripts/static_server.py                       # http://127.0.0.1:8080，服务 dist/
+    python3 scripts/static_server.py --root . --port 8000
+    python3 scripts/static_server.py --prefix /preview     # 反向代理把站点挂在子路径下时
+    python3 scripts/load_test.py http://127.0.0.1:8080/    # 压测
+"""
+
+import os
+import re
+import sys
+import signal
+import asyncio
+import argparse
+import mimetypes
+import posixpath
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote, urlsplit
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from blog_utils import BLOG_DIR, file_sha256
+import package_site
+
+DEFAULT_PORT = 8080
+# 不超过这个大小的文件内容缓存在内存中
+MEMORY_FILE_LIMIT = 1024 * 1024
+# 内存缓存的总大小上限，超过后其余文件改用 sendfile
+MEMORY_TOTAL_LIMIT = 256 * 1024 * 1024
+KEEPALIVE_SECONDS = 15
+MAX_HEADER_BYTES = 16 * 1024
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_FINGERPRINTED = re.compile(r"\.[0-9a-f]{10}\.(?:css|js)$")
+_REASONS = {
+    200: "OK", 301: "Moved Permanently", 304: "Not Modified", 400: "Bad Request",
+    404: "Not Found", 405: "Method Not Allowed", 431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class StaticFile:
+    """一个可以发送的文件（原文件或压缩副本）"""
+
+    __slots__ = ("path", "size", "mtime", "etag", "last_modified", "content_type", "encoding",
+                 "body", "variants", "cache_control")
+
+    def __init__(self, path, size, mtime, etag, content_type, encoding=None):
+        self.path = path
+        self.size = size
+        self.mtime = int(mtime)
+        self.etag = etag
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.content_type = content_type
+        self.encoding = encoding
+        self.body = None
+        self.variants = {}
+        self.cache_control = "no-cache"
+
+
+def content_type_for(rel):
+    content_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/json", "application/javascript",
+                                                            "image/svg+xml", "application/xml"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def site_files(root):
+    """要服务的文件和对应的哈希缓存：仓库根目录只服务会发布的文件，dist 这类产物目录全部服务"""
+    if os.path.abspath(root) == os.path.abspath(BLOG_DIR):
+        return package_site.publishable_files(root), package_site.HASH_CACHE_NAME
+    return package_site.dist_files(root), package_site.DIST_HASH_CACHE_NAME
+
+
+def load_site(root, memory_limit=MEMORY_TOTAL_LIMIT):
+    """建立 {相对路径: StaticFile} 索引；压缩副本挂在原文件的 variants 上"""
+    paths, hash_cache = site_files(root)
+    # 与 package_site 共用哈希缓存，大小和 mtime 没变的文件不重新计算
+    manifest = package_site.build_manifest(root, paths, hash_cache, cache_root=BLOG_DIR)
+    if os.path.isfile(os.path.join(root, package_site.MANIFEST_NAME)):
+        manifest[package_site.MANIFEST_NAME] = {
+            "sha256": file_sha256(os.path.join(root, package_site.MANIFEST_NAME))
+        }
+    files = {}
+    for rel in sorted(manifest):
+        if any(rel.endswith(ext) and rel[:-len(ext)] in manifest for _, ext in ENCODINGS):
+            continue
+        item = files[rel] = _make_file(root, rel, manifest[rel]["sha256"], content_type_for(rel))
+        for name, ext in ENCODINGS:
+            if rel + ext in manifest:
+                item.variants[name] = _make_file(root, rel + ext, manifest[rel + ext]["sha256"],
+                                                 item.content_type, encoding=name)
+    # 内存缓存：优先缓存压缩副本（大多数请求命中它们），然后是原文件；其余用 sendfile
+    cached_bytes = 0
+    candidates = [v for f in files.values() for v in f.variants.values()] + list(files.values())
+    for item in candidates:
+        if item.size <= MEMORY_FILE_LIMIT and cached_bytes + item.size <= memory_limit:
+            with open(item.path, "rb") as f:
+                item.body = f.read()
+            cached_bytes += item.size
+    return files, cached_bytes
+
+
+def _make_file(root, rel, digest, content_type, encoding=None):
+    path = os.path.join(root, rel)
+    st = os.stat(path)
+    item = StaticFile(path, st.st_size, st.st_mtime, f'"{digest[:20]}"', content_type, encoding)
+    if _FINGERPRINTED.search(rel.rsplit(".", 1)[0] if encoding else rel):
+        item.cache_control = "public, max-age=31536000, immutable"
+    return item
+
+
+def parse_accept_encoding(header):
+    """返回客户端接受的编码集合（q=0 的除外）"""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def choose_variant(item, accept_encoding):
+    if not item.variants or not accept_encoding:
+        return item
+    accepted = parse_accept_encoding(accept_encoding)
+    for name, _ in ENCODINGS:
+        if name in item.variants and (name in accepted or "*" in accepted):
+            return item.variants[name]
+    return item
+
+
+def not_modified(item, headers):
+    """If-None-Match 优先；没有时比较 If-Modified-Since（秒精度）"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return item.etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return item.mtime <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class StaticServer:
+    def __init__(self, root, prefix="", memory_limit=MEMORY_TOTAL_LIMIT, access_log=False):
+        self.root = root
+        self.prefix = "/" + prefix.strip("/") if prefix.strip("/") else ""
+        self.memory_limit = memory_limit
+        self.access_log = access_log
+        self.files = {}
+        self.reload()
+
+    def reload(self):
+        self.files, cached = load_site(self.root, self.memory_limit)
+        variants = sum(len(f.variants) for f in self.files.values())
+        print(f"📁 {self.root}: {len(self.files)} 个文件，{variants} 个压缩副本，"
+              f"内存缓存 {cached / 1024 / 1024:.1f} MB", flush=True)
+
+    def resolve(self, target):
+        """URL -> (StaticFile, 需要重定向到的 URL)"""
+        path = unquote(urlsplit(target).path)
+        if self.prefix:
+            if path == self.prefix:
+                return None, self.prefix + "/"
+            if not path.startswith(self.prefix + "/"):
+                return None, None
+            path = path[len(self.prefix):]
+        rel = posixpath.normpath(path.lstrip("/")) if path.strip("/") else ""
+        if rel.startswith(".."):
+            return None, None
+        if rel == "" or path.endswith("/"):
+            rel = posixpath.join(rel, "index.html") if rel else "index.html"
+        item = self.files.get(rel)
+        if item is None and f"{rel}/index.html" in self.files:
+            return None, f"{self.prefix}/{rel}/"
+        return item, None
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_SECONDS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.send_error(writer, 431, close=True)
+                    break
+                keep_alive = await self.respond(head, writer)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, head, writer):
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    key, _, value = line.partition(":")
+                    headers[key.strip().lower()] = value.strip()
+        except ValueError:
+            await self.send_error(writer, 400, close=True)
+            return False
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        # 静态服务器不读请求体；带请求体的请求（如 POST）回复后关闭连接，
+        # 否则请求体会留在连接里被当成下一个请求解析
+        if headers.get("content-length", "0") != "0" or "transfer-encoding" in headers:
+            keep_alive = False
+
+        if method not in ("GET", "HEAD"):
+            await self.send_error(writer, 405, keep_alive, extra={"Allow": "GET, HEAD"})
+            return keep_alive
+        item, redirect = self.resolve(target)
+        if redirect:
+            await self.send(writer, 301, {"Location": redirect, "Content-Length": "0"}, keep_alive=keep_alive)
+            self.log(method, target, 301)
+            return keep_alive
+        if item is None:
+            await self.send_error(writer, 404, keep_alive)
+            self.log(method, target, 404)
+            return keep_alive
+
+        variant = choose_variant(item, headers.get("accept-encoding", ""))
+        response_headers = {
+            "Content-Type": variant.content_type,
+            "ETag": variant.etag,
+            "Last-Modified": variant.last_modified,
+            "Cache-Control": variant.cache_control,
+        }
+        if item.variants:
+            response_headers["Vary"] = "Accept-Encoding"
+        if variant.encoding:
+            response_headers["Content-Encoding"] = variant.encoding
+        if not_modified(variant, headers):
+            await self.send(writer, 304, response_headers, keep_alive=keep_alive)
+            self.log(method, target, 304)
+            return keep_alive
+
+        response_headers["Content-Length"] = str(variant.size)
+        if method == "HEAD":
+            await self.send(writer, 200, response_headers, keep_alive=keep_alive)
+        elif variant.body is not None:
+            await self.send(writer, 200, response_headers, variant.body, keep_alive)
+        else:
+            await self.send(writer, 200, response_headers, keep_alive=keep_alive)
+            with open(variant.path, "rb") as f:
+                await asyncio.get_running_loop().sendfile(writer.transport, f, 0, variant.size)
+        self.log(method, target, 200)
+        return keep_alive
+
+    async def send(self, writer, status, headers, body=b"", keep_alive=True):
+        lines = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Date: {formatdate(usegmt=True)}",
+                 "Server: techblog-static"]
+        lines.extend(f"{key}: {value}" for key, value in headers.items())
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def send_error(self, writer, status, keep_alive=False, extra=None, close=False):
+        body = f"{status} {_REASONS[status]}\n".encode("utf-8")
+        headers = {"Content-Type": "text/plain; charset=utf-8", "Content-Length": str(len(body))}
+        headers.update(extra or {})
+        await self.send(writer, status, headers, body, keep_alive and not close)
+
+    def log(self, method, target, status):
+        if self.access_log:
+            print(f"{method} {target} {status}", flush=True)
+
+
+async def serve(root, host="127.0.0.1", port=DEFAULT_PORT, prefix="", access_log=False):
+    server = StaticServer(root, prefix, access_log=access_log)
+    listener = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER_BYTES,
+                                          backlog=1024, reuse_address=True)
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, server.reload)
+    except (NotImplementedError, AttributeError):
+        pass
+    print(f"🌐 http://{host}:{port}{server.prefix}/（SIGHUP 重新加载文件）", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生产模式静态文件服务器")
+    parser.add_argument("--root", help="站点目录，默认 dist/（不存在时使用仓库根目录）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--prefix", default="", help="站点挂载的 URL 子路径，例如 /preview")
+    parser.add_argument("--access-log", action="store_true", help="打印访问日志")
+    args = parser.parse_args(argv)
+
+    root = args.root
+    if root is None:
+        dist = os.path.join(BLOG_DIR, package_site.DIST_DIRNAME)
+        root = dist if os.path.isdir(dist) else BLOG_DIR
+    if uvloop is not None:
+        uvloop.install()
+    try:
+        asyncio.run(serve(os.path.abspath(root), args.host, args.port, args.prefix, args.access_log))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
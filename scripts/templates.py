@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面模板层
+
+布局是带 {{槽位}} 的 HTML，导入时编译成 "字面量 / 槽位" 序列，字面量预先编码为 UTF-8；
+导航栏、页脚、样式表和脚本标签、分享区块等共享片段按 (片段, 深度, 目标) 只渲染一次，
+以字节缓存。组装页面时按顺序产出字节块，交给 blog_utils.atomic_write_chunks 直接写入文件，
+每页只需要编码页面自己的内容。
+
+目标（target）决定站内链接的前缀:
+    relative  相对路径（GitHub Pages 项目站点，默认，与 build-github.js 一致）
+    absolute  以 / 开头（部署在域名根目录，与 build.js 一致）
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+TARGETS = ("relative", "absolute")
+
+_SLOT = re.compile(r"\{\{(\w+)\}\}")
+
+
+def base_path(depth, target="relative"):
+    """站内链接前缀"""
+    if target not in TARGETS:
+        raise ValueError(f"未知的目标: {target}")
+    if target == "absolute":
+        return "/"
+    return "./" if depth == 0 else "../" * depth
+
+
+def _chunks(value):
+    """把槽位的值（str、bytes 或它们的可迭代对象）展开为字节块"""
+    if isinstance(value, bytes):
+        if value:
+            yield value
+    elif isinstance(value, str):
+        if value:
+            yield value.encode("utf-8")
+    else:
+        for item in value:
+            yield from _chunks(item)
+
+
+class Layout:
+    """编译后的布局"""
+
+    def __init__(self, source):
+        self.parts = []
+        pos = 0
+        for match in _SLOT.finditer(source):
+            if match.start() > pos:
+                self.parts.append((True, source[pos:match.start()].encode("utf-8")))
+            self.parts.append((False, match.group(1)))
+            pos = match.end()
+        if pos < len(source):
+            self.parts.append((True, source[pos:].encode("utf-8")))
+        self.slots = {part for literal, part in self.parts if not literal}
+
+    def render(self, **values):
+        """按顺序产出字节块；缺少的槽位会抛出 KeyError"""
+        for literal, part in self.parts:
+            if literal:
+                yield part
+            else:
+                yield from _chunks(values[part])
+
+    def render_text(self, **values):
+        return b"".join(self.render(**values)).decode("utf-8")
+
+
+# ---------- 共享片段 ----------
+
+NAV = Layout("""    <nav class="navbar">
+        <div class="nav-container">
+            <a href="{{base}}index.html" class="nav-logo">
+                <span class="logo-icon">&lt;/&gt;</span>
+                <span class="logo-text">TechBlog</span>
+            </a>
+            <ul class="nav-menu">
+                <li><a href="{{base}}index.html" class="nav-link">首页</a></li>
+                <li><a href="{{base}}posts.html" class="nav-link">文章</a></li>
+                <li><a href="{{base}}about.html" class="nav-link">关于</a></li>
+                <li><a href="{{base}}contact.html" class="nav-link">联系</a></li>
+            </ul>
+            <div class="nav-actions">
+                <button class="theme-toggle" id="themeToggle"><i class="fas fa-moon"></i></button>
+                <button class="mobile-menu-toggle" id="mobileMenuToggle"><i class="fas fa-bars"></i></button>
+            </div>
+        </div>
+    </nav>""")
+
+FOOTER = Layout("""    <footer class="footer">
+        <div class="container">
+            <div class="footer-grid">
+                <div class="footer-brand">
+                    <a href="{{base}}index.html" class="footer-logo">
+                        <span class="logo-icon">&lt;/&gt;</span>
+                        <span class="logo-text">TechBlog</span>
+                    </a>
+                    <p class="footer-description">记录技术成长的每一步，分享编程的乐趣与思考。</p>
+                    <div class="social-links">
+                        <a href="#" class="social-link"><i class="fab fa-github"></i></a>
+                        <a href="#" class="social-link"><i class="fab fa-twitter"></i></a>
+                        <a href="#" class="social-link"><i class="fab fa-linkedin"></i></a>
+                        <a href="#" class="social-link"><i class="fas fa-rss"></i></a>
+                    </div>
+                </div>
+                <div class="footer-links">
+                    <h4>快速链接</h4>
+                    <ul>
+                        <li><a href="{{base}}index.html">首页</a></li>
+                        <li><a href="{{base}}posts.html">文章</a></li>
+                        <li><a href="{{base}}about.html">关于</a></li>
+                        <li><a href="{{base}}contact.html">联系</a></li>
+                    </ul>
+                </div>
+                <div class="footer-links">
+                    <h4>技术标签</h4>
+                    <ul>
+                        <li><a href="#">React</a></li>
+                        <li><a href="#">TypeScript</a></li>
+                        <li><a href="#">Node.js</a></li>
+                        <li><a href="#">云原生</a></li>
+                    </ul>
+                </div>
+            </div>
+            <div class="footer-bottom">
+                <p>&copy; <span class="copyright-year">{{year}}</span> TechBlog. All rights reserved.</p>
+                <p>Made with <i class="fas fa-heart"></i> and lots of <i class="fas fa-coffee"></i></p>
+            </div>
+        </div>
+    </footer>""")
+
+STYLESHEETS = Layout("""    <link rel="stylesheet" href="{{base}}css/style.css">
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=JetBrains+Mono:wght@400;500&display=swap" rel="stylesheet">
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
+    <link rel="alternate" type="application/rss+xml" title="TechBlog" href="{{base}}feed.xml">
+    <link rel="alternate" type="application/atom+xml" title="TechBlog" href="{{base}}atom.xml">""")
+
+SCRIPTS = Layout("""    <script src="{{base}}js/main.js"></script>""")
+
+SEARCH_SCRIPTS = Layout("""    <script src="{{base}}js/main.js"></script>
+    <script src="{{base}}js/search.js" data-index="{{base}}search/" data-pages="{{base}}"></script>""")
+
+SHARE = Layout("""    <section style="background: var(--bg-secondary); padding: 3rem 0;">
+        <div class="container">
+            <div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 1rem;">
+                <div>
+                    <h3>喜欢这篇文章？</h3>
+                    <p style="color: var(--text-secondary);">分享给更多开发者</p>
+                </div>
+                <div style="display: flex; gap: 1rem;">
+                    <button class="btn btn-secondary"><i class="fab fa-twitter"></i><span>Twitter</span></button>
+                    <button class="btn btn-secondary"><i class="fab fa-weixin"></i><span>微信</span></button>
+                </div>
+            </div>
+        </div>
+    </section>""")
+
+FRAGMENTS = {
+    "nav": NAV,
+    "footer": FOOTER,
+    "stylesheets": STYLESHEETS,
+    "scripts": SCRIPTS,
+    "search_scripts": SEARCH_SCRIPTS,
+    "share": SHARE,
+}
+
+# 页面骨架：<head> 中页面自己的 meta 放在 head 槽位
+PAGE = Layout("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{title}} - TechBlog</title>
+{{head}}{{stylesheets}}
+</head>
+<body>
+{{nav}}
+
+{{main}}
+
+{{footer}}
+
+{{scripts}}
+</body>
+</html>""")
+
+
+@lru_cache(maxsize=None)
+def _fragment(name, depth, target, year):
+    base = base_path(depth, target)
+    return FRAGMENTS[name].render_text(base=base, year=str(year)).encode("utf-8")
+
+
+def fragment(name, depth=0, target="relative"):
+    """共享片段的字节；页脚年份取渲染时的当年，已有页面的年份由 js/main.js 更新"""
+    return _fragment(name, depth, target, datetime.now().year)
+
+
+def fragment_text(name, depth=0, target="relative"):
+    return fragment(name, depth, target).decode("utf-8")
+
+
+def render_page(title, main, depth=0, target="relative", head="", scripts="scripts"):
+    """组装整页，产出字节块（main 可以是字节块的生成器）"""
+    return PAGE.render(
+        title=title,
+        head=head,
+        stylesheets=fragment("stylesheets", depth, target),
+        nav=fragment("nav", depth, target),
+        main=main,
+        footer=fragment("footer", depth, target),
+        scripts=fragment(scripts, depth, target),
+    )
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+教程主题库
+
+主题保存在 content/topics.json，两个生成器共用。首次访问时才加载，
+按分类、标签、排期槽位建立索引，之后按日期取主题都是 O(1)。
+
+文件格式:
+    {
+      "start_date": "2026-02-05",        # 排期起点（槽位 0）
+      "schedule": ["topic-id", ...],     # 每天一个槽位，循环使用；省略时按 topics 顺序
+      "topics": [{"id", "title", "category", "tags", "excerpt", "sections"}, ...]
+    }
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+from blog_utils import BLOG_DIR
+
+CATALOG_PATH = os.path.join(BLOG_DIR, "content", "topics.json")
+
+
+class TopicCatalog:
+    """主题库及其索引"""
+
+    def __init__(self, data):
+        self.topics = tuple(data["topics"])
+        self.start_ordinal = datetime.strptime(data["start_date"], "%Y-%m-%d").toordinal()
+
+        self._by_id = {}
+        for position, topic in enumerate(self.topics):
+            if topic["id"] in self._by_id:
+                raise ValueError(f"主题 id 重复: {topic['id']}")
+            self._by_id[topic["id"]] = position
+
+        schedule = data.get("schedule") or [t["id"] for t in self.topics]
+        try:
+            # 槽位 -> 主题，按槽位下标直接取
+            self._slots = tuple(self.topics[self._by_id[topic_id]] for topic_id in schedule)
+        except KeyError as e:
+            raise ValueError(f"排期引用了不存在的主题: {e.args[0]}") from None
+        if not self._slots:
+            raise ValueError("主题库为空")
+
+        self._by_category = None
+        self._by_tag = None
+
+    def __len__(self):
+        return len(self.topics)
+
+    def slot_for_date(self, date):
+        """日期对应的排期槽位"""
+        return (date.toordinal() - self.start_ordinal) % len(self._slots)
+
+    def for_date(self, date):
+        """某天的主题"""
+        return self._slots[self.slot_for_date(date)]
+
+    def upcoming(self, date, days):
+        """从 date 开始连续 days 天的主题"""
+        first = self.slot_for_date(date)
+        count = len(self._slots)
+        return [self._slots[(first + i) % count] for i in range(days)]
+
+    def get(self, topic_id):
+        """按 id 取主题"""
+        position = self._by_id.get(topic_id)
+        return None if position is None else self.topics[position]
+
+    def by_category(self, category):
+        """某分类下的全部主题"""
+        if self._by_category is None:
+            self._by_category = self._build_index(lambda t: [t["category"]])
+        return self._by_category.get(category, ())
+
+    def by_tag(self, tag):
+        """带某标签的全部主题"""
+        if self._by_tag is None:
+            self._by_tag = self._build_index(lambda t: t.get("tags", []))
+        return self._by_tag.get(tag, ())
+
+    def _build_index(self, keys_of):
+        index = {}
+        for topic in self.topics:
+            for key in keys_of(topic):
+                index.setdefault(key, []).append(topic)
+        return {key: tuple(topics) for key, topics in index.items()}
+
+
+_catalog = None
+_catalog_key = None
+
+
+def load_catalog(path=CATALOG_PATH):
+    """从磁盘读取主题库"""
+    with open(path, "r", encoding="utf-8") as f:
+        return TopicCatalog(json.load(f))
+
+
+def get_catalog(path=CATALOG_PATH):
+    """懒加载的共享主题库；文件被修改后自动重新加载"""
+    global _catalog, _catalog_key
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    if _catalog is None or _catalog_key != key:
+        _catalog = load_catalog(path)
+        _catalog_key = key
+    return _catalog
+
+
+def main(argv=None):
+    """打印接下来几天的排期"""
+    argv = sys.argv[1:] if argv is None else argv
+    days = int(argv[0]) if argv else 7
+    catalog = get_catalog()
+    today = datetime.now()
+    print(f"主题库: {len(catalog)} 个主题")
+    for offset, topic in enumerate(catalog.upcoming(today, days)):
+        day = today + timedelta(days=offset)
+        print(f"{day.strftime('%Y-%m-%d')}  [{topic['category']}] {topic['title']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
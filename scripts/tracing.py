@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线追踪
+
+记录嵌套的计时区间（span）：墙钟时间、CPU 时间（本进程和子进程分开）、
+进程峰值内存，外部命令还记录退出码。结果导出为 Chrome trace-event JSON，
+可以用 chrome://tracing 或 https://ui.perfetto.dev 打开，同时生成一行摘要方便对比每天的运行。
+
+    from tracing import span, traced
+
+    with span("build", posts=12) as s:
+        ...
+        s.set(exit_status=0)
+
+span 只在内存里追加事件，开销很小，所以一直开启；调用 write_trace() 才写文件。
+并发的 asyncio 任务 / 线程可以指定 lane，在 trace 里显示为不同的行，子 span 继承所在的 lane。
+
+用法:
+    python3 scripts/tracing.py                      # 列出最近的 trace 和摘要
+    BLOG_TRACE=1 python3 scripts/generate_ai_tutorial.py   # 单独运行生成器时也写 trace
+"""
+
+import os
+import sys
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from blog_utils import cache_path, load_json, save_json
+
+TRACE_DIRNAME = "traces"
+# 保留最近多少份 trace
+KEEP_TRACES = 60
+
+_lane = contextvars.ContextVar("trace_lane", default=None)
+_depth = contextvars.ContextVar("trace_depth", default=0)
+
+
+def peak_rss_mb():
+    """(本进程峰值 RSS, 已结束子进程的峰值 RSS)，单位 MB"""
+    if resource is None:
+        return 0.0, 0.0
+    # Linux 上 ru_maxrss 单位是 KB，macOS 上是字节
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / divisor, children / divisor
+
+
+def _cpu_times():
+    """(本进程 CPU 秒数, 已结束子进程 CPU 秒数)"""
+    t = os.times()
+    return t.user + t.system, t.children_user + t.children_system
+
+
+class Span:
+    """进行中的 span，可以用 set() 补充参数（如退出码）"""
+
+    __slots__ = ("name", "args", "lane", "depth")
+
+    def __init__(self, name, args, lane, depth):
+        self.name = name
+        self.args = args
+        self.lane = lane
+        self.depth = depth
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class Tracer:
+    """收集一次运行的所有 span"""
+
+    def __init__(self, name="pipeline"):
+        self.name = name
+        self.started_at = datetime.now()
+        self.origin = time.perf_counter()
+        self.records = []
+        self._lanes = {"main": 1}
+        self._lock = threading.Lock()
+
+    def _lane_id(self, lane):
+        with self._lock:
+            if lane not in self._lanes:
+                self._lanes[lane] = len(self._lanes) + 1
+            return self._lanes[lane]
+
+    @contextmanager
+    def span(self, name, lane=None, **args):
+        """记录一个 span；异常会记到 args["error"] 后继续抛出"""
+        lane_token = _lane.set(self._lane_id(lane)) if lane is not None else None
+        depth = _depth.get()
+        depth_token = _depth.set(depth + 1)
+        current = Span(name, dict(args), _lane.get() or 1, depth)
+        cpu0, child_cpu0 = _cpu_times()
+        start = time.perf_counter()
+        try:
+            yield current
+        except BaseException as exc:
+            current.args.setdefault("error", f"{type(exc).__name__}: {exc}")
+            raise
+        finally:
+            end = time.perf_counter()
+            cpu1, child_cpu1 = _cpu_times()
+            rss, child_rss = peak_rss_mb()
+            self.records.append({
+                "name": name,
+                "lane": current.lane,
+                "depth": depth,
+                "start": start - self.origin,
+                "wall": end - start,
+                "cpu": cpu1 - cpu0,
+                "children_cpu": child_cpu1 - child_cpu0,
+                "peak_rss_mb": round(rss, 1),
+                "children_peak_rss_mb": round(child_rss, 1),
+                "args": current.args,
+            })
+            _depth.reset(depth_token)
+            if lane_token is not None:
+                _lane.reset(lane_token)
+
+    def to_chrome(self):
+        """转换为 Chrome trace-event 格式"""
+        pid = os.getpid()
+        events = [{"ph": "M", "pid": pid, "tid": 0, "name": "process_name",
+                   "args": {"name": self.name}}]
+        for lane, tid in sorted(self._lanes.items(), key=lambda item: item[1]):
+            events.append({"ph": "M", "pid": pid, "tid": tid, "name": "thread_name",
+                           "args": {"name": lane}})
+        for record in sorted(self.records, key=lambda r: (r["start"], r["depth"])):
+            args = dict(record["args"])
+            args.update({
+                "cpu_ms": round(record["cpu"] * 1000, 1),
+                "children_cpu_ms": round(record["children_cpu"] * 1000, 1),
+                "peak_rss_mb": record["peak_rss_mb"],
+                "children_peak_rss_mb": record["children_peak_rss_mb"],
+            })
+            events.append({
+                "name": record["name"],
+                "cat": self.name,
+                "ph": "X",
+                "pid": pid,
+                "tid": record["lane"],
+                "ts": round(record["start"] * 1e6, 1),
+                "dur": round(record["wall"] * 1e6, 1),
+                "args": {k: v for k, v in args.items() if isinstance(v, (str, int, float, bool))
+                         or v is None},
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "name": self.name,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "summary": self.summary(),
+            },
+        }
+
+    def summary(self):
+        """一行摘要：总耗时、顶层（或唯一根 span 下一层）各阶段耗时、CPU、峰值内存"""
+        if not self.records:
+            return f"{self.name}: 没有记录"
+        roots = [r for r in self.records if r["depth"] == 0]
+        level = 1 if len(roots) == 1 else 0
+        items = sorted((r for r in self.records if r["depth"] == level), key=lambda r: r["start"])
+        total = max(r["start"] + r["wall"] for r in self.records) - min(r["start"] for r in self.records)
+        parts = []
+        for record in items:
+            part = f"{record['name']} {record['wall']:.2f}s"
+            if "error" in record["args"]:
+                part += " ✗"
+            parts.append(part)
+        cpu = sum(r["cpu"] for r in roots)
+        children_cpu = sum(r["children_cpu"] for r in roots)
+        rss = max(r["peak_rss_mb"] for r in self.records)
+        children_rss = max(r["children_peak_rss_mb"] for r in self.records)
+        return (f"{self.name} {total:.2f}s | {', '.join(parts)} | "
+                f"cpu {cpu:.2f}s + 子进程 {children_cpu:.2f}s | "
+                f"峰值内存 {rss:.0f}MB / 子进程 {children_rss:.0f}MB")
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def reset_tracer(name="pipeline"):
+    """开始新的一次运行（丢弃之前记录的 span）"""
+    global _tracer
+    _tracer = Tracer(name)
+    return _tracer
+
+
+def span(name, lane=None, **args):
+    """在当前 tracer 上记录一个 span"""
+    return _tracer.span(name, lane=lane, **args)
+
+
+def traced(name=None):
+    """装饰器：把函数调用记录为一个 span"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _prune(directory, keep=KEEP_TRACES):
+    names = sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+    for name in names[:-keep]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def write_trace(path=None, root=None):
+    """写出 Chrome trace JSON，返回 (路径, 摘要)"""
+    tracer = _tracer
+    if path is None:
+        stamp = tracer.started_at.strftime("%Y%m%d-%H%M%S")
+        path = cache_path(os.path.join(TRACE_DIRNAME, f"{stamp}-{tracer.name}.json"), root)
+    save_json(path, tracer.to_chrome(), compact=True)
+    _prune(os.path.dirname(path))
+    return path, tracer.summary()
+
+
+def finish_if_enabled(name=None):
+    """单独运行脚本时：设置了 BLOG_TRACE 环境变量才写 trace"""
+    if not os.environ.get("BLOG_TRACE"):
+        return None
+    if name:
+        _tracer.name = name
+    path, summary = write_trace()
+    print(f"⏱️  {summary}\n   trace: {path}")
+    return path
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    limit = int(argv[0]) if argv else 10
+    directory = cache_path(TRACE_DIRNAME)
+    if not os.path.isdir(directory):
+        print("还没有 trace")
+        return 0
+    for name in sorted(n for n in os.listdir(directory) if n.endswith(".json"))[-limit:]:
+        data = load_json(os.path.join(directory, name), {}) or {}
+        print(f"{name}: {data.get('otherData', {}).get('summary', '')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
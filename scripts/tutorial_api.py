@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI教程文章生成 API
+统一封装 generate_ai_tutorial / generate_ai_tutorial_full，供 deploy.py 在进程内直接调用；
+命令行提供 JSON Lines 机器模式，供外部程序调用。
+
+用法:
+    python3 scripts/tutorial_api.py                       # 生成今天的文章，输出一行 JSON
+    python3 scripts/tutorial_api.py --date 2026-02-10 --variant full --no-save
+    python3 scripts/tutorial_api.py --jsonl < requests.jsonl
+        每行一个请求: {"date": "2026-02-10", "variant": "full", "save": false}
+        每行一个响应: {"ok": true, "post": {...}} 或 {"ok": false, "error": "..."}
+"""
+
+import os
+import sys
+import json
+import argparse
+import importlib
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+from blog_utils import atomic_write_chunks, join_lines, posts_dir
+from content_analyzer import analyze_lines, split_lines, toc_anchor
+from tracing import traced
+
+# 生成器变体 -> 模块名
+GENERATORS = {
+    "basic": "generate_ai_tutorial",
+    "full": "generate_ai_tutorial_full",
+}
+DEFAULT_VARIANT = "basic"
+
+
+@dataclass
+class GeneratedPost:
+    """一次生成的结果"""
+    title: str
+    filename: str
+    date: str
+    excerpt: str
+    next_title: str
+    variant: str
+    sections: list = field(default_factory=list)
+    filepath: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def load_generator(variant=DEFAULT_VARIANT):
+    """按变体加载生成器模块"""
+    if variant not in GENERATORS:
+        raise ValueError(f"未知的生成器变体: {variant}（可选: {', '.join(GENERATORS)}）")
+    return importlib.import_module(GENERATORS[variant])
+
+
+def parse_date(value):
+    """解析 YYYY-MM-DD 或 ISO 时间，None 表示当前时间"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def iter_post_lines(post, iter_body_lines):
+    """
+    逐行生成文章：Front Matter、目录、正文（iter_body_lines(tutorial) 由各生成器提供）
+
+    正文先流式分析一遍（只保留计数和标题，不保留正文），得到阅读时间和标题 id，
+    目录链接使用渲染后页面上真实的 id；之后再流式输出正文（章节正文第二次命中章节缓存）。
+    """
+    tutorial = post["tutorial"]
+    time_str = post["date"].strftime("%Y-%m-%d %H:%M:%S")
+    analysis = analyze_lines(split_lines(iter_body_lines(tutorial)), preceding_headings=("目录",))
+
+    yield from [
+        "---",
+        f'title: "{tutorial["title"]}"',
+        f"date: {time_str}",
+        'author: "小欧Jacory"',
+        f'category: "{tutorial["category"]}"',
+        f'tags: {json.dumps(tutorial["tags"], ensure_ascii=False)}',
+        f"readTime: {analysis['read_time']}",
+        'cover: ""',
+        f'excerpt: "{tutorial["excerpt"]}"',
+        "featured: false",
+        "---",
+        "",
+        "## 目录",
+        ""
+    ]
+
+    # 添加目录链接（正文中没有对应标题时只列出章节名）
+    for i, section in enumerate(tutorial["sections"], 1):
+        anchor = toc_anchor(analysis, f"{i}. {section}")
+        yield f"- [{section}](#{anchor})" if anchor else f"- {section}"
+
+    yield ""
+    yield from iter_body_lines(tutorial)
+
+
+def iter_post_content(post, iter_body_lines):
+    """流式输出文章全文"""
+    return join_lines(iter_post_lines(post, iter_body_lines))
+
+
+def render_post(post, iter_body_lines):
+    """返回文章全文（需要完整字符串时使用）"""
+    return "".join(iter_post_content(post, iter_body_lines))
+
+
+@traced("save_post")
+def save_post(post, output_dir, iter_body_lines):
+    """流式写入临时文件，fsync 后改名为目标文件"""
+    filepath = os.path.join(output_dir, post["filename"])
+    return atomic_write_chunks(filepath, iter_post_content(post, iter_body_lines))
+
+
+def generate_post(date=None, variant=DEFAULT_VARIANT, save=True, output_dir=None):
+    """生成（并保存）一篇文章，返回 GeneratedPost"""
+    generator = load_generator(variant)
+    date = parse_date(date) or datetime.now()
+    post = generator.generate_blog_post(date)
+    filepath = ""
+    if save:
+        filepath = generator.save_post(post, output_dir or posts_dir())
+    return GeneratedPost(
+        title=post["title"],
+        filename=post["filename"],
+        date=date.strftime("%Y-%m-%d"),
+        excerpt=post["excerpt"],
+        next_title=post["next_title"],
+        variant=variant,
+        sections=list(post["sections"]),
+        filepath=filepath,
+    )
+
+
+def handle_request(request, output_dir=None):
+    """处理一条 JSON Lines 请求，返回响应字典"""
+    try:
+        post = generate_post(
+            date=request.get("date"),
+            variant=request.get("variant", DEFAULT_VARIANT),
+            save=request.get("save", True),
+            output_dir=request.get("output_dir", output_dir),
+        )
+        return {"ok": True, "post": post.to_dict()}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def serve_jsonl(stdin, stdout, output_dir=None):
+    """逐行读取请求并逐行输出响应"""
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"ok": False, "error": f"无效的 JSON: {e}"}
+        else:
+            response = handle_request(request, output_dir)
+        stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI教程文章生成 API")
+    parser.add_argument("--jsonl", action="store_true", help="从标准输入逐行读取请求")
+    parser.add_argument("--date", help="文章日期，默认今天")
+    parser.add_argument("--variant", default=DEFAULT_VARIANT, choices=sorted(GENERATORS))
+    parser.add_argument("--output-dir", help="文章输出目录，默认 content/posts")
+    parser.add_argument("--no-save", action="store_true", help="只生成不保存")
+    args = parser.parse_args(argv)
+
+    if args.jsonl:
+        serve_jsonl(sys.stdin, sys.stdout, args.output_dir)
+        return 0
+
+    response = handle_request({
+        "date": args.date,
+        "variant": args.variant,
+        "save": not args.no_save,
+        "output_dir": args.output_dir,
+    })
+    print(json.dumps(response, ensure_ascii=False))
+    return 0 if response["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())